@@ -1,9 +1,11 @@
 # must be build with scons
 from .messaging_pyx import Context, Poller, SubSocket, PubSocket  # pylint: disable=no-name-in-module, import-error
 from .messaging_pyx import MultiplePublishersError, MessagingError  # pylint: disable=no-name-in-module, import-error
+from .messaging_pyx import drain_sock_batch  # pylint: disable=no-name-in-module, import-error
 import capnp
+import struct
 
-from typing import Optional, List, Union
+from typing import Dict, Optional, List, Tuple, Union
 
 from cereal import log
 from cereal.services import service_list
@@ -21,9 +23,20 @@ except ImportError:
 
 context = Context()
 
-def new_message(service: Optional[str] = None, size: Optional[int] = None) -> capnp.lib.capnp._DynamicStructBuilder:
+# layout of the Event root struct, used to read the header fields of a serialized
+# message without building a capnp reader for it
+_EVENT_FIELDS = log.Event.schema.fields
+_EVENT_DISCRIMINANT_OFFSET = 2 * log.Event.schema.node.struct.discriminantOffset
+_EVENT_VALID_OFFSET = _EVENT_FIELDS['valid'].proto.slot.offset
+_EVENT_UNION = {f.proto.discriminantValue: name for name, f in _EVENT_FIELDS.items()
+                if f.proto.discriminantValue != 0xffff}
+
+# prebuilt empty Events per (service, size), copied by new_message instead of
+# building every message field by field
+_message_templates: Dict[Tuple[Optional[str], Optional[int]], capnp.lib.capnp._DynamicStructBuilder] = {}
+
+def _message_template(service: Optional[str], size: Optional[int]) -> capnp.lib.capnp._DynamicStructBuilder:
   dat = log.Event.new_message()
-  dat.logMonoTime = int(sec_since_boot() * 1e9)
   dat.valid = True
   if service is not None:
     if size is None:
@@ -32,6 +45,15 @@ def new_message(service: Optional[str] = None, size: Optional[int] = None) -> ca
       dat.init(service, size)
   return dat
 
+def new_message(service: Optional[str] = None, size: Optional[int] = None) -> capnp.lib.capnp._DynamicStructBuilder:
+  template = _message_templates.get((service, size))
+  if template is None:
+    template = _message_templates[(service, size)] = _message_template(service, size)
+
+  dat = template.copy()
+  dat.logMonoTime = int(sec_since_boot() * 1e9)
+  return dat
+
 def pub_sock(endpoint: str) -> PubSocket:
   sock = PubSocket()
   sock.connect(context, endpoint)
@@ -52,6 +74,10 @@ def sub_sock(endpoint: str, poller: Optional[Poller] = None, addr: str = "127.0.
 
 def drain_sock_raw(sock: SubSocket, wait_for_one: bool = False) -> List[bytes]:
   """Receive all message currently available on the queue"""
+  if isinstance(sock, SubSocket):
+    return drain_sock_batch(sock, wait_for_one)
+
+  # socket-like objects, e.g. in tests and replay tools
   ret: List[bytes] = []
   while 1:
     if wait_for_one and len(ret) == 0:
@@ -68,20 +94,7 @@ def drain_sock_raw(sock: SubSocket, wait_for_one: bool = False) -> List[bytes]:
 
 def drain_sock(sock: SubSocket, wait_for_one: bool = False) -> List[capnp.lib.capnp._DynamicStructReader]:
   """Receive all message currently available on the queue"""
-  ret: List[capnp.lib.capnp._DynamicStructReader] = []
-  while 1:
-    if wait_for_one and len(ret) == 0:
-      dat = sock.receive()
-    else:
-      dat = sock.receive(non_blocking=True)
-
-    if dat is None:  # Timeout hit
-      break
-
-    dat = log.Event.from_bytes(dat)
-    ret.append(dat)
-
-  return ret
+  return [log.Event.from_bytes(dat) for dat in drain_sock_raw(sock, wait_for_one)]
 
 
 # TODO: print when we drop packets?
@@ -124,11 +137,52 @@ def recv_one_retry(sock: SubSocket) -> capnp.lib.capnp._DynamicStructReader:
     if dat is not None:
       return log.Event.from_bytes(dat)
 
+def peek_event(dat: bytes) -> Optional[Tuple[str, int, bool]]:
+  """Read which(), logMonoTime and valid from a serialized Event without decoding it.
+  Returns None if the message layout can't be read directly."""
+  if len(dat) < 16:
+    return None
+
+  # segment table, padded to a word boundary
+  seg_start = (4 * (struct.unpack_from('<I', dat)[0] + 2) + 7) & ~7
+  if len(dat) < seg_start + 8:
+    return None
+
+  # root struct pointer, far pointers are not followed
+  ptr, = struct.unpack_from('<Q', dat, seg_start)
+  if ptr & 3 != 0:
+    return None
+  offset = (ptr >> 2) & 0x3fffffff
+  if offset & 0x20000000:
+    offset -= 0x40000000
+  data_start = seg_start + 8 * (1 + offset)
+  data_size = 8 * ((ptr >> 32) & 0xffff)
+  if data_start < seg_start or data_start + data_size > len(dat):
+    return None
+
+  # fields past the end of the data section have their default value
+  mono_time = struct.unpack_from('<Q', dat, data_start)[0] if data_size >= 8 else 0
+  if _EVENT_DISCRIMINANT_OFFSET + 2 <= data_size:
+    which = struct.unpack_from('<H', dat, data_start + _EVENT_DISCRIMINANT_OFFSET)[0]
+  else:
+    which = 0
+  valid = True
+  if _EVENT_VALID_OFFSET // 8 < data_size:
+    valid = not (dat[data_start + _EVENT_VALID_OFFSET // 8] >> (_EVENT_VALID_OFFSET % 8)) & 1
+
+  if which not in _EVENT_UNION:
+    return None
+  return _EVENT_UNION[which], mono_time, valid
+
 class SubMaster():
   def __init__(self, services: List[str], poll: Optional[List[str]] = None,
-               ignore_alive: Optional[List[str]] = None, addr:str ="127.0.0.1"):
+               ignore_alive: Optional[List[str]] = None, addr:str ="127.0.0.1",
+               lazy: bool = False):
     self.frame = -1
+    self.lazy = lazy
     self.updated = {s: False for s in services}
+    self.updated_prev: List[str] = []
+    self.raw = {}
     self.rcv_time = {s: 0. for s in services}
     self.rcv_frame = {s: 0 for s in services}
     self.alive = {s: False for s in services}
@@ -163,30 +217,56 @@ class SubMaster():
       self.valid[s] = data.valid
 
   def __getitem__(self, s: str) -> capnp.lib.capnp._DynamicStructReader:
+    if s in self.raw:
+      # lazy mode: decode on first access in this frame
+      self.data[s] = getattr(log.Event.from_bytes(self.raw.pop(s)), s)
     return self.data[s]
 
   def update(self, timeout: int = 1000) -> None:
+    recv = (lambda sock: sock.receive(non_blocking=True)) if self.lazy else recv_one_or_none
+
     msgs = []
     for sock in self.poller.poll(timeout):
-      msgs.append(recv_one_or_none(sock))
+      msgs.append(recv(sock))
 
     # non-blocking receive for non-polled sockets
     for s in self.non_polled_services:
-      msgs.append(recv_one_or_none(self.sock[s]))
+      msgs.append(recv(self.sock[s]))
     self.update_msgs(sec_since_boot(), msgs)
 
-  def update_msgs(self, cur_time: float, msgs: List[capnp.lib.capnp._DynamicStructReader]) -> None:
+  def update_msgs(self, cur_time: float, msgs: List[Union[None, bytes, capnp.lib.capnp._DynamicStructReader]]) -> None:
+    """msgs may be capnp readers or, in lazy mode, the serialized bytes"""
     self.frame += 1
-    self.updated = dict.fromkeys(self.updated, False)
+    for s in self.updated_prev:
+      self.updated[s] = False
+    self.updated_prev = []
+
     for msg in msgs:
       if msg is None:
         continue
 
+      if isinstance(msg, bytes):
+        header = peek_event(msg)
+        if header is None:
+          msg = log.Event.from_bytes(msg)
+        else:
+          s = header[0]
+          self.raw[s] = msg
+          self.updated[s] = True
+          self.updated_prev.append(s)
+          self.rcv_time[s] = cur_time
+          self.rcv_frame[s] = self.frame
+          self.logMonoTime[s] = header[1]
+          self.valid[s] = header[2]
+          continue
+
       s = msg.which()
       self.updated[s] = True
+      self.updated_prev.append(s)
       self.rcv_time[s] = cur_time
       self.rcv_frame[s] = self.frame
       self.data[s] = getattr(msg, s)
+      self.raw.pop(s, None)
       self.logMonoTime[s] = msg.logMonoTime
       self.valid[s] = msg.valid
 
@@ -149,3 +149,25 @@ cdef class PubSocket:
         raise MultiplePublishersError
       else:
         raise MessagingError
+
+
+def drain_sock_batch(SubSocket sock, bool wait_for_one=False):
+  """Receive all messages currently available on the queue in one call"""
+  cdef list ret = []
+  cdef bool non_blocking = not wait_for_one
+  cdef cppMessage * msg
+
+  while True:
+    msg = sock.socket.receive(non_blocking)
+
+    if msg == NULL:
+      # If a blocking read returns no message check errno if SIGINT was caught in the C++ code
+      if not non_blocking and errno.errno == errno.EINTR:
+        print("SIGINT received, exiting")
+        sys.exit(1)
+
+      return ret
+
+    ret.append(msg.getData()[:msg.getSize()])
+    del msg
+    non_blocking = True
@@ -0,0 +1,70 @@
+import random
+import time
+import unittest
+
+from cereal import log
+import cereal.messaging as messaging
+
+N_MSGS = 100  # one second of boardd can packets
+N_FRAMES = 64
+
+
+def drain_sock_raw_old(sock, wait_for_one=False):
+  """drain_sock_raw before drain_sock_batch, one receive call per message"""
+  ret = []
+  while 1:
+    if wait_for_one and len(ret) == 0:
+      dat = sock.receive()
+    else:
+      dat = sock.receive(non_blocking=True)
+
+    if dat is None:
+      break
+
+    ret.append(dat)
+
+  return ret
+
+
+def can_packet(n):
+  msg = messaging.new_message('can', n)
+  for i in range(n):
+    msg.can[i].address = random.randint(0x100, 0x7ff)
+    msg.can[i].busTime = random.getrandbits(16)
+    msg.can[i].dat = bytes(random.getrandbits(8) for _ in range(8))
+    msg.can[i].src = random.randint(0, 2)
+  return msg.to_bytes()
+
+
+class TestDrainSock(unittest.TestCase):
+  def setUp(self):
+    self.pub = messaging.pub_sock('can')
+    self.sock = messaging.sub_sock('can', timeout=100)
+    time.sleep(0.1)
+    self.packets = [can_packet(N_FRAMES) for _ in range(N_MSGS)]
+
+  def publish(self):
+    for dat in self.packets:
+      self.pub.send(dat)
+
+  def test_batch_equals_loop(self):
+    self.assertEqual(messaging.drain_sock_batch(self.sock), [])
+    self.assertEqual(messaging.drain_sock_batch(self.sock, wait_for_one=True), [])  # times out
+
+    self.publish()
+    self.assertEqual(messaging.drain_sock_batch(self.sock, wait_for_one=True), self.packets)
+    self.publish()
+    self.assertEqual(drain_sock_raw_old(self.sock), self.packets)
+    self.publish()
+    msgs = messaging.drain_sock(self.sock)
+    self.assertEqual([m.to_dict() for m in msgs], [log.Event.from_bytes(d).to_dict() for d in self.packets])
+
+  def test_batch_drains_queue(self):
+    for _ in range(3):
+      self.publish()
+      self.assertEqual(len(messaging.drain_sock_batch(self.sock)), N_MSGS)
+      self.assertEqual(messaging.drain_sock_batch(self.sock), [])
+
+
+if __name__ == "__main__":
+  unittest.main()
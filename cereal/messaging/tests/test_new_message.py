@@ -0,0 +1,92 @@
+import unittest
+
+from cereal import car, log
+import cereal.messaging as messaging
+from cereal.services import service_list
+
+
+def new_message_old(service=None, size=None):
+  """new_message before the templates, building every message field by field"""
+  dat = log.Event.new_message()
+  dat.logMonoTime = int(messaging.sec_since_boot() * 1e9)
+  dat.valid = True
+  if service is not None:
+    if size is None:
+      dat.init(service)
+    else:
+      dat.init(service, size)
+  return dat
+
+
+def controlsd_publish(new_message, CS, CC, car_events):
+  """The messages controlsd publishes every frame, serialized like PubMaster.send"""
+  dat = new_message('controlsState')
+  dat.valid = True
+  controlsState = dat.controlsState
+  controlsState.alertText1 = ""
+  controlsState.alertText2 = ""
+  controlsState.canMonoTimes = list(CS.canMonoTimes)
+  controlsState.enabled = True
+  controlsState.active = True
+  controlsState.vPid = 20.
+  controlsState.vCruise = 80.
+  controlsState.aTarget = 0.5
+  controlsState.lateralControlState.init('pidState').p = 0.1
+  ret = [dat.to_bytes()]
+
+  cs_send = new_message('carState')
+  cs_send.carState = CS
+  cs_send.carState.events = car_events
+  ret.append(cs_send.to_bytes())
+
+  ce_send = new_message('carEvents', len(car_events))
+  ce_send.carEvents = car_events
+  ret.append(ce_send.to_bytes())
+
+  cc_send = new_message('carControl')
+  cc_send.carControl = CC
+  ret.append(cc_send.to_bytes())
+  return ret
+
+
+def without_time(dat):
+  msg = log.Event.from_bytes(dat).as_builder()
+  msg.logMonoTime = 0
+  return msg.to_bytes()
+
+
+class TestNewMessage(unittest.TestCase):
+  def setUp(self):
+    self.CS = car.CarState.new_message(vEgo=20., aEgo=0.1, steeringAngleDeg=2., gas=0.1, canMonoTimes=[1, 2, 3])
+    self.CC = car.CarControl.new_message(enabled=True, active=True)
+    self.CC.actuators.steer = 0.2
+    self.car_events = [car.CarEvent.new_message(name=car.CarEvent.EventName.ldw, warning=True)]
+
+  def test_template_equals_old(self):
+    for s in service_list:
+      for size in [None, 0, 3]:
+        try:
+          old = new_message_old(s, size)
+        except Exception:
+          with self.assertRaises(Exception):
+            messaging.new_message(s, size)
+          continue
+        new = messaging.new_message(s, size)
+        self.assertGreater(new.logMonoTime, 0)
+        new.logMonoTime = old.logMonoTime
+        self.assertEqual(new.to_bytes(), old.to_bytes(), s)
+
+    old = controlsd_publish(new_message_old, self.CS, self.CC, self.car_events)
+    new = controlsd_publish(messaging.new_message, self.CS, self.CC, self.car_events)
+    self.assertEqual([without_time(d) for d in new], [without_time(d) for d in old])
+
+  def test_template_not_shared(self):
+    first = messaging.new_message('carControl')
+    first.carControl.actuators.steer = 0.5
+    second = messaging.new_message('carControl')
+    self.assertEqual(second.carControl.actuators.steer, 0.)
+    self.assertEqual(first.carControl.actuators.steer, 0.5)
+
+
+if __name__ == "__main__":
+  unittest.main()
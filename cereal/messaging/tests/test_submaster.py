@@ -0,0 +1,66 @@
+import random
+import unittest
+
+from cereal import log
+import cereal.messaging as messaging
+
+# services controlsd subscribes to
+CONTROLSD_SERVICES = ['deviceState', 'pandaState', 'modelV2', 'liveCalibration', 'ubloxRaw',
+                      'driverMonitoringState', 'longitudinalPlan', 'lateralPlan', 'liveLocationKalman',
+                      'roadCameraState', 'driverCameraState', 'managerState', 'liveParameters', 'radarState']
+
+
+def random_msg(s):
+  try:
+    msg = messaging.new_message(s)
+  except Exception:
+    msg = messaging.new_message(s, 0)
+  msg.logMonoTime = random.getrandbits(63)
+  msg.valid = random.random() > 0.5
+  return msg.to_bytes()
+
+
+def synthetic_frames(n):
+  # every service updates in every frame
+  return [[random_msg(s) for s in CONTROLSD_SERVICES] for _ in range(n)]
+
+
+class TestSubMaster(unittest.TestCase):
+  def test_peek_event(self):
+    for s in CONTROLSD_SERVICES + ['can', 'sendcan', 'carState']:
+      dat = random_msg(s)
+      msg = log.Event.from_bytes(dat)
+      self.assertEqual(messaging.peek_event(dat), (msg.which(), msg.logMonoTime, msg.valid))
+
+  def test_lazy_equal_eager(self):
+    frames = synthetic_frames(20)
+    sm = messaging.SubMaster(CONTROLSD_SERVICES, addr=None)
+    sm_lazy = messaging.SubMaster(CONTROLSD_SERVICES, addr=None, lazy=True)
+    for i, frame in enumerate(frames):
+      # drop some services every other frame
+      msgs = frame[::2] if i % 2 else frame
+      sm.update_msgs(i * 0.01, [log.Event.from_bytes(m) for m in msgs])
+      sm_lazy.update_msgs(i * 0.01, msgs)
+
+      self.assertEqual(sm.updated, sm_lazy.updated)
+      self.assertEqual(sm.valid, sm_lazy.valid)
+      self.assertEqual(sm.logMonoTime, sm_lazy.logMonoTime)
+      self.assertEqual(sm.alive, sm_lazy.alive)
+      for s in CONTROLSD_SERVICES:
+        self.assertEqual(str(sm[s]), str(sm_lazy[s]))
+
+  def test_lazy_decodes_on_access(self):
+    frames = synthetic_frames(2)
+    sm = messaging.SubMaster(CONTROLSD_SERVICES, addr=None, lazy=True)
+    for i, frame in enumerate(frames):
+      sm.update_msgs(i * 0.01, frame)
+      sm.all_alive_and_valid()
+      self.assertEqual(set(sm.raw), set(CONTROLSD_SERVICES))
+
+      # only the services read in this frame are decoded
+      sm['lateralPlan']
+      sm['longitudinalPlan']
+      self.assertEqual(set(sm.raw), set(CONTROLSD_SERVICES) - {'lateralPlan', 'longitudinalPlan'})
+
+if __name__ == "__main__":
+  unittest.main()
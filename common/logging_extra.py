@@ -40,7 +40,10 @@ class SwagFormatter(logging.Formatter):
       except (ValueError, TypeError):
         record_dict['msg'] = [record.msg]+record.args
 
-    record_dict['ctx'] = self.swaglogger.get_ctx()
+    # handlers that format on another thread capture the context up front
+    record_dict['ctx'] = getattr(record, 'swag_ctx', None)
+    if record_dict['ctx'] is None:
+      record_dict['ctx'] = self.swaglogger.get_ctx()
 
     if record.exc_info:
       record_dict['exc_info'] = self.formatException(record.exc_info)
@@ -1,8 +1,188 @@
-from common.params_pyx import Params, UnknownKeyName, put_nonblocking # pylint: disable=no-name-in-module, import-error
+import os
+import ctypes
+import struct
+import threading
+
+from common.params_pyx import Params, UnknownKeyName, put_nonblocking, ensure_bytes # pylint: disable=no-name-in-module, import-error
 assert Params
 assert UnknownKeyName
 assert put_nonblocking
 
+# inotify(7)
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_CLOEXEC = 0o2000000
+
+INOTIFY_EVENT = struct.Struct("iIII")
+PARAMS_WATCH_MASK = IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_DELETE | IN_DELETE_SELF
+
+
+def _inotify_watch(path, mask):
+  """Returns a blocking inotify fd watching path, or None if inotify is unavailable."""
+  try:
+    libc = ctypes.CDLL(None, use_errno=True)
+    fd = libc.inotify_init1(IN_CLOEXEC)
+  except (OSError, AttributeError):
+    return None
+  if fd < 0:
+    return None
+
+  if libc.inotify_add_watch(fd, path.encode(), mask) < 0:
+    os.close(fd)
+    return None
+  return fd
+
+
+class _ParamsWatcher():
+  """Shared cache state for one params directory, invalidated from a background thread."""
+  def __init__(self, d):
+    self.params = Params(d)
+    self.path = os.path.join(self.params.get_params_path(), "d")
+    self.fd = None
+    self._reset()
+    os.register_at_fork(after_in_child=self._reset)
+
+  def _reset(self):
+    # after a fork the inotify fd is shared with the parent and the thread is gone
+    if self.fd is not None:
+      os.close(self.fd)
+    self.fd = None
+    self.started = False
+    self.lock = threading.Lock()
+    self.generation = 0
+    self.values = {}
+    self.decoded = {}
+
+  def start(self):
+    self.started = True
+    self.fd = _inotify_watch(self.path, PARAMS_WATCH_MASK)
+    if self.fd is not None:
+      threading.Thread(target=self._watch, args=(self.fd,), daemon=True).start()
+
+  def _watch(self, fd):
+    while True:
+      try:
+        buf = os.read(fd, 4096)
+      except OSError:
+        break
+
+      changed = []
+      clear = False
+      i = 0
+      while i + INOTIFY_EVENT.size <= len(buf):
+        _, mask, _, name_len = INOTIFY_EVENT.unpack_from(buf, i)
+        i += INOTIFY_EVENT.size
+        changed.append(buf[i:i + name_len].rstrip(b"\0"))
+        i += name_len
+        clear |= bool(mask & (IN_Q_OVERFLOW | IN_IGNORED | IN_DELETE_SELF))
+
+      with self.lock:
+        self.generation += 1
+        if clear:
+          self.values.clear()
+          self.decoded.clear()
+        for key in changed:
+          self.values.pop(key, None)
+          self.decoded.pop(key, None)
+
+      if clear and not os.path.isdir(self.path):
+        # params dir is gone, stop caching and read through from now on
+        self.fd = None
+        os.close(fd)
+        break
+
+  def get(self, key):
+    if not self.started:
+      self.start()
+    if self.fd is None:
+      return self.params.get(key)
+
+    try:
+      return self.values[key]
+    except KeyError:
+      pass
+
+    generation = self.generation
+    val = self.params.get(key)
+    with self.lock:
+      # only cache if no change notification arrived while reading
+      if generation == self.generation:
+        self.values[key] = val
+    return val
+
+  def get_decoded(self, key, conv, default):
+    if self.fd is not None:
+      try:
+        return self.decoded[key][conv]
+      except KeyError:
+        pass
+
+    generation = self.generation
+    val = self.get(key)
+    try:
+      ret = default if val is None else conv(val)
+    except ValueError:
+      ret = default
+
+    if self.fd is not None:
+      with self.lock:
+        if generation == self.generation:
+          self.decoded.setdefault(key, {})[conv] = ret
+    return ret
+
+
+_watchers = {}
+_watchers_lock = threading.Lock()
+
+
+def _to_bool(val):
+  return val.strip() == b"1"
+
+
+_decoders = {}
+
+
+def _decoder(encoding):
+  if encoding not in _decoders:
+    _decoders[encoding] = lambda val: val.decode(encoding)
+  return _decoders[encoding]
+
+
+class CachedParams():
+  """Read-only Params for hot loops.
+
+  Values are kept in memory per process and invalidated through inotify on the
+  params directory whenever any process writes or deletes a key, so repeated
+  reads cost a dict lookup instead of a file read. When inotify is not
+  available every read falls through to Params.get.
+  """
+  def __init__(self, d=None):
+    with _watchers_lock:
+      if d not in _watchers:
+        _watchers[d] = _ParamsWatcher(d)
+      self._w = _watchers[d]
+
+  def get(self, key, encoding=None):
+    key = ensure_bytes(key)
+    if encoding is not None:
+      return self._w.get_decoded(key, _decoder(encoding), None)
+    return self._w.get(key)
+
+  def get_int(self, key, default=0):
+    return self._w.get_decoded(ensure_bytes(key), int, default)
+
+  def get_float(self, key, default=0.):
+    return self._w.get_decoded(ensure_bytes(key), float, default)
+
+  def get_bool(self, key):
+    return self._w.get_decoded(ensure_bytes(key), _to_bool, False)
+
+
 if __name__ == "__main__":
   import sys
   from common.params_pyx import keys # pylint: disable=no-name-in-module, import-error
@@ -12,5 +12,6 @@ cdef extern from "selfdrive/common/params.h":
     Params(bool)
     Params(string)
     string get(string, bool) nogil
+    string get_params_path()
     int delete_db_value(string)
     int write_db_value(string, string)
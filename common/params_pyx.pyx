@@ -258,6 +258,9 @@ cdef class Params:
     key = ensure_bytes(key)
     self.p.delete_db_value(key)
 
+  def get_params_path(self):
+    return self.p.get_params_path().decode()
+
 
 def put_nonblocking(key, val, d=None):
   def f(key, val):
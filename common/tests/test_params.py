@@ -0,0 +1,64 @@
+import os
+import time
+import shutil
+import tempfile
+import unittest
+
+from common.params import Params, CachedParams
+
+
+class TestCachedParams(unittest.TestCase):
+  def setUp(self):
+    self.tmpdir = tempfile.mkdtemp()
+    self.params = Params(self.tmpdir)
+    self.params.put("CarModel", "1")
+    self.cached = CachedParams(self.tmpdir)
+
+  def tearDown(self):
+    shutil.rmtree(self.tmpdir)
+
+  def _wait_for(self, f, timeout=1.0):
+    start = time.monotonic()
+    while not f() and time.monotonic() - start < timeout:
+      time.sleep(0.01)
+    return f()
+
+  def test_typed_get(self):
+    self.params.put("LdwsCarFix", "1")
+    self.params.put("SteerMaxAdj", "3.5")
+    self.assertEqual(self.cached.get_int("LdwsCarFix"), 1)
+    self.assertEqual(self.cached.get_float("SteerMaxAdj"), 3.5)
+    self.assertTrue(self.cached.get_bool("LdwsCarFix"))
+    self.assertEqual(self.cached.get("LdwsCarFix"), b"1")
+    self.assertEqual(self.cached.get("LdwsCarFix", encoding="utf8"), "1")
+
+  def test_missing_key_default(self):
+    self.assertIsNone(self.cached.get("UserOption1"))
+    self.assertEqual(self.cached.get_int("UserOption1", 7), 7)
+    self.assertFalse(self.cached.get_bool("UserOption1"))
+
+  def test_invalidated_on_put(self):
+    self.assertEqual(self.cached.get_int("CarModel"), 1)
+    self.params.put("CarModel", "2")
+    self.assertTrue(self._wait_for(lambda: self.cached.get_int("CarModel") == 2))
+
+  def test_invalidated_on_delete(self):
+    self.assertEqual(self.cached.get("CarModel"), b"1")
+    self.params.delete("CarModel")
+    self.assertTrue(self._wait_for(lambda: self.cached.get("CarModel") is None))
+
+  def test_params_dir_removed(self):
+    self.assertEqual(self.cached.get("CarModel"), b"1")
+    fd = self.cached._w.fd
+    self.assertIsNotNone(fd)
+
+    shutil.rmtree(self.tmpdir)
+    self.assertTrue(self._wait_for(lambda: self.cached._w.fd is None))
+    self.assertIsNone(self.cached.get("CarModel"))
+    # the inotify fd is closed
+    with self.assertRaises(OSError):
+      os.fstat(fd)
+    os.mkdir(self.tmpdir)
+
+if __name__ == "__main__":
+  unittest.main()
@@ -3,6 +3,7 @@
 #include <vector>
 #include <map>
 #include <unordered_map>
+#include <unordered_set>
 
 #include "common_dbc.h"
 #include <capnp/dynamic.h>
@@ -31,6 +32,7 @@ public:
   unsigned int size;
 
   std::vector<Signal> parse_sigs;
+  std::vector<int> sig_ids;
   std::vector<double> vals;
 
   uint16_t ts;
@@ -54,6 +56,9 @@ private:
 
   const DBC *dbc = NULL;
   std::unordered_map<uint32_t, MessageState> message_states;
+  std::unordered_set<uint32_t> updated_addresses;
+
+  void query_state(const MessageState &state, std::vector<SignalValue> &ret);
 
 public:
   bool can_valid = false;
@@ -65,11 +70,13 @@ public:
   CANParser(int abus, const std::string& dbc_name, bool ignore_checksum, bool ignore_counter);
   #ifndef DYNAMIC_CAPNP
   void update_string(const std::string &data, bool sendcan);
+  int update_strings(const std::vector<std::string> &data, bool sendcan);
   void UpdateCans(uint64_t sec, const capnp::List<cereal::CanData>::Reader& cans);
   #endif
   void UpdateCans(uint64_t sec, const capnp::DynamicStruct::Reader& cans);
   void UpdateValid(uint64_t sec);
   std::vector<SignalValue> query_latest();
+  std::vector<SignalValue> query_updated();
 };
 
 class CANPacker {
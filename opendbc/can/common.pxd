@@ -64,6 +64,7 @@ cdef extern from "common_dbc.h":
     uint16_t ts
     const char* name
     double value
+    int sig_id
 
   cdef struct SignalPackValue:
     const char * name
@@ -77,7 +78,9 @@ cdef extern from "common.h":
     bool can_valid
     CANParser(int, string, vector[MessageParseOptions], vector[SignalParseOptions])
     void update_string(string, bool)
+    int update_strings(vector[string], bool)
     vector[SignalValue] query_latest()
+    vector[SignalValue] query_updated()
 
   cdef cppclass CANPacker:
    CANPacker(string)
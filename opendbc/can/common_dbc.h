@@ -28,6 +28,7 @@ struct SignalValue {
   uint16_t ts;
   const char* name;
   double value;
+  int sig_id;  // index in the requested signals, -1 for checksums and counters
 };
 
 enum SignalType {
@@ -147,12 +147,14 @@ CANParser::CANParser(int abus, const std::string& dbc_name,
       const Signal *sig = &msg->sigs[i];
       if (sig->type != SignalType::DEFAULT) {
         state.parse_sigs.push_back(*sig);
+        state.sig_ids.push_back(-1);
         state.vals.push_back(0);
       }
     }
 
     // track requested signals for this message
-    for (const auto& sigop : sigoptions) {
+    for (int j = 0; j < sigoptions.size(); j++) {
+      const auto& sigop = sigoptions[j];
       if (sigop.address != op.address) continue;
 
       for (int i = 0; i < msg->num_sigs; i++) {
@@ -160,6 +162,7 @@ CANParser::CANParser(int abus, const std::string& dbc_name,
         if (strcmp(sig->name, sigop.name) == 0
             && sig->type == SignalType::DEFAULT) {
           state.parse_sigs.push_back(*sig);
+          state.sig_ids.push_back(j);
           state.vals.push_back(sigop.default_value);
           break;
         }
@@ -188,6 +191,7 @@ CANParser::CANParser(int abus, const std::string& dbc_name, bool ignore_checksum
     for (int j = 0; j < msg->num_sigs; j++) {
       const Signal *sig = &msg->sigs[j];
       state.parse_sigs.push_back(*sig);
+      state.sig_ids.push_back(-1);
       state.vals.push_back(0);
     }
 
@@ -216,6 +220,22 @@ void CANParser::update_string(const std::string &data, bool sendcan) {
   UpdateValid(last_sec);
 }
 
+// Parses a batch of strings. Afterwards query_updated returns the latest values
+// of all messages received anywhere in the batch.
+// Returns the index of the last string after which CAN was valid, -1 if none.
+int CANParser::update_strings(const std::vector<std::string> &data, bool sendcan) {
+  int last_valid = -1;
+  updated_addresses.clear();
+
+  for (int i = 0; i < data.size(); i++) {
+    update_string(data[i], sendcan);
+    if (can_valid) {
+      last_valid = i;
+    }
+  }
+  return last_valid;
+}
+
 void CANParser::UpdateCans(uint64_t sec, const capnp::List<cereal::CanData>::Reader& cans) {
   int msg_count = cans.size();
 
@@ -238,7 +258,9 @@ void CANParser::UpdateCans(uint64_t sec, const capnp::List<cereal::CanData>::Rea
     uint8_t dat[8] = {0};
     memcpy(dat, cmsg.getDat().begin(), cmsg.getDat().size());
 
-    state_it->second.parse(sec, cmsg.getBusTime(), dat);
+    if (state_it->second.parse(sec, cmsg.getBusTime(), dat)) {
+      updated_addresses.insert(state_it->first);
+    }
   }
 }
 #endif
@@ -262,7 +284,9 @@ void CANParser::UpdateCans(uint64_t sec, const capnp::DynamicStruct::Reader& cms
   if (dat.size() > 8) return; //shouldn't ever happen
   uint8_t data[8] = {0};
   memcpy(data, dat.begin(), dat.size());
-  state_it->second.parse(sec, cmsg.get("busTime").as<uint16_t>(), data);
+  if (state_it->second.parse(sec, cmsg.get("busTime").as<uint16_t>(), data)) {
+    updated_addresses.insert(state_it->first);
+  }
 }
 
 void CANParser::UpdateValid(uint64_t sec) {
@@ -278,6 +302,19 @@ void CANParser::UpdateValid(uint64_t sec) {
   }
 }
 
+void CANParser::query_state(const MessageState &state, std::vector<SignalValue> &ret) {
+  for (int i=0; i<state.parse_sigs.size(); i++) {
+    const Signal &sig = state.parse_sigs[i];
+    ret.push_back((SignalValue){
+      .address = state.address,
+      .ts = state.ts,
+      .name = sig.name,
+      .value = state.vals[i],
+      .sig_id = state.sig_ids[i],
+    });
+  }
+}
+
 std::vector<SignalValue> CANParser::query_latest() {
   std::vector<SignalValue> ret;
 
@@ -285,15 +322,17 @@ std::vector<SignalValue> CANParser::query_latest() {
     const auto& state = kv.second;
     if (last_sec != 0 && state.seen != last_sec) continue;
 
-    for (int i=0; i<state.parse_sigs.size(); i++) {
-      const Signal &sig = state.parse_sigs[i];
-      ret.push_back((SignalValue){
-        .address = state.address,
-        .ts = state.ts,
-        .name = sig.name,
-        .value = state.vals[i],
-      });
-    }
+    query_state(state, ret);
+  }
+
+  return ret;
+}
+
+std::vector<SignalValue> CANParser::query_updated() {
+  std::vector<SignalValue> ret;
+
+  for (uint32_t address : updated_addresses) {
+    query_state(message_states[address], ret);
   }
 
   return ret;
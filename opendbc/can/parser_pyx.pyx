@@ -13,6 +13,7 @@ from .common cimport SignalParseOptions, MessageParseOptions, dbc_lookup, Signal
 
 import os
 import numbers
+import numpy as np
 from collections import defaultdict
 
 cdef int CAN_INVALID_CNT = 5
@@ -25,6 +26,8 @@ cdef class CANParser:
     map[uint32_t, string] address_to_msg_name
     vector[SignalValue] can_values
     bool test_mode_enabled
+    double[::1] vl_view
+    double[::1] ts_view
 
   cdef readonly:
     string dbc_name
@@ -32,8 +35,16 @@ cdef class CANParser:
     dict ts
     bool can_valid
     int can_invalid_cnt
-
-  def __init__(self, dbc_name, signals, checks=None, bus=0):
+    bool export_dicts
+    object vl_array
+    object ts_array
+    dict sig_index
+
+  def __init__(self, dbc_name, signals, checks=None, bus=0, export_dicts=True):
+    """Besides the vl/ts dicts, the latest value and timestamp of every requested
+    signal is kept in vl_array/ts_array, indexed by its position in signals. Look up
+    the index with sig_index[(msg, sig_name)], msg being the message name or address.
+    With export_dicts=False the dicts are not filled."""
     if checks is None:
       checks = []
     self.can_valid = True
@@ -43,6 +54,7 @@ cdef class CANParser:
       raise RuntimeError("Can't lookup" + dbc_name)
     self.vl = {}
     self.ts = {}
+    self.export_dicts = export_dicts
 
     self.can_invalid_cnt = CAN_INVALID_CNT
 
@@ -67,6 +79,16 @@ cdef class CANParser:
         s = (s[0], self.msg_name_to_address[name], s[2])
         signals[i] = s
 
+    self.sig_index = {}
+    for i, (sig_name, sig_address, _) in enumerate(signals):
+      msg_name = <unicode>self.address_to_msg_name[sig_address].c_str()
+      self.sig_index[(sig_address, sig_name)] = i
+      self.sig_index[(msg_name, sig_name)] = i
+    self.vl_array = np.array([sig_default for _, _, sig_default in signals], dtype=np.float64)
+    self.ts_array = np.zeros(len(signals), dtype=np.float64)
+    self.vl_view = self.vl_array
+    self.ts_view = self.ts_array
+
     for i in range(len(checks)):
       c = checks[i]
       if not isinstance(c[0], numbers.Number):
@@ -96,10 +118,7 @@ cdef class CANParser:
     self.update_vl()
 
   cdef unordered_set[uint32_t] update_vl(self):
-    cdef string sig_name
-    cdef unordered_set[uint32_t] updated_val
-
-    can_values = self.can.query_latest()
+    self.can_values = self.can.query_latest()
     valid = self.can.can_valid
 
     # Update invalid flag
@@ -108,17 +127,26 @@ cdef class CANParser:
         self.can_invalid_cnt = 0
     self.can_valid = self.can_invalid_cnt < CAN_INVALID_CNT
 
+    return self.export_values()
 
-    for cv in can_values:
-      # Cast char * directly to unicode
-      name = <unicode>self.address_to_msg_name[cv.address].c_str()
-      cv_name = <unicode>cv.name
+  cdef unordered_set[uint32_t] export_values(self):
+    cdef unordered_set[uint32_t] updated_val
 
-      self.vl[cv.address][cv_name] = cv.value
-      self.ts[cv.address][cv_name] = cv.ts
+    for cv in self.can_values:
+      if cv.sig_id >= 0:
+        self.vl_view[cv.sig_id] = cv.value
+        self.ts_view[cv.sig_id] = cv.ts
 
-      self.vl[name][cv_name] = cv.value
-      self.ts[name][cv_name] = cv.ts
+      if self.export_dicts:
+        # Cast char * directly to unicode
+        name = <unicode>self.address_to_msg_name[cv.address].c_str()
+        cv_name = <unicode>cv.name
+
+        self.vl[cv.address][cv_name] = cv.value
+        self.ts[cv.address][cv_name] = cv.ts
+
+        self.vl[name][cv_name] = cv.value
+        self.ts[name][cv_name] = cv.ts
 
       updated_val.insert(cv.address)
 
@@ -129,13 +157,21 @@ cdef class CANParser:
     return self.update_vl()
 
   def update_strings(self, strings, sendcan=False):
-    updated_vals = set()
+    cdef vector[string] strings_v = strings
+    cdef int n = strings_v.size()
 
-    for s in strings:
-      updated_val = self.update_string(s, sendcan)
-      updated_vals.update(updated_val)
+    # parse the whole batch natively, then export each updated message once
+    last_valid = self.can.update_strings(strings_v, sendcan)
+
+    # same invalid count as calling update_string on every string
+    if last_valid < 0:
+      self.can_invalid_cnt += n
+    else:
+      self.can_invalid_cnt = n - 1 - last_valid
+    self.can_valid = self.can_invalid_cnt < CAN_INVALID_CNT
 
-    return updated_vals
+    self.can_values = self.can.query_updated()
+    return self.export_values()
 
 cdef class CANDefine():
   cdef:
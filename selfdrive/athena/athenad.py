@@ -1,5 +1,6 @@
 #!/usr/bin/env python3
 import base64
+import bisect
 import hashlib
 import io
 import json
@@ -16,6 +17,7 @@ from typing import Any
 
 import requests
 from jsonrpc import JSONRPCResponseManager, dispatcher
+from jsonrpc.exceptions import JSONRPCDispatchException, JSONRPCInvalidParams
 from websocket import ABNF, WebSocketTimeoutException, create_connection
 
 import cereal.messaging as messaging
@@ -36,6 +38,7 @@ dispatcher["echo"] = lambda s: s
 payload_queue: Any = queue.Queue()
 response_queue: Any = queue.Queue()
 upload_queue: Any = queue.Queue()
+upload_items: Any = {}  # id -> item of everything in upload_queue, in queue order
 cancelled_uploads: Any = set()
 UploadItem = namedtuple('UploadItem', ['path', 'url', 'headers', 'created_at', 'id'])
 
@@ -83,6 +86,7 @@ def upload_handler(end_event):
   while not end_event.is_set():
     try:
       item = upload_queue.get(timeout=1)
+      upload_items.pop(item.id, None)
       if item.id in cancelled_uploads:
         cancelled_uploads.remove(item.id)
         continue
@@ -117,10 +121,99 @@ def getMessage(service=None, timeout=1000):
   return ret.to_dict()
 
 
+class DataDirectoryIndex():
+  """Sorted listing of all files under root.
+
+  Every refresh stats each directory, but only lists the ones whose mtime
+  changed since they were last listed.
+  """
+  def __init__(self, root):
+    self.root = root
+    self.lock = threading.Lock()
+    self.dirs = {}  # relative path -> (mtime, file names, subdirectory names), names sorted
+    self.sorted_dirs = []
+
+  def refresh_dir(self, rel_path, seen):
+    seen.add(rel_path)
+    path = os.path.join(self.root, rel_path)
+    try:
+      mtime = os.stat(path).st_mtime_ns
+    except OSError:
+      return
+
+    cached = self.dirs.get(rel_path)
+    if cached is None or cached[0] != mtime:
+      files, subdirs = [], []
+      try:
+        with os.scandir(path) as it:
+          for entry in it:
+            if not entry.is_dir():
+              files.append(entry.name)
+            elif not entry.is_symlink():
+              subdirs.append(entry.name)
+      except OSError:
+        pass
+
+      # a file created right after listing can leave the mtime unchanged, list recent directories again
+      if time.time_ns() - mtime < 1e9:
+        mtime = None
+      cached = self.dirs[rel_path] = (mtime, sorted(files), subdirs)
+
+    for d in cached[2]:
+      self.refresh_dir(os.path.join(rel_path, d), seen)
+
+  def refresh(self):
+    seen = set()
+    self.refresh_dir('', seen)
+    for rel_path in self.dirs.keys() - seen:
+      del self.dirs[rel_path]
+    if len(self.sorted_dirs) != len(self.dirs) or not all(d in self.dirs for d in self.sorted_dirs):
+      self.sorted_dirs = sorted(self.dirs)
+
+  def list(self, prefix='', cursor=None, limit=None):
+    """Paths starting with prefix that come after cursor, at most limit of them"""
+    with self.lock:
+      self.refresh()
+
+      files = []
+      start_dir, start_name = os.path.split(cursor) if cursor else ('', None)
+      for i in range(bisect.bisect_left(self.sorted_dirs, start_dir), len(self.sorted_dirs)):
+        rel_path = self.sorted_dirs[i]
+        names = self.dirs[rel_path][1]
+        dir_prefix = os.path.join(rel_path, '')
+
+        lo, hi = 0, len(names)
+        if len(prefix) > len(dir_prefix):
+          if not prefix.startswith(dir_prefix):
+            continue
+          name_prefix = prefix[len(dir_prefix):]
+          lo = bisect.bisect_left(names, name_prefix)
+          hi = bisect.bisect_left(names, name_prefix + '\U0010ffff')
+        elif not dir_prefix.startswith(prefix):
+          continue
+        if rel_path == start_dir and start_name is not None:
+          lo = max(lo, bisect.bisect_right(names, start_name))
+
+        files += [dir_prefix + name for name in names[lo:hi]]
+        if limit is not None and len(files) >= limit:
+          return files[:limit]
+      return files
+
+
+data_directory = DataDirectoryIndex(ROOT)
+
+
+@dispatcher.add_method
+def listDataDirectory(prefix=''):
+  return data_directory.list(prefix)
+
+
 @dispatcher.add_method
-def listDataDirectory():
-  files = [os.path.relpath(os.path.join(dp, f), ROOT) for dp, dn, fn in os.walk(ROOT) for f in fn]
-  return files
+def listDataDirectoryPage(prefix='', cursor=None, limit=1000):
+  if not isinstance(limit, int) or isinstance(limit, bool) or limit < 1:
+    raise JSONRPCDispatchException(JSONRPCInvalidParams.CODE, "limit must be a positive integer")
+  files = data_directory.list(prefix, cursor, limit + 1)
+  return {"files": files[:limit], "cursor": files[limit - 1] if len(files) > limit else None}
 
 
 @dispatcher.add_method
@@ -151,6 +244,7 @@ def uploadFileToUrl(fn, url, headers):
   upload_id = hashlib.sha1(str(item).encode()).hexdigest()
   item = item._replace(id=upload_id)
 
+  upload_items[upload_id] = item
   upload_queue.put_nowait(item)
 
   return {"enqueued": 1, "item": item._asdict()}
@@ -158,13 +252,13 @@ def uploadFileToUrl(fn, url, headers):
 
 @dispatcher.add_method
 def listUploadQueue():
-  return [item._asdict() for item in list(upload_queue.queue)]
+  # list() of a dict view is atomic, the upload thread can remove items meanwhile
+  return [item._asdict() for item in list(upload_items.values())]
 
 
 @dispatcher.add_method
 def cancelUpload(upload_id):
-  upload_ids = set(item.id for item in list(upload_queue.queue))
-  if upload_id not in upload_ids:
+  if upload_id not in upload_items:
     return 404
 
   cancelled_uploads.add(upload_id)
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+import json
+import os
+import shutil
+import tempfile
+import unittest
+import unittest.mock
+
+from selfdrive.athena import athenad
+from selfdrive.athena.athenad import DataDirectoryIndex
+
+
+def listDataDirectory_old(root):
+  return [os.path.relpath(os.path.join(dp, f), root) for dp, dn, fn in os.walk(root) for f in fn]
+
+
+class TestAthenad(unittest.TestCase):
+  def setUp(self):
+    self.root = tempfile.mkdtemp()
+    self.index = DataDirectoryIndex(self.root)
+    self.patchers = [unittest.mock.patch.object(athenad, "data_directory", self.index),
+                     unittest.mock.patch.object(athenad, "ROOT", self.root)]
+    for p in self.patchers:
+      p.start()
+
+  def tearDown(self):
+    for p in self.patchers:
+      p.stop()
+    shutil.rmtree(self.root)
+    athenad.upload_items.clear()
+    athenad.cancelled_uploads.clear()
+    athenad.upload_queue = athenad.queue.Queue()
+
+  def make_tree(self, n_dirs, n_files):
+    for i in range(n_dirs):
+      path = os.path.join(self.root, f"2021-03-{1 + i // 1000:02d}--{i // 10 % 100:02d}-00-00--{i % 10}")
+      os.mkdir(path)
+      for j in range(n_files):
+        open(os.path.join(path, f"file{j}.bz2"), "w").close()
+
+  def touch(self, path):
+    os.makedirs(os.path.dirname(os.path.join(self.root, path)), exist_ok=True)
+    open(os.path.join(self.root, path), "w").close()
+
+  def test_list_data_directory(self):
+    self.make_tree(20, 5)
+    self.touch("crash/error.log")
+    self.touch("boot/a/b.bz2")
+    self.touch("top.txt")
+    self.assertEqual(sorted(athenad.listDataDirectory()), sorted(listDataDirectory_old(self.root)))
+
+    # changes are picked up by the next call
+    self.touch("2021-03-01--00-00-00--0/qlog.bz2")
+    shutil.rmtree(os.path.join(self.root, "2021-03-01--00-00-00--1"))
+    os.unlink(os.path.join(self.root, "top.txt"))
+    files = athenad.listDataDirectory()
+    self.assertEqual(sorted(files), sorted(listDataDirectory_old(self.root)))
+
+    for prefix in ["", "2021-03-01--00-00-00--0", "2021-03-01--00-00-00--0/", "2021-03-01--00-00-00--0/file",
+                   "2021-03-01--01", "boot/a", "boot/a/b", "crash/error.log", "nope"]:
+      self.assertEqual(athenad.listDataDirectory(prefix), [f for f in files if f.startswith(prefix)], prefix)
+
+  def test_pagination(self):
+    self.make_tree(30, 7)
+    self.touch("crash/error.log")
+    files = athenad.listDataDirectory()
+
+    for prefix in ["", "2021-03-01--01", "crash"]:
+      for limit in [1, 3, 7, 50, 1000]:
+        pages, cursor = [], None
+        while True:
+          page = athenad.listDataDirectoryPage(prefix, cursor, limit)
+          self.assertLessEqual(len(page["files"]), limit)
+          pages += page["files"]
+          cursor = page["cursor"]
+          if cursor is None:
+            break
+        self.assertEqual(pages, [f for f in files if f.startswith(prefix)])
+
+  def test_pagination_invalid_limit(self):
+    self.touch("crash/error.log")
+    for limit in [None, 0, -1, 1.5, "10", True]:
+      request = {"jsonrpc": "2.0", "id": 0, "method": "listDataDirectoryPage", "params": {"limit": limit}}
+      response = athenad.JSONRPCResponseManager.handle(json.dumps(request), athenad.dispatcher)
+      self.assertEqual(response.data["error"]["code"], -32602, limit)
+
+  def test_upload_queue(self):
+    self.touch("2021-03-01--00-00-00--0/qlog.bz2")
+    items = [athenad.uploadFileToUrl("2021-03-01--00-00-00--0/qlog.bz2", f"https://example.com/{i}", {})["item"] for i in range(3)]
+    self.assertEqual(athenad.listUploadQueue(), items)
+
+    self.assertEqual(athenad.cancelUpload(items[1]["id"]), {"success": 1})
+    self.assertEqual(athenad.cancelUpload("nope"), 404)
+
+    # cancelled items are skipped and dequeued items leave the listing
+    with unittest.mock.patch.object(athenad, "_do_upload") as do_upload:
+      end_event = athenad.threading.Event()
+      do_upload.side_effect = lambda item: end_event.set() if item.id == items[2]["id"] else None
+      athenad.upload_handler(end_event)
+    self.assertEqual([c.args[0].id for c in do_upload.call_args_list], [items[0]["id"], items[2]["id"]])
+    self.assertEqual(athenad.listUploadQueue(), [])
+
+  def test_synthetic_root(self):
+    self.make_tree(5000, 10)
+    self.assertEqual(sorted(athenad.listDataDirectory()), sorted(listDataDirectory_old(self.root)))
+
+if __name__ == "__main__":
+  unittest.main()
@@ -3,6 +3,11 @@
 from libcpp.vector cimport vector
 from libcpp.string cimport string
 from libcpp cimport bool
+from libc.stdint cimport uint8_t, uint16_t, uint32_t
+from libc.string cimport memcpy
+
+import numpy as np
+from selfdrive.boardd.can_batch import CanBatch
 
 cdef struct can_frame:
   long address
@@ -10,9 +15,32 @@ cdef struct can_frame:
   long busTime
   long src
 
+cdef extern from *:
+  """
+  typedef struct {
+    std::vector<uint32_t> address;
+    std::vector<uint16_t> busTime;
+    std::vector<uint8_t> src;
+    std::vector<uint8_t> length;
+    std::vector<uint8_t> dat;
+  } can_columns;
+  """
+  cdef cppclass can_columns:
+    vector[uint32_t] address
+    vector[uint16_t] busTime
+    vector[uint8_t] src
+    vector[uint8_t] length
+    vector[uint8_t] dat
+
 cdef extern void can_list_to_can_capnp_cpp(const vector[can_frame] &can_list, string &out, bool sendCan, bool valid)
+cdef extern void can_batch_to_can_capnp_cpp(size_t n, const uint32_t *address, const uint16_t *busTime, const uint8_t *dat, size_t width,
+                                            const uint8_t *length, const uint8_t *src, string &out, bool sendCan, bool valid)
+cdef extern void can_capnp_to_can_columns_cpp(const vector[string] &strings, can_columns &out, size_t width, bool sendCan)
 
 def can_list_to_can_capnp(can_msgs, msgtype='can', valid=True):
+  if isinstance(can_msgs, CanBatch):
+    return can_batch_to_can_capnp(can_msgs, msgtype, valid)
+
   cdef vector[can_frame] can_list
   cdef can_frame f
   for can_msg in can_msgs:
@@ -24,3 +52,38 @@ def can_list_to_can_capnp(can_msgs, msgtype='can', valid=True):
   cdef string out
   can_list_to_can_capnp_cpp(can_list, out, msgtype == 'sendcan', valid)
   return out
+
+def can_batch_to_can_capnp(batch, msgtype='can', valid=True):
+  cdef const uint32_t[::1] address = np.ascontiguousarray(batch.address)
+  cdef const uint16_t[::1] bus_time = np.ascontiguousarray(batch.bus_time)
+  cdef const uint8_t[:, ::1] dat = np.ascontiguousarray(batch.dat)
+  cdef const uint8_t[::1] length = np.ascontiguousarray(batch.length)
+  cdef const uint8_t[::1] src = np.ascontiguousarray(batch.src)
+  cdef size_t n = address.shape[0]
+  cdef string out
+  if n == 0:
+    return can_list_to_can_capnp([], msgtype, valid)
+
+  can_batch_to_can_capnp_cpp(n, &address[0], &bus_time[0], &dat[0, 0], dat.shape[1], &length[0], &src[0],
+                             out, msgtype == 'sendcan', valid)
+  return out
+
+def can_capnp_to_can_batch(strings, msgtype='can', width=8):
+  """Columns of all CAN frames in a list of serialized can or sendcan events"""
+  cdef can_columns cols
+  can_capnp_to_can_columns_cpp(strings, cols, width, msgtype == 'sendcan')
+
+  cdef size_t n = cols.address.size()
+  batch = CanBatch.empty(n, width)
+  cdef uint32_t[::1] address = batch.address
+  cdef uint16_t[::1] bus_time = batch.bus_time
+  cdef uint8_t[:, ::1] dat = batch.dat
+  cdef uint8_t[::1] length = batch.length
+  cdef uint8_t[::1] src = batch.src
+  if n > 0:
+    memcpy(&address[0], cols.address.data(), n * sizeof(uint32_t))
+    memcpy(&bus_time[0], cols.busTime.data(), n * sizeof(uint16_t))
+    memcpy(&dat[0, 0], cols.dat.data(), n * width)
+    memcpy(&length[0], cols.length.data(), n)
+    memcpy(&src[0], cols.src.data(), n)
+  return batch
@@ -0,0 +1,110 @@
+import struct
+
+import numpy as np
+
+CAN_DATA_LEN = 8  # classic CAN, CAN FD frames carry up to 64 bytes
+
+# a CAN frame on the panda bulk endpoints: two little endian words and 8 data bytes
+CAN_RECORD = np.dtype([('rir', '<u4'), ('dlc', '<u4'), ('dat', 'u1', 8)])
+
+# from this many frames on numpy is faster than packing and unpacking frame by frame
+NUMPY_MIN_FRAMES = 64
+
+
+class CanBatch(object):
+  """CAN frames stored column-wise, one numpy array per field.
+
+  Frame i has the fields of an (address, busTime, dat, src) tuple, with its
+  payload in the first length[i] bytes of row i of dat. Unused payload bytes
+  are zero. Indexing with an int returns that tuple, indexing with a slice
+  or mask returns a CanBatch.
+  """
+  __slots__ = ['address', 'bus_time', 'dat', 'length', 'src']
+
+  def __init__(self, address, bus_time, dat, length, src):
+    self.address = np.asarray(address, dtype=np.uint32)
+    self.bus_time = np.asarray(bus_time, dtype=np.uint16)
+    self.dat = np.asarray(dat, dtype=np.uint8)
+    self.length = np.asarray(length, dtype=np.uint8)
+    self.src = np.asarray(src, dtype=np.uint8)
+
+  @classmethod
+  def empty(cls, n=0, width=CAN_DATA_LEN):
+    return cls(np.zeros(n), np.zeros(n), np.zeros((n, width)), np.zeros(n), np.zeros(n))
+
+  @classmethod
+  def from_list(cls, frames, width=CAN_DATA_LEN):
+    if len(frames) == 0:
+      return cls.empty(0, width)
+
+    address, bus_time, dats, src = zip(*frames)
+    if None in bus_time:
+      bus_time = [t or 0 for t in bus_time]
+    length = np.fromiter(map(len, dats), dtype=np.intp, count=len(dats))
+    assert np.all(length <= width)
+
+    # struct zero pads every payload to the full width
+    dat = np.frombuffer(bytearray(struct.pack(f'{width}s' * len(dats), *dats)), dtype=np.uint8).reshape(len(dats), width)
+    return cls(address, bus_time, dat, length, src)
+
+  @classmethod
+  def concatenate(cls, batches, width=CAN_DATA_LEN):
+    if len(batches) == 0:
+      return cls.empty(0, width)
+    width = max(b.width for b in batches)
+    dat = np.zeros((sum(len(b) for b in batches), width), dtype=np.uint8)
+    i = 0
+    for b in batches:
+      dat[i:i + len(b), :b.width] = b.dat
+      i += len(b)
+    return cls(np.concatenate([b.address for b in batches]), np.concatenate([b.bus_time for b in batches]), dat,
+               np.concatenate([b.length for b in batches]), np.concatenate([b.src for b in batches]))
+
+  @property
+  def width(self):
+    return self.dat.shape[1]
+
+  def to_list(self):
+    address, bus_time, length, src = self.address.tolist(), self.bus_time.tolist(), self.length.tolist(), self.src.tolist()
+    dat = self.dat.tobytes()
+    w = self.width
+    return [(address[i], bus_time[i], dat[i * w:i * w + length[i]], src[i]) for i in range(len(address))]
+
+  def __len__(self):
+    return len(self.address)
+
+  def __iter__(self):
+    return iter(self.to_list())
+
+  def __getitem__(self, idx):
+    if isinstance(idx, (int, np.integer)):
+      return (int(self.address[idx]), int(self.bus_time[idx]), self.dat[idx, :self.length[idx]].tobytes(), int(self.src[idx]))
+    return CanBatch(self.address[idx], self.bus_time[idx], self.dat[idx], self.length[idx], self.src[idx])
+
+  def __eq__(self, other):
+    return isinstance(other, CanBatch) and self.to_list() == other.to_list()
+
+
+def parse_can_buffer_batch(dat):
+  """CanBatch of a buffer read from the panda CAN endpoint"""
+  records = np.frombuffer(dat, dtype=CAN_RECORD, count=len(dat) // CAN_RECORD.itemsize)
+  rir, dlc = records['rir'], records['dlc']
+  extended = (rir & 4) != 0
+  address = np.where(extended, rir >> 3, rir >> 21)
+  length = np.minimum(dlc & 0xF, 8)
+  # zero the bytes past the length, the panda leaves whatever was in its buffer there
+  dat = np.where(np.arange(8) < length[:, None], records['dat'], 0)
+  return CanBatch(address, dlc >> 16, dat, length, (dlc >> 4) & 0xFF)
+
+
+def pack_can_buffer_batch(batch):
+  """Buffer to write to the panda CAN endpoint to send the frames of batch"""
+  assert batch.width == 8 and np.all(batch.length <= 8)
+  transmit = 1
+  extended = 4
+  address = batch.address.astype(np.uint32)
+  records = np.zeros(len(batch), dtype=CAN_RECORD)
+  records['rir'] = np.where(address >= 0x800, (address << 3) | transmit | extended, (address << 21) | transmit)
+  records['dlc'] = batch.length.astype(np.uint32) | (batch.src.astype(np.uint32) << 4)
+  records['dat'] = batch.dat
+  return records.tobytes()
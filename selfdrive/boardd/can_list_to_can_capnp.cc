@@ -1,3 +1,5 @@
+#include <algorithm>
+
 #include "messaging.hpp"
 
 typedef struct {
@@ -7,6 +9,15 @@ typedef struct {
 	long src;
 } can_frame;
 
+// CAN frames column-wise, dat holds width bytes per frame
+typedef struct {
+  std::vector<uint32_t> address;
+  std::vector<uint16_t> busTime;
+  std::vector<uint8_t> src;
+  std::vector<uint8_t> length;
+  std::vector<uint8_t> dat;
+} can_columns;
+
 extern "C" {
 
 void can_list_to_can_capnp_cpp(const std::vector<can_frame> &can_list, std::string &out, bool sendCan, bool valid) {
@@ -26,4 +37,41 @@ void can_list_to_can_capnp_cpp(const std::vector<can_frame> &can_list, std::stri
   out.append((const char *)bytes.begin(), bytes.size());
 }
 
+void can_batch_to_can_capnp_cpp(size_t n, const uint32_t *address, const uint16_t *busTime, const uint8_t *dat, size_t width,
+                                const uint8_t *length, const uint8_t *src, std::string &out, bool sendCan, bool valid) {
+  MessageBuilder msg;
+  auto event = msg.initEvent(valid);
+
+  auto canData = sendCan ? event.initSendcan(n) : event.initCan(n);
+  for (size_t i = 0; i < n; i++) {
+    auto c = canData[i];
+    c.setAddress(address[i]);
+    c.setBusTime(busTime[i]);
+    c.setDat(kj::arrayPtr(dat + i * width, length[i]));
+    c.setSrc(src[i]);
+  }
+  auto bytes = msg.toBytes();
+  out.append((const char *)bytes.begin(), bytes.size());
+}
+
+void can_capnp_to_can_columns_cpp(const std::vector<std::string> &strings, can_columns &out, size_t width, bool sendCan) {
+  AlignedBuffer aligned_buf;
+  for (const auto &s : strings) {
+    capnp::FlatArrayMessageReader cmsg(aligned_buf.get(s.data(), s.size()));
+    cereal::Event::Reader event = cmsg.getRoot<cereal::Event>();
+    auto frames = sendCan ? event.getSendcan() : event.getCan();
+
+    for (auto c : frames) {
+      auto dat = c.getDat();
+      size_t len = std::min(dat.size(), width);
+      out.address.push_back(c.getAddress());
+      out.busTime.push_back(c.getBusTime());
+      out.src.push_back(c.getSrc());
+      out.length.push_back(len);
+      out.dat.insert(out.dat.end(), dat.begin(), dat.begin() + len);
+      out.dat.resize(out.dat.size() + width - len, 0);
+    }
+  }
+}
+
 }
@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+import random
+import struct
+import subprocess
+import sys
+import unittest
+
+import numpy as np
+
+from cereal import log
+from selfdrive.boardd.boardd import can_capnp_to_can_batch, can_capnp_to_can_list, can_list_to_can_capnp
+from selfdrive.boardd.can_batch import CanBatch, parse_can_buffer_batch
+from selfdrive.boardd.panda_can import CanBatchPanda, parse_can_buffer
+
+N_FRAMES = 10000
+
+
+def random_frames(n, seed=0):
+  rnd = random.Random(seed)
+  frames = []
+  for _ in range(n):
+    address = rnd.randint(0x800, 0x1fffffff) if rnd.random() < 0.2 else rnd.randint(0, 0x7ff)
+    frames.append((address, rnd.getrandbits(16), bytes(rnd.getrandbits(8) for _ in range(rnd.randint(0, 8))), rnd.randint(0, 2)))
+  return frames
+
+
+def parse_can_buffer_old(dat):
+  """parse_can_buffer before numpy, one struct.unpack per record"""
+  ret = []
+  for j in range(0, len(dat), 0x10):
+    ddat = dat[j:j + 0x10]
+    f1, f2 = struct.unpack("II", ddat[0:8])
+    extended = 4
+    if f1 & extended:
+      address = f1 >> 3
+    else:
+      address = f1 >> 21
+    dddat = ddat[8:8 + (f2 & 0xF)]
+    ret.append((address, f2 >> 16, dddat, (f2 >> 4) & 0xFF))
+  return ret
+
+
+def pack_can_buffer_old(arr):
+  """The buffer can_send_many wrote before numpy, one struct.pack per frame"""
+  snds = []
+  transmit = 1
+  extended = 4
+  for addr, _, dat, bus in arr:
+    assert len(dat) <= 8
+    if addr >= 0x800:
+      rir = (addr << 3) | transmit | extended
+    else:
+      rir = (addr << 21) | transmit
+    snd = struct.pack("II", rir, len(dat) | (bus << 4)) + dat
+    snd = snd.ljust(0x10, b'\x00')
+    snds.append(snd)
+  return b''.join(snds)
+
+
+class FakeHandle():
+  def __init__(self):
+    self.written = []
+
+  def bulkWrite(self, endpoint, dat, timeout=0):
+    self.written.append(bytes(dat))
+
+
+def panda_buffer(frames):
+  """What the panda sends for frames, as packed by can_send_many"""
+  p = CanBatchPanda.__new__(CanBatchPanda)
+  p.wifi = False
+  p._handle = FakeHandle()
+  p.can_send_many(frames)
+  return p._handle.written[0]
+
+
+class TestCanBatch(unittest.TestCase):
+  def setUp(self):
+    self.frames = random_frames(N_FRAMES)
+    self.batch = CanBatch.from_list(self.frames)
+
+  def test_batch(self):
+    self.assertEqual(self.batch.to_list(), self.frames)
+    self.assertEqual(list(self.batch), self.frames)
+    self.assertEqual(self.batch[3], self.frames[3])
+    self.assertEqual(self.batch[10:20].to_list(), self.frames[10:20])
+    mask = self.batch.src == 1
+    self.assertEqual(self.batch[mask].to_list(), [f for f in self.frames if f[3] == 1])
+    self.assertEqual(CanBatch.concatenate([self.batch[:10], self.batch[10:]]), self.batch)
+    self.assertEqual(len(CanBatch.concatenate([])), 0)
+
+  def test_panda_buffer(self):
+    edge_cases = [(0x7ff, 0, b'\x01', 0), (0x800, 0, b'\x02' * 8, 1), (0x1fffffff, 0, b'', 2), (0, 0, b'', 0)]
+    # below NUMPY_MIN_FRAMES frames are still packed one by one
+    for frames in [edge_cases, self.frames + edge_cases]:
+      self.check_panda_buffer(frames)
+
+  def check_panda_buffer(self, frames):
+    buf = pack_can_buffer_old(frames)
+    self.assertEqual(panda_buffer(frames), buf)
+    self.assertEqual(panda_buffer(CanBatch.from_list(frames)), buf)
+
+    # received frames carry the bus time, the transmit bit is ignored
+    recv = [(a, t, d, s) for (a, _, d, s), t in zip(frames, np.arange(len(frames)) % 0x10000)]
+    rx = bytearray(buf)
+    for i, (_, t, d, _) in enumerate(recv):
+      rx[i * 16 + 6:i * 16 + 8] = int(t).to_bytes(2, 'little')
+      rx[i * 16 + 8 + len(d):i * 16 + 16] = b'\xff' * (8 - len(d))  # stale bytes past the length
+    rx = bytes(rx)
+    self.assertEqual(parse_can_buffer_old(rx), recv)
+    self.assertEqual(parse_can_buffer(rx), recv)
+    self.assertEqual(parse_can_buffer_batch(rx).to_list(), recv)
+    self.assertEqual(parse_can_buffer(b''), [])
+
+  def test_capnp(self):
+    for msgtype in ['can', 'sendcan']:
+      dat = can_list_to_can_capnp(self.frames, msgtype=msgtype)
+      dat_batch = can_list_to_can_capnp(self.batch, msgtype=msgtype)
+      msg, msg_batch = log.Event.from_bytes(dat), log.Event.from_bytes(dat_batch)
+      self.assertEqual(can_capnp_to_can_list(getattr(msg_batch, msgtype)), self.frames)
+      self.assertEqual(can_capnp_to_can_list(getattr(msg, msgtype)), self.frames)
+
+      half = N_FRAMES // 2
+      strings = [can_list_to_can_capnp(self.frames[:half], msgtype=msgtype), can_list_to_can_capnp(self.frames[half:], msgtype=msgtype)]
+      self.assertEqual(can_capnp_to_can_batch(strings, msgtype=msgtype), self.batch)
+
+  def test_capnp_edge_cases(self):
+    msg = log.Event.from_bytes(can_list_to_can_capnp(CanBatch.empty(), msgtype='sendcan', valid=False))
+    self.assertEqual((msg.which(), len(msg.sendcan), msg.valid), ('sendcan', 0, False))
+    self.assertEqual(len(can_capnp_to_can_batch([])), 0)
+
+    # payloads longer than the batch width are cut
+    frames = [(0x123, 1, bytes(range(16)), 0), (0x7ff, 2, b'', 1)]
+    batch = can_capnp_to_can_batch([can_list_to_can_capnp(frames)], width=8)
+    self.assertEqual(batch.to_list(), [(0x123, 1, bytes(range(8)), 0), (0x7ff, 2, b'', 1)])
+    wide = can_capnp_to_can_batch([can_list_to_can_capnp(frames)], width=64)
+    self.assertEqual(wide.to_list(), frames)
+    self.assertEqual(can_capnp_to_can_list(log.Event.from_bytes(can_list_to_can_capnp(wide)).can), frames)
+
+  def test_no_panda_import(self):
+    # controls processes only need the capnp conversion
+    code = "import sys, selfdrive.boardd.boardd; print(sorted(m for m in ('panda', 'usb1') if m in sys.modules))"
+    out = subprocess.check_output([sys.executable, "-c", code], encoding='utf8')
+    self.assertEqual(out.splitlines()[-1], "[]")
+
+if __name__ == "__main__":
+  unittest.main()
@@ -0,0 +1,153 @@
+#!/usr/bin/env python3
+"""Generates selfdrive/car/registry.py, the car models, fingerprints and FW versions
+of every brand. Run by scons whenever a values.py changes:
+
+  python3 selfdrive/car/build_registry.py selfdrive/car/registry.py
+
+With the registry, fingerprinting doesn't need to import the brand packages.
+Only the interface of the car that was found is imported.
+"""
+import importlib
+import os
+import sys
+from collections import namedtuple
+
+from cereal import car
+from common.basedir import BASEDIR
+
+# brands whose values read Params at import, they are always loaded at runtime
+RUNTIME_BRANDS = ['hyundai']
+
+Registry = namedtuple('Registry', ['brands', 'fingerprints', 'fw_versions', 'ignored_fingerprints'])
+
+
+def get_brand_names():
+  car_dir = os.path.join(BASEDIR, 'selfdrive/car')
+  return sorted(d for d in os.listdir(car_dir) if os.path.isfile(os.path.join(car_dir, d, 'values.py')))
+
+
+def import_values(brand_name, strict):
+  """The values module of a brand, or None if it can't be imported. strict raises instead"""
+  try:
+    return importlib.import_module('selfdrive.car.%s.values' % brand_name)
+  except (ImportError, IOError):
+    if strict:
+      raise
+    return None
+
+
+def get_attr_from_cars(attr, result=dict, combine_brands=True, brand_names=None, strict=False):
+  # import the values of all brands in selfdrive/car and return a dict where:
+  # - keys are all the car models
+  # - values are attr values from all car folders
+  result = result()
+  brand_names = get_brand_names() if brand_names is None else brand_names
+
+  for car_name in brand_names:
+    values = import_values(car_name, strict)
+    if values is None:
+      continue
+    if not hasattr(values, attr):
+      continue
+    attr_values = getattr(values, attr)
+
+    if isinstance(attr_values, dict):
+      for f, v in attr_values.items():
+        if combine_brands:
+          result[f] = v
+        else:
+          if car_name not in result:
+            result[car_name] = {}
+          result[car_name][f] = v
+    elif isinstance(attr_values, list):
+      result += attr_values
+
+  return result
+
+
+def get_model_names(brand_names, strict=False):
+  brands = {}
+  for brand_name in brand_names:
+    values = import_values(brand_name, strict)
+    if values is None:
+      continue
+    model_names = values.CAR
+    brands[brand_name] = [getattr(model_names, c) for c in model_names.__dict__.keys() if not c.startswith("__")]
+  return brands
+
+
+def build_registry(brand_names=None, strict=False):
+  """strict raises if the values of a brand can't be imported, instead of leaving the brand out"""
+  brand_names = get_brand_names() if brand_names is None else brand_names
+  return Registry(
+    get_model_names(brand_names, strict),
+    get_attr_from_cars('FINGERPRINTS', combine_brands=False, brand_names=brand_names, strict=strict),
+    get_attr_from_cars('FW_VERSIONS', combine_brands=False, brand_names=brand_names, strict=strict),
+    get_attr_from_cars('IGNORED_FINGERPRINTS', list, brand_names=brand_names, strict=strict),
+  )
+
+
+def load_registry():
+  """The generated registry plus the runtime brands, or everything built from the values
+  modules when the registry hasn't been generated yet"""
+  try:
+    from selfdrive.car.registry import BRANDS, FINGERPRINTS, FW_VERSIONS, IGNORED_FINGERPRINTS
+  except ImportError:
+    return build_registry()
+
+  registry = Registry(dict(BRANDS), dict(FINGERPRINTS), dict(FW_VERSIONS), list(IGNORED_FINGERPRINTS))
+  runtime = build_registry(RUNTIME_BRANDS)
+  for a, b in zip(registry, runtime):
+    if isinstance(a, dict):
+      a.update(b)
+    else:
+      a += b
+  return registry
+
+
+def format_fw_versions(fw_versions):
+  ecu_names = {v: k for k, v in car.CarParams.Ecu.schema.enumerants.items()}
+
+  lines = []
+  for car_name, ecus in fw_versions.items():
+    lines.append(f"    {car_name!r}: {{")
+    for (ecu, addr, subaddr), versions in ecus.items():
+      subaddr = 'None' if subaddr is None else hex(subaddr)
+      lines.append(f"      (Ecu.{ecu_names[ecu]}, {hex(addr)}, {subaddr}): {versions!r},")
+    lines.append("    },")
+  return lines
+
+
+def generate():
+  # a brand that fails to import fails the build, instead of missing from the registry
+  brand_names = [b for b in get_brand_names() if b not in RUNTIME_BRANDS]
+  registry = build_registry(brand_names, strict=True)
+
+  lines = [
+    "# generated by selfdrive/car/build_registry.py, do not edit",
+    "from cereal import car",
+    "Ecu = car.CarParams.Ecu",
+    "",
+    f"BRANDS = {registry.brands!r}",
+    "",
+    f"FINGERPRINTS = {registry.fingerprints!r}",
+    "",
+    "FW_VERSIONS = {",
+  ]
+  for brand_name, fw_versions in registry.fw_versions.items():
+    lines.append(f"  {brand_name!r}: {{")
+    lines += format_fw_versions(fw_versions)
+    lines.append("  },")
+  lines += [
+    "}",
+    "",
+    f"IGNORED_FINGERPRINTS = {registry.ignored_fingerprints!r}",
+  ]
+  return "\n".join(lines) + "\n"
+
+
+if __name__ == "__main__":
+  # not written to stdout, some imports print to it. Generated first, so a failure doesn't leave an empty registry
+  registry = generate()
+  with open(sys.argv[1], "w") as f:
+    f.write(registry)
@@ -2,7 +2,7 @@ import os
 from common.params import Params
 from common.basedir import BASEDIR
 from selfdrive.version import comma_remote, tested_branch
-from selfdrive.car.fingerprints import eliminate_incompatible_cars, all_known_cars
+from selfdrive.car.fingerprints import FINGERPRINT_INDEX, REGISTRY, all_known_cars
 from selfdrive.car.vin import get_vin, VIN_UNKNOWN
 from selfdrive.car.fw_versions import get_fw_versions, match_fw_to_car
 from selfdrive.swaglog import cloudlog
@@ -59,30 +59,31 @@ def load_interfaces(brand_names):
   return ret
 
 
-def _get_interface_names():
-  # read all the folders in selfdrive/car and return a dict where:
-  # - keys are all the car names that which we have an interface for
-  # - values are lists of spefic car models for a given car
-  brand_names = {}
-  for car_folder in [x[0] for x in os.walk(BASEDIR + '/selfdrive/car')]:
-    try:
-      brand_name = car_folder.split('/')[-1]
-      model_names = __import__('selfdrive.car.%s.values' % brand_name, fromlist=['CAR']).CAR
-      model_names = [getattr(model_names, c) for c in model_names.__dict__.keys() if not c.startswith("__")]
-      brand_names[brand_name] = model_names
-    except (ImportError, IOError):
-      pass
+class Interfaces(dict):
+  """Model name to (CarInterface, CarController, CarState), importing a brand's
+  packages the first time one of its models is looked up"""
+  def __init__(self, brand_names):
+    super().__init__()
+    self.brand_names = brand_names
+    self.model_brands = {model_name: brand_name for brand_name, model_names in brand_names.items() for model_name in model_names}
 
-  return brand_names
+  def __missing__(self, model_name):
+    brand_name = self.model_brands[model_name]
+    self.update(load_interfaces({brand_name: self.brand_names[brand_name]}))
+    return self[model_name]
 
 
-# imports from directory selfdrive/car/<name>/
-interface_names = _get_interface_names()
-interfaces = load_interfaces(interface_names)
+# brand folder in selfdrive/car/ to its car models
+interface_names = REGISTRY.brands
+interfaces = Interfaces(interface_names)
+
+
+TOYOTA_CARS = FINGERPRINT_INDEX.to_mask(c for c in all_known_cars() if "TOYOTA" in c or "LEXUS" in c)
 
 
 def only_toyota_left(candidate_cars):
-  return all(("TOYOTA" in c or "LEXUS" in c) for c in candidate_cars) and len(candidate_cars) > 0
+  # candidate_cars is a FINGERPRINT_INDEX bitset
+  return candidate_cars != 0 and (candidate_cars & ~TOYOTA_CARS) == 0
 
 
 # **** for use live only ****
@@ -118,7 +119,7 @@ def fingerprint(logcan, sendcan):
   Params().put("CarVin", vin)
 
   finger = gen_empty_fingerprint()
-  candidate_cars = {i: all_known_cars() for i in [0, 1]}  # attempt fingerprint on both bus 0 and 1
+  candidate_cars = {i: FINGERPRINT_INDEX.all_cars for i in [0, 1]}  # attempt fingerprint on both bus 0 and 1
   frame = 0
   frame_fingerprint = 10  # 0.1s
   car_fingerprint = None
@@ -138,7 +139,7 @@ def fingerprint(logcan, sendcan):
       for b in candidate_cars:
         if (can.src == b or (only_toyota_left(candidate_cars[b]) and can.src == 2)) and \
            can.address < 0x800 and can.address not in [0x7df, 0x7e0, 0x7e8]:
-          candidate_cars[b] = eliminate_incompatible_cars(can, candidate_cars[b])
+          candidate_cars[b] = FINGERPRINT_INDEX.eliminate(can, candidate_cars[b])
 
     # if we only have one car choice and the time since we got our first
     # message has elapsed, exit
@@ -146,12 +147,13 @@ def fingerprint(logcan, sendcan):
       # Toyota needs higher time to fingerprint, since DSU does not broadcast immediately
       if only_toyota_left(candidate_cars[b]):
         frame_fingerprint = 100  # 1s
-      if len(candidate_cars[b]) == 1 and frame > frame_fingerprint:
+      # exactly one bit set
+      if candidate_cars[b] != 0 and (candidate_cars[b] & (candidate_cars[b] - 1)) == 0 and frame > frame_fingerprint:
           # fingerprint done
-          car_fingerprint = candidate_cars[b][0]
+          car_fingerprint = FINGERPRINT_INDEX.to_list(candidate_cars[b])[0]
 
     # bail if no cars left or we've been waiting for more than 2s
-    failed = all(len(cc) == 0 for cc in candidate_cars.values()) or frame > 200
+    failed = all(cc == 0 for cc in candidate_cars.values()) or frame > 200
     succeeded = car_fingerprint is not None
     done = failed or succeeded
 
@@ -1,45 +1,23 @@
-import os
-from common.basedir import BASEDIR
-
-
-def get_attr_from_cars(attr, result=dict, combine_brands=True):
-  # read all the folders in selfdrive/car and return a dict where:
-  # - keys are all the car models
-  # - values are attr values from all car folders
-  result = result()
-
-  for car_folder in [x[0] for x in os.walk(BASEDIR + '/selfdrive/car')]:
-    try:
-      car_name = car_folder.split('/')[-1]
-      values = __import__('selfdrive.car.%s.values' % car_name, fromlist=[attr])
-      if hasattr(values, attr):
-        attr_values = getattr(values, attr)
-      else:
-        continue
+from selfdrive.car.build_registry import get_attr_from_cars, load_registry  # pylint: disable=unused-import
 
-      if isinstance(attr_values, dict):
-        for f, v in attr_values.items():
-          if combine_brands:
-            result[f] = v
-          else:
-            if car_name not in result:
-              result[car_name] = {}
-            result[car_name][f] = v
-      elif isinstance(attr_values, list):
-        result += attr_values
+REGISTRY = load_registry()
 
-    except (ImportError, IOError):
-      pass
 
-  return result
+def combine_brands(values):
+  return {car_name: v for brand_values in values.values() for car_name, v in brand_values.items()}
 
 
-FW_VERSIONS = get_attr_from_cars('FW_VERSIONS')
-_FINGERPRINTS = get_attr_from_cars('FINGERPRINTS')
-IGNORED_FINGERPRINTS = get_attr_from_cars('IGNORED_FINGERPRINTS', list)
+FW_VERSIONS = combine_brands(REGISTRY.fw_versions)
+_FINGERPRINTS = combine_brands(REGISTRY.fingerprints)
+IGNORED_FINGERPRINTS = REGISTRY.ignored_fingerprints
 
 _DEBUG_ADDRESS = {1880: 8}   # reserved for debug purposes
 
+# add alien debug address
+for _car_fingerprints in _FINGERPRINTS.values():
+  for _fingerprint in _car_fingerprints:
+    _fingerprint.update(_DEBUG_ADDRESS)
+
 def is_valid_for_fingerprint(msg, car_fingerprint):
   adr = msg.address
   # ignore addresses that are more than 11 bits
@@ -65,8 +43,6 @@ def eliminate_incompatible_cars(msg, candidate_cars):
     car_fingerprints = _FINGERPRINTS[car_name]
 
     for fingerprint in car_fingerprints:
-      fingerprint.update(_DEBUG_ADDRESS)  # add alien debug address
-
       if is_valid_for_fingerprint(msg, fingerprint):
         compatible_cars.append(car_name)
         break
@@ -77,3 +53,45 @@ def eliminate_incompatible_cars(msg, candidate_cars):
 def all_known_cars():
   """Returns a list of all known car strings."""
   return list(_FINGERPRINTS.keys())
+
+
+class FingerprintIndex():
+  """Inverted index from (address, length) to a bitset of the cars that could have
+  sent that message. Bit i stands for all_known_cars()[i], so eliminating cars for
+  a message is a single AND with the candidate bitset."""
+  def __init__(self, fingerprints=None, ignored=None):
+    fingerprints = _FINGERPRINTS if fingerprints is None else fingerprints
+    ignored = IGNORED_FINGERPRINTS if ignored is None else ignored
+
+    self.cars = list(fingerprints.keys())
+    self.bit = {car_name: 1 << i for i, car_name in enumerate(self.cars)}
+    self.all_cars = (1 << len(self.cars)) - 1
+
+    # messages with addresses of more than 11 bits match every car
+    self.extended = 0
+    self.index = {}
+    for car_name, car_fingerprints in fingerprints.items():
+      if car_name in ignored:
+        continue
+      self.extended |= self.bit[car_name]
+      for fingerprint in car_fingerprints:
+        for adr_len in fingerprint.items():
+          self.index[adr_len] = self.index.get(adr_len, 0) | self.bit[car_name]
+
+  def eliminate(self, msg, candidates):
+    """Same as eliminate_incompatible_cars, on a bitset of candidates."""
+    if msg.address >= 0x800:
+      return candidates & self.extended
+    return candidates & self.index.get((msg.address, len(msg.dat)), 0)
+
+  def to_mask(self, car_names):
+    mask = 0
+    for car_name in car_names:
+      mask |= self.bit[car_name]
+    return mask
+
+  def to_list(self, mask):
+    return [car_name for car_name in self.cars if mask & self.bit[car_name]]
+
+
+FINGERPRINT_INDEX = FingerprintIndex()
@@ -1,13 +1,14 @@
 #!/usr/bin/env python3
 import struct
 import traceback
+from collections import namedtuple
 from typing import Any
 
 from tqdm import tqdm
 
 import panda.python.uds as uds
 from cereal import car
-from selfdrive.car.fingerprints import FW_VERSIONS, get_attr_from_cars
+from selfdrive.car.fingerprints import FW_VERSIONS, REGISTRY
 from selfdrive.car.isotp_parallel_query import IsoTpParallelQuery
 from selfdrive.car.toyota.values import CAR as TOYOTA
 from selfdrive.swaglog import cloudlog
@@ -103,27 +104,43 @@ REQUESTS = [
 ]
 
 
+ESSENTIAL_ECUS = [Ecu.engine, Ecu.eps, Ecu.esp, Ecu.fwdRadar, Ecu.fwdCamera, Ecu.vsa, Ecu.electricBrakeBooster]
+
+# one IsoTpParallelQuery: a REQUESTS entry sent to the addresses of its brand in one address chunk
+QueryStep = namedtuple('QueryStep', ['idx', 'chunk', 'brand', 'request', 'response', 'addrs', 'parallel'])
+
+_query_plan = None
+
+
 def chunks(l, n=128):
   for i in range(0, len(l), n):
     yield l[i:i + n]
 
 
 def match_fw_to_car(fw_versions):
-  candidates = FW_VERSIONS
-  invalid = []
-
   fw_versions_dict = {}
   for fw in fw_versions:
     addr = fw.address
     sub_addr = fw.subAddress if fw.subAddress != 0 else None
     fw_versions_dict[(addr, sub_addr)] = fw.fwVersion
 
+  return match_fw_versions(fw_versions_dict)
+
+
+def match_fw_versions(fw_versions_dict, queried=None, candidates=None):
+  """Returns the cars compatible with fw_versions_dict, {(addr, sub_addr): version}.
+  If queried is given, ECUs at addresses outside of it are unknown and don't rule out a car."""
+  candidates = FW_VERSIONS if candidates is None else candidates
+  invalid = []
+
   for candidate, fws in candidates.items():
     for ecu, expected_versions in fws.items():
       ecu_type = ecu[0]
       addr = ecu[1:]
+      if queried is not None and addr not in queried:
+        continue
+
       found_version = fw_versions_dict.get(addr, None)
-      ESSENTIAL_ECUS = [Ecu.engine, Ecu.eps, Ecu.esp, Ecu.fwdRadar, Ecu.fwdCamera, Ecu.vsa, Ecu.electricBrakeBooster]
       if ecu_type == Ecu.esp and candidate in [TOYOTA.RAV4, TOYOTA.COROLLA, TOYOTA.HIGHLANDER] and found_version is None:
         continue
 
@@ -142,7 +159,8 @@ def match_fw_to_car(fw_versions):
   return set(candidates.keys()) - set(invalid)
 
 
-def get_fw_versions(logcan, sendcan, bus, extra=None, timeout=0.1, debug=False, progress=False):
+def build_query_plan(versions):
+  """Returns the ECU type of every address and the list of QuerySteps in the default order"""
   ecu_types = {}
 
   # Extract ECU adresses to query from fingerprints
@@ -150,10 +168,6 @@ def get_fw_versions(logcan, sendcan, bus, extra=None, timeout=0.1, debug=False,
   addrs = []
   parallel_addrs = []
 
-  versions = get_attr_from_cars('FW_VERSIONS', combine_brands=False)
-  if extra is not None:
-    versions.update(extra)
-
   for brand, brand_versions in versions.items():
     for c in brand_versions.values():
       for ecu_type, addr, sub_addr in c.keys():
@@ -170,19 +184,92 @@ def get_fw_versions(logcan, sendcan, bus, extra=None, timeout=0.1, debug=False,
 
   addrs.insert(0, parallel_addrs)
 
-  fw_versions = {}
-  for i, addr in enumerate(tqdm(addrs, disable=not progress)):
+  steps = []
+  chunk = 0
+  for i, addr in enumerate(addrs):
     for addr_chunk in chunks(addr):
       for brand, request, response in REQUESTS:
-        try:
-          addrs = [(a, s) for (b, a, s) in addr_chunk if b in (brand, 'any')]
+        step_addrs = [(a, s) for (b, a, s) in addr_chunk if b in (brand, 'any')]
+        if step_addrs:
+          steps.append(QueryStep(len(steps), chunk, brand, request, response, step_addrs, i == 0))
+      chunk += 1
 
-          if addrs:
-            query = IsoTpParallelQuery(sendcan, logcan, bus, addrs, request, response, debug=debug)
-            t = 2 * timeout if i == 0 else timeout
-            fw_versions.update(query.get_data(t))
-        except Exception:
-          cloudlog.warning(f"FW query exception: {traceback.format_exc()}")
+  return ecu_types, steps
+
+
+def get_query_plan(extra=None):
+  """Query plan for all known FW versions, built once per process"""
+  global _query_plan
+
+  if extra is not None:
+    versions = dict(REGISTRY.fw_versions)
+    versions.update(extra)
+    return build_query_plan(versions)
+
+  if _query_plan is None:
+    _query_plan = build_query_plan(REGISTRY.fw_versions)
+  return _query_plan
+
+
+def next_query_step(pending, candidates):
+  """Picks the pending step whose addresses are used by most of the remaining candidates.
+  Requests of the same brand to the same chunk keep their REQUESTS order, since later
+  responses overwrite earlier ones."""
+  eligible = {}
+  for step in pending:
+    key = (step.chunk, step.brand)
+    if key not in eligible or step.idx < eligible[key].idx:
+      eligible[key] = step
+
+  def score(step):
+    addrs = set(step.addrs)
+    used = sum(any(ecu[1:] in addrs for ecu in FW_VERSIONS[c]) for c in candidates)
+    return (used, -step.idx)
+
+  return max(eligible.values(), key=score)
+
+
+def get_fw_versions(logcan, sendcan, bus, extra=None, timeout=0.1, debug=False, progress=False, early_exit=True):
+  """Queries the FW versions of the ECUs. With early_exit the query stops once exactly one car matches,
+  the result then only has the ECUs queried so far. carFw can miss ECUs of other cars"""
+  ecu_types, steps = get_query_plan(extra)
+
+  # an address is settled once every step querying it is done
+  remaining_steps = {}
+  for step in steps:
+    for addr in step.addrs:
+      remaining_steps[addr] = remaining_steps.get(addr, 0) + 1
+
+  fw_versions = {}
+  settled = set()
+  candidates = set(FW_VERSIONS.keys())
+  pending = list(steps)
+  for _ in tqdm(range(len(steps)), disable=not progress):
+    step = next_query_step(pending, candidates) if early_exit else pending[0]
+    pending.remove(step)
+
+    try:
+      query = IsoTpParallelQuery(sendcan, logcan, bus, step.addrs, step.request, step.response, debug=debug)
+      t = 2 * timeout if step.parallel else timeout
+      fw_versions.update(query.get_data(t))
+    except Exception:
+      cloudlog.warning(f"FW query exception: {traceback.format_exc()}")
+
+    for addr in step.addrs:
+      remaining_steps[addr] -= 1
+      if remaining_steps[addr] == 0:
+        settled.add(addr)
+
+    if early_exit:
+      candidates = match_fw_versions(fw_versions, queried=settled, candidates={c: FW_VERSIONS[c] for c in candidates})
+
+      # stop once exactly one car is left with all its ECUs settled and its essential ECUs responding.
+      # A non-essential ECU with an unknown version rules a car out too, so those are waited for as well
+      complete = [c for c in candidates if all(ecu[1:] in settled and (ecu[0] not in ESSENTIAL_ECUS or ecu[1:] in fw_versions)
+                                               for ecu in FW_VERSIONS[c])]
+      if len(complete) == 1 and len(candidates) == 1:
+        cloudlog.warning(f"FW query matched {complete[0]}, skipping {len(pending)} queries")
+        break
 
   # Build capnp list to put into CarParams
   car_fw = []
@@ -235,7 +322,7 @@ if __name__ == "__main__":
   print()
 
   t = time.time()
-  fw_vers = get_fw_versions(logcan, sendcan, 1, extra=extra, debug=args.debug, progress=True)
+  fw_vers = get_fw_versions(logcan, sendcan, 1, extra=extra, debug=args.debug, progress=True, early_exit=not args.scan)
   candidates = match_fw_to_car(fw_vers)
 
   print()
@@ -1,10 +1,11 @@
 import copy
 
 import crcmod
-from common.params import Params
+from common.params import CachedParams
 from selfdrive.car.hyundai.values import CAR, CHECKSUM
 
 hyundai_checksum = crcmod.mkCrcFun(0x11D, initCrc=0xFD, rev=False, xorOut=0xdf)
+params = CachedParams()
 
 
 def create_lkas11(packer, frame, car_fingerprint, apply_steer, steer_req,
@@ -50,7 +51,7 @@ def create_lkas11(packer, frame, car_fingerprint, apply_steer, steer_req,
   elif car_fingerprint in [CAR.OPTIMA, CAR.OPTIMA_HEV, CAR.CADENZA, CAR.CADENZA_HEV]:
     values["CF_Lkas_LdwsActivemode"] = 0
     
-  ldws_car_fix = int(Params().get('LdwsCarFix')) == 1
+  ldws_car_fix = params.get_int('LdwsCarFix') == 1
   if ldws_car_fix:
   	values["CF_Lkas_LdwsOpt_USM"] = 3
 
@@ -13,7 +13,7 @@ from selfdrive.controls.lib.long_mpc import LongitudinalMpc
 
 from selfdrive.car.hyundai.values import Buttons, CarControllerParams
 from common.numpy_fast import clip, interp
-from common.params import Params
+from common.params import Params, CachedParams
 
 from selfdrive.config import RADAR_TO_CAMERA
 
@@ -102,6 +102,7 @@ class SpdController():
         self.old_model_init = 0
 
         self.params = Params()
+        self.cached_params = CachedParams()
         self.cruise_set_mode = int(self.params.get('CruiseStatemodeSelInit'))
 
         self.map_spd_enable = False
@@ -308,7 +309,7 @@ class SpdController():
         delta = int(round(set_speed)) - int(CS.VSetDis)
         dec_step_cmd = 1
 
-        camspeed = Params().get("LimitSetSpeedCamera", encoding="utf8")
+        camspeed = self.cached_params.get("LimitSetSpeedCamera", encoding="utf8")
         if camspeed is not None:
             self.map_spd_camera = int(float(camspeed.rstrip('\n')))
             self.map_spd_enable = self.map_spd_camera > 29
@@ -316,7 +317,7 @@ class SpdController():
             self.map_spd_enable = False
             self.map_spd_camera = 0
           
-        self.map_spd_limit_offset = int(Params().get("OpkrSpeedLimitOffset", encoding='utf8'))
+        self.map_spd_limit_offset = self.cached_params.get_int("OpkrSpeedLimitOffset")
 
         if self.long_curv_timer < long_wait_cmd:
             pass
@@ -1,12 +1,18 @@
+import re
+import struct
 import time
-from collections import defaultdict
+from collections import defaultdict, deque
 from functools import partial
 
 import cereal.messaging as messaging
+from cereal import log
 from selfdrive.swaglog import cloudlog
 from selfdrive.boardd.boardd import can_list_to_can_capnp
 from panda.python.uds import CanClient, IsoTpMessage, FUNCTIONAL_ADDRS, get_rx_addr_for_tx_addr
 
+FUNCTIONAL_RX_ADDRS = list(range(0x7E8, 0x7F0)) + list(range(0x18DAF100, 0x18DAF200))
+RX_BUFFER_LEN = 256
+
 
 class IsoTpParallelQuery():
   def __init__(self, sendcan, logcan, bus, addrs, request, response, functional_addr=False, debug=False):
@@ -26,21 +32,49 @@ class IsoTpParallelQuery():
         self.real_addrs.append((a, None))
 
     self.msg_addrs = {tx_addr: get_rx_addr_for_tx_addr(tx_addr[0]) for tx_addr in self.real_addrs}
-    self.msg_buffer = defaultdict(list)
-
-  def rx(self):
-    """Drain can socket and sort messages into buffers based on address"""
-    can_packets = messaging.drain_sock(self.logcan, wait_for_one=True)
-
-    for packet in can_packets:
-      for msg in packet.can:
-        if msg.src == self.bus:
-          if self.functional_addr:
-            if (0x7E8 <= msg.address <= 0x7EF) or (0x18DAF100 <= msg.address <= 0x18DAF1FF):
-              fn_addr = next(a for a in FUNCTIONAL_ADDRS if msg.address - a <= 32)
-              self.msg_buffer[fn_addr].append((msg.address, msg.busTime, msg.dat, msg.src))
-          elif msg.address in self.msg_addrs.values():
-            self.msg_buffer[msg.address].append((msg.address, msg.busTime, msg.dat, msg.src))
+
+    # ring buffer per (rx address, sub address), responses from ECUs behind a gateway carry the sub address in the first byte
+    self.msg_buffer = defaultdict(partial(deque, maxlen=RX_BUFFER_LEN))
+    self.sub_addrs = defaultdict(set)
+    for tx_addr, rx_addr in self.msg_addrs.items():
+      if tx_addr[1] is not None:
+        self.sub_addrs[rx_addr].add(tx_addr[1])
+
+    # the address is the first word of a CanData struct, packets that don't contain
+    # one of the response addresses are skipped without decoding them
+    self.rx_addrs = set(FUNCTIONAL_RX_ADDRS if functional_addr else self.msg_addrs.values())
+    self.rx_filter = re.compile(b'|'.join(re.escape(struct.pack('<I', a)) for a in sorted(self.rx_addrs)))
+
+    # test doubles of the can socket can't be polled, block on them instead
+    self.poller = None
+    if isinstance(logcan, messaging.SubSocket):
+      self.poller = messaging.Poller()
+      self.poller.registerSocket(logcan)
+
+  def _recv_raw(self, timeout):
+    if self.poller is None:
+      return messaging.drain_sock_raw(self.logcan, wait_for_one=True)
+
+    if not self.poller.poll(max(int(timeout * 1000), 0)):
+      return []
+    return messaging.drain_sock_raw(self.logcan)
+
+  def rx(self, timeout=0.):
+    """Wait up to timeout seconds for can packets and sort messages into buffers based on address"""
+    for dat in self._recv_raw(timeout):
+      if self.rx_filter.search(dat) is None:
+        continue
+
+      for msg in log.Event.from_bytes(dat).can:
+        if msg.src != self.bus or msg.address not in self.rx_addrs:
+          continue
+
+        if self.functional_addr:
+          key = (next(a for a in FUNCTIONAL_ADDRS if msg.address - a <= 32), None)
+        else:
+          sub_addr = msg.dat[0] if len(msg.dat) else None
+          key = (msg.address, sub_addr if sub_addr in self.sub_addrs[msg.address] else None)
+        self.msg_buffer[key].append((msg.address, msg.busTime, msg.dat, msg.src))
 
   def _can_tx(self, tx_addr, dat, bus):
     """Helper function to send single message"""
@@ -49,26 +83,14 @@ class IsoTpParallelQuery():
 
   def _can_rx(self, addr, sub_addr=None):
     """Helper function to retrieve message with specified address and subadress from buffer"""
-    keep_msgs = []
-
-    if sub_addr is None:
-      msgs = self.msg_buffer[addr]
-    else:
-      # Filter based on subadress
-      msgs = []
-      for m in self.msg_buffer[addr]:
-        first_byte = m[2][0]
-        if first_byte == sub_addr:
-          msgs.append(m)
-        else:
-          keep_msgs.append(m)
-
-    self.msg_buffer[addr] = keep_msgs
+    buf = self.msg_buffer[(addr, sub_addr)]
+    msgs = list(buf)
+    buf.clear()
     return msgs
 
   def _drain_rx(self):
-    messaging.drain_sock(self.logcan)
-    self.msg_buffer = defaultdict(list)
+    messaging.drain_sock_raw(self.logcan)
+    self.msg_buffer.clear()
 
   def get_data(self, timeout):
     self._drain_rx()
@@ -95,9 +117,9 @@ class IsoTpParallelQuery():
       request_done[tx_addr] = False
 
     results = {}
-    start_time = time.time()
+    deadline = time.monotonic() + timeout
     while True:
-      self.rx()
+      self.rx(deadline - time.monotonic())
 
       if all(request_done.values()):
         break
@@ -123,7 +145,7 @@ class IsoTpParallelQuery():
           request_done[tx_addr] = True
           cloudlog.warning(f"iso-tp query bad response: 0x{bytes.hex(dat)}")
 
-      if time.time() - start_time > timeout:
+      if time.monotonic() > deadline:
         break
 
     return results
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+import unittest
+
+from cereal import car
+from opendbc.can.parser import CANParser
+from selfdrive.car.hyundai.carstate import CarState
+from selfdrive.car.hyundai.values import CAR
+from selfdrive.test.synthetic import can_bus
+
+
+def hyundai_parser():
+  CP = car.CarParams.new_message()
+  CP.carFingerprint = CAR.SONATA
+  CP.enableCruise = True
+  CP.mdpsBus = 0
+  CP.sasBus = 0
+  CP.sccBus = 0
+  return CarState.get_can_parser(CP)
+
+
+def array_parser(cp):
+  # same signals as cp, values only exported to vl_array
+  signals = [None] * len(cp.vl_array)
+  for (msg, sig), idx in cp.sig_index.items():
+    if isinstance(msg, str):
+      signals[idx] = (sig, msg, cp.vl_array[idx])
+  return CANParser(cp.dbc_name.decode(), signals, [], 0, export_dicts=False)
+
+
+class TestCANParserBatch(unittest.TestCase):
+  def setUp(self):
+    self.cp = hyundai_parser()
+    self.addresses = sorted({msg for msg, _ in self.cp.sig_index if isinstance(msg, int)})
+
+  def test_batch_equal_sequential(self):
+    cp_batch = hyundai_parser()
+    for strings in can_bus(self.addresses, 50, strings_per_frame=3):
+      updated = set()
+      for s in strings:
+        updated |= self.cp.update_string(s)
+      updated_batch = cp_batch.update_strings(strings)
+
+      self.assertEqual(updated, updated_batch)
+      self.assertEqual(self.cp.can_valid, cp_batch.can_valid)
+      self.assertEqual(self.cp.vl, cp_batch.vl)
+      self.assertEqual(self.cp.ts, cp_batch.ts)
+
+    for (msg, sig), idx in cp_batch.sig_index.items():
+      self.assertEqual(cp_batch.vl_array[idx], cp_batch.vl[msg][sig])
+      self.assertEqual(cp_batch.ts_array[idx], cp_batch.ts[msg][sig])
+
+  def test_array_export(self):
+    # without dicts the values only go to vl_array, the same as with them
+    cp_array = array_parser(self.cp)
+    for strings in can_bus(self.addresses, 20):
+      self.cp.update_strings(strings)
+      cp_array.update_strings(strings)
+
+    for (msg, sig), idx in cp_array.sig_index.items():
+      if isinstance(msg, str):
+        self.assertEqual(cp_array.vl_array[idx], self.cp.vl[msg][sig])
+
+
+if __name__ == "__main__":
+  unittest.main()
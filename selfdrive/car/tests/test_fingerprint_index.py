@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+import random
+import unittest
+
+from selfdrive.car.fingerprints import FINGERPRINT_INDEX, IGNORED_FINGERPRINTS, _FINGERPRINTS, all_known_cars, eliminate_incompatible_cars
+from selfdrive.test.synthetic import CanData, fingerprint_frames
+
+
+def replay_frames(car_name, n=2000):
+  return fingerprint_frames(random.choice(_FINGERPRINTS[car_name]), n)
+
+
+def replay_list(frames):
+  candidates = all_known_cars()
+  for msg in frames:
+    candidates = eliminate_incompatible_cars(msg, candidates)
+  return candidates
+
+
+def replay_index(frames):
+  candidates = FINGERPRINT_INDEX.all_cars
+  for msg in frames:
+    candidates = FINGERPRINT_INDEX.eliminate(msg, candidates)
+  return FINGERPRINT_INDEX.to_list(candidates)
+
+
+class TestFingerprintIndex(unittest.TestCase):
+  def test_index_equal_list(self):
+    for car_name in all_known_cars():
+      frames = replay_frames(car_name, 200)
+      candidates, mask = all_known_cars(), FINGERPRINT_INDEX.all_cars
+      for msg in frames:
+        candidates = eliminate_incompatible_cars(msg, candidates)
+        mask = FINGERPRINT_INDEX.eliminate(msg, mask)
+        self.assertEqual(candidates, FINGERPRINT_INDEX.to_list(mask))
+
+  def test_unknown_message(self):
+    mask = FINGERPRINT_INDEX.eliminate(CanData(0x7ff, b'\x00' * 3), FINGERPRINT_INDEX.all_cars)
+    self.assertEqual(FINGERPRINT_INDEX.to_list(mask), eliminate_incompatible_cars(CanData(0x7ff, b'\x00' * 3), all_known_cars()))
+
+  def test_own_fingerprint_kept(self):
+    for car_name in all_known_cars():
+      frames = replay_frames(car_name, 500)
+      candidates = replay_index(frames)
+      if car_name not in IGNORED_FINGERPRINTS:
+        self.assertIn(car_name, candidates)
+      self.assertEqual(candidates, replay_list(frames))
+
+if __name__ == "__main__":
+  unittest.main()
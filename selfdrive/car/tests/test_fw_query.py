@@ -0,0 +1,162 @@
+#!/usr/bin/env python3
+import time
+import unittest
+from collections import deque
+from unittest import mock
+
+from cereal import log
+import selfdrive.car.fw_versions as fw_versions
+from selfdrive.car.fingerprints import get_attr_from_cars
+from selfdrive.car.fw_versions import FW_VERSIONS, REQUESTS, Ecu, get_fw_versions, match_fw_to_car
+from selfdrive.car.isotp_parallel_query import IsoTpParallelQuery
+from panda.python.uds import get_rx_addr_for_tx_addr
+
+BUS = 1
+
+
+class SimulatedEcu():
+  """Answers the FW requests of its brand over ISO-TP, ignores everything else"""
+  def __init__(self, brand, addr, sub_addr, version):
+    self.rx_addr = get_rx_addr_for_tx_addr(addr)
+    self.sub_addr = sub_addr
+    self.responses = {}
+    for b, requests, responses in REQUESTS:
+      if b == brand:
+        for i, (req, resp) in enumerate(zip(requests, responses)):
+          self.responses[req] = resp + version if i == len(requests) - 1 else resp
+
+    self.rx_dat = b''
+    self.rx_len = 0
+    self.tx_frames = []
+
+  def frame(self, dat):
+    if self.sub_addr is not None:
+      dat = bytes([self.sub_addr]) + dat
+    return (self.rx_addr, dat)
+
+  def process(self, dat):
+    """Returns the frames sent in reply to one received frame"""
+    if self.sub_addr is not None:
+      if dat[0] != self.sub_addr:
+        return []
+      dat = dat[1:]
+    max_len = 7 if self.sub_addr is None else 6
+
+    pci = dat[0] >> 4
+    if pci == 0:  # single frame
+      return self.respond(dat[1:1 + (dat[0] & 0xF)], max_len)
+    elif pci == 1:  # first frame
+      self.rx_len = ((dat[0] & 0xF) << 8) + dat[1]
+      self.rx_dat = dat[2:]
+      return [self.frame(b'\x30\x00\x00')]
+    elif pci == 2:  # consecutive frame
+      self.rx_dat += dat[1:]
+      if len(self.rx_dat) >= self.rx_len:
+        return self.respond(self.rx_dat[:self.rx_len], max_len)
+    elif pci == 3:  # flow control
+      frames, self.tx_frames = self.tx_frames, []
+      return frames
+    return []
+
+  def respond(self, req, max_len):
+    if req not in self.responses:
+      return []
+
+    resp = self.responses[req]
+    if len(resp) <= max_len:
+      return [self.frame(bytes([len(resp)]) + resp)]
+
+    first = max_len - 1
+    self.tx_frames = []
+    for i, j in enumerate(range(first, len(resp), max_len)):
+      self.tx_frames.append(self.frame(bytes([0x20 | ((i + 1) & 0xF)]) + resp[j:j + max_len]))
+    return [self.frame(bytes([0x10 | (len(resp) >> 8), len(resp) & 0xFF]) + resp[:first])]
+
+
+class SimulatedCar():
+  """Fake sendcan and logcan sockets with the ECUs of one car behind them"""
+  def __init__(self, brand, car_fw):
+    self.ecus = {}
+    for (_, addr, sub_addr), versions in car_fw.items():
+      self.ecus.setdefault(addr, []).append(SimulatedEcu(brand, addr, sub_addr, versions[0]))
+    self.rx = deque()
+
+  def send(self, dat):
+    msg = log.Event.from_bytes(dat)
+    for m in msg.sendcan:
+      addr, dat = m.address, bytes(m.dat)
+      for ecu in self.ecus.get(addr, []):
+        for rx_addr, rx_dat in ecu.process(dat):
+          self.rx.append((rx_addr, rx_dat))
+
+  def receive(self, non_blocking=False):
+    if not self.rx:
+      if not non_blocking:
+        time.sleep(0.001)
+      return None
+
+    frames = list(self.rx)
+    self.rx.clear()
+    msg = log.Event.new_message()
+    msg.init('can', len(frames))
+    for i, (addr, dat) in enumerate(frames):
+      msg.can[i].address = addr
+      msg.can[i].dat = dat
+      msg.can[i].src = BUS
+    return msg.to_bytes()
+
+
+BRANDS = {car_name: brand for brand, cars in get_attr_from_cars('FW_VERSIONS', combine_brands=False).items() for car_name in cars}
+
+
+def query(car_name, early_exit, car_fw=None, timeout=0.02):
+  sim = SimulatedCar(BRANDS[car_name], FW_VERSIONS[car_name] if car_fw is None else car_fw)
+  queries = []
+
+  def counted(*args, **kwargs):
+    queries.append(args[3])
+    return IsoTpParallelQuery(*args, **kwargs)
+
+  with mock.patch.object(fw_versions, 'IsoTpParallelQuery', side_effect=counted):
+    car_fw = get_fw_versions(sim, sim, BUS, timeout=timeout, early_exit=early_exit)
+  return car_fw, len(queries)
+
+
+class TestFwQuery(unittest.TestCase):
+  def test_simulated_ecus(self):
+    for car_name in FW_VERSIONS:
+      car_fw, _ = query(car_name, early_exit=True)
+      self.assertEqual(match_fw_to_car(car_fw), {car_name}, car_name)
+
+  def test_early_exit_matches_full_query(self):
+    cars = {}
+    for car_name, brand in BRANDS.items():
+      cars.setdefault(brand, []).append(car_name)
+
+    for car_name in sum((c[:3] for c in cars.values()), []):
+      planned_fw, planned_queries = query(car_name, early_exit=True)
+      full_fw, full_queries = query(car_name, early_exit=False)
+
+      self.assertEqual(match_fw_to_car(planned_fw), match_fw_to_car(full_fw))
+      self.assertLessEqual(planned_queries, full_queries)
+
+  def test_non_essential_mismatch(self):
+    # the sub-addressed ECU is queried after the essential ones are settled. An unknown
+    # version of it still rules the car out, with or without early exit
+    fake_versions = {"FAKE CAR": {
+      (Ecu.engine, 0x700, None): [b'engine'],
+      (Ecu.eps, 0x7a1, None): [b'eps'],
+      (Ecu.dsu, 0x750, 0x4f): [b'dsu'],
+    }}
+    car_fw = dict(fake_versions["FAKE CAR"])
+    car_fw[(Ecu.dsu, 0x750, 0x4f)] = [b'unknown']
+
+    with mock.patch.object(fw_versions, 'FW_VERSIONS', fake_versions):
+      for early_exit in [True, False]:
+        sim = SimulatedCar("toyota", car_fw)
+        fw = get_fw_versions(sim, sim, BUS, extra={"toyota": fake_versions}, timeout=0.02, early_exit=early_exit)
+        self.assertIn((0x750, b'unknown'), [(f.address, f.fwVersion) for f in fw])
+        self.assertEqual(match_fw_to_car(fw), set())
+
+if __name__ == "__main__":
+  unittest.main()
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+import random
+import time
+import unittest
+
+import cereal.messaging as messaging
+from selfdrive.car.fw_versions import REQUESTS
+from selfdrive.car.isotp_parallel_query import IsoTpParallelQuery
+from selfdrive.car.tests.test_fw_query import BUS, SimulatedCar
+from selfdrive.test.synthetic import ReplaySocket, random_can_packet
+
+BACKGROUND_RATE = 2000  # msgs/s
+PACKET_RATE = 100  # boardd sends a can packet every 10ms
+
+HONDA_FW = {
+  (None, 0x18da30f1, None): [b'39990-TVA-A150\x00\x00'],
+  (None, 0x18da28f1, None): [b'57114-TVA-C050\x00\x00'],
+}
+
+
+class BusySimulatedCar(SimulatedCar):
+  """Simulated car on a bus that also carries unrelated traffic"""
+  def __init__(self, brand, car_fw):
+    super().__init__(brand, car_fw)
+    background_addrs = [random.randint(0x100, 0x5ff) for _ in range(40)]
+    self.background = [random_can_packet(BACKGROUND_RATE // PACKET_RATE, background_addrs, [0, BUS, 2]) for _ in range(PACKET_RATE)]
+    self.start = time.monotonic()
+    self.packets_sent = 0
+
+  def receive(self, non_blocking=False):
+    packets_due = int((time.monotonic() - self.start) * PACKET_RATE)
+    if packets_due > self.packets_sent:
+      self.packets_sent += 1
+      return self.background[self.packets_sent % len(self.background)]
+    return super().receive(non_blocking)
+
+
+class DecodeAllQuery(IsoTpParallelQuery):
+  """Receive path before filtering by address: decode every packet on the bus"""
+  def rx(self, timeout=0.):
+    for packet in messaging.drain_sock(self.logcan, wait_for_one=True):
+      for msg in packet.can:
+        if msg.src == self.bus and msg.address in self.msg_addrs.values():
+          self.msg_buffer[(msg.address, None)].append((msg.address, msg.busTime, msg.dat, msg.src))
+
+
+def honda_query(query_cls, timeout=0.5):
+  brand, request, response = next(r for r in REQUESTS if r[0] == 'honda')
+  sim = BusySimulatedCar(brand, HONDA_FW)
+  addrs = [(a, s) for (_, a, s) in HONDA_FW] + [(0x18da0bf1, None)]  # one ECU that never answers
+
+  query = query_cls(sim, sim, BUS, addrs, request, response)
+  return query.get_data(timeout)
+
+
+class TestIsoTpParallelQuery(unittest.TestCase):
+  def test_busy_bus(self):
+    results = honda_query(IsoTpParallelQuery)
+    expected = {(a, s): v[0] for (_, a, s), v in HONDA_FW.items()}
+    self.assertEqual(results, expected)
+
+  def test_sub_addr(self):
+    brand, request, response = next(r for r in REQUESTS if r[0] == 'toyota')
+    fw = {(None, 0x750, 0xf): [b'8965B42170\x00\x00\x00\x00\x00\x00'], (None, 0x750, 0x6d): [b'8646F4203100\x00\x00\x00\x00']}
+    sim = BusySimulatedCar(brand, fw)
+
+    query = IsoTpParallelQuery(sim, sim, BUS, [(a, s) for (_, a, s) in fw], request, response)
+    self.assertEqual(query.get_data(0.5), {(a, s): v[0] for (_, a, s), v in fw.items()})
+
+  def test_filtered_rx_equal_decode_all(self):
+    self.assertEqual(honda_query(IsoTpParallelQuery), honda_query(DecodeAllQuery))
+
+    # background traffic alone never reaches the buffers
+    brand, request, response = next(r for r in REQUESTS if r[0] == 'honda')
+    sim = BusySimulatedCar(brand, HONDA_FW)
+    query = IsoTpParallelQuery(sim, sim, BUS, [(a, s) for (_, a, s) in HONDA_FW], request, response)
+    query.logcan = ReplaySocket(sim.background)
+    query.rx()
+    self.assertFalse(any(query.msg_buffer.values()))
+
+
+if __name__ == "__main__":
+  unittest.main()
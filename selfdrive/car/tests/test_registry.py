@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+import sys
+import types
+import unittest
+import unittest.mock
+
+from selfdrive.car import build_registry, car_helpers
+from selfdrive.car.build_registry import RUNTIME_BRANDS, Registry
+
+
+def generated_registry():
+  module = types.ModuleType("selfdrive.car.registry")
+  exec(compile(build_registry.generate(), "registry.py", "exec"), module.__dict__)  # pylint: disable=exec-used
+  return module
+
+
+class TestRegistry(unittest.TestCase):
+  def test_generated_equal_values(self):
+    registry = generated_registry()
+    expected = build_registry.build_registry([b for b in build_registry.get_brand_names() if b not in RUNTIME_BRANDS])
+    self.assertEqual(Registry(registry.BRANDS, registry.FINGERPRINTS, registry.FW_VERSIONS, registry.IGNORED_FINGERPRINTS), expected)
+    for brand_name in RUNTIME_BRANDS:
+      self.assertNotIn(brand_name, registry.BRANDS)
+
+  def test_generate_import_error(self):
+    import_module = build_registry.importlib.import_module
+    def failing_import(name):
+      if name == "selfdrive.car.toyota.values":
+        raise ImportError(name)
+      return import_module(name)
+
+    with unittest.mock.patch.object(build_registry.importlib, "import_module", failing_import):
+      # at runtime the brand is left out, the build fails
+      self.assertNotIn("toyota", build_registry.build_registry().brands)
+      with self.assertRaises(ImportError):
+        build_registry.generate()
+
+  def test_load_registry(self):
+    with unittest.mock.patch.dict(sys.modules, {"selfdrive.car.registry": generated_registry()}):
+      loaded = build_registry.load_registry()
+    expected = build_registry.build_registry()
+    self.assertEqual(loaded.brands, expected.brands)
+    self.assertEqual(loaded.fingerprints, expected.fingerprints)
+    self.assertEqual(loaded.fw_versions, expected.fw_versions)
+    self.assertEqual(sorted(loaded.ignored_fingerprints), sorted(expected.ignored_fingerprints))
+
+  def test_interfaces_loaded_per_brand(self):
+    brand_names = {"toyota": ["TOYOTA PRIUS 2017", "TOYOTA RAV4 2017"], "honda": ["HONDA CIVIC 2016 TOURING"]}
+    loaded = []
+    def load_interfaces(brands):
+      loaded.extend(brands)
+      return {model_name: (brand_name,) * 3 for brand_name, model_names in brands.items() for model_name in model_names}
+
+    with unittest.mock.patch.object(car_helpers, "load_interfaces", load_interfaces):
+      interfaces = car_helpers.Interfaces(brand_names)
+      self.assertEqual(interfaces["TOYOTA PRIUS 2017"], ("toyota",) * 3)
+      self.assertEqual(interfaces["TOYOTA RAV4 2017"], ("toyota",) * 3)
+      self.assertEqual(loaded, ["toyota"])
+      with self.assertRaises(KeyError):
+        interfaces["UNKNOWN CAR"]  # pylint: disable=pointless-statement
+
+
+if __name__ == "__main__":
+  unittest.main()
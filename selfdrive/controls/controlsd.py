@@ -5,7 +5,7 @@ from cereal import car, log
 from common.numpy_fast import clip, interp
 from common.realtime import sec_since_boot, config_realtime_process, Priority, Ratekeeper, DT_CTRL
 from common.profiler import Profiler
-from common.params import Params, put_nonblocking
+from common.params import Params, CachedParams, put_nonblocking
 import cereal.messaging as messaging
 from selfdrive.config import Conversions as CV
 from selfdrive.swaglog import cloudlog
@@ -62,7 +62,8 @@ class Controls:
       ignore = ['ubloxRaw', 'driverCameraState', 'managerState'] if SIMULATION else None
       self.sm = messaging.SubMaster(['deviceState', 'pandaState', 'modelV2', 'liveCalibration', 'ubloxRaw',
                                      'driverMonitoringState', 'longitudinalPlan', 'lateralPlan', 'liveLocationKalman',
-                                     'roadCameraState', 'driverCameraState', 'managerState', 'liveParameters', 'radarState'], ignore_alive=ignore)
+                                     'roadCameraState', 'driverCameraState', 'managerState', 'liveParameters', 'radarState'],
+                                     ignore_alive=ignore, lazy=True)
 
     self.can_sock = can_sock
     if can_sock is None:
@@ -77,6 +78,7 @@ class Controls:
 
     # read params
     params = Params()
+    self.cached_params = CachedParams()
     self.is_metric = params.get("IsMetric", encoding='utf8') == "1"
     self.is_ldw_enabled = params.get("IsLdwEnabled", encoding='utf8') == "1"
     community_feature_toggle = params.get("CommunityFeaturesToggle", encoding='utf8') == "1"
@@ -329,11 +331,11 @@ class Controls:
       if int(CS.vSetDis)-1 > self.v_cruise_kph:
         self.v_cruise_kph = int(CS.vSetDis)
     elif self.CP.enableCruise and CS.cruiseState.enabled:
-      if CS.cruiseButtons == Buttons.RES_ACCEL and int(Params().get('OpkrVariableCruise')) == 1 and CS.cruiseState.modeSel != 0 and CS.vSetDis < (self.v_cruise_kph_last - 1):
+      if CS.cruiseButtons == Buttons.RES_ACCEL and self.cached_params.get_int('OpkrVariableCruise') == 1 and CS.cruiseState.modeSel != 0 and CS.vSetDis < (self.v_cruise_kph_last - 1):
         self.v_cruise_kph = self.v_cruise_kph_last
         if int(CS.vSetDis)-1 > self.v_cruise_kph:
           self.v_cruise_kph = int(CS.vSetDis)
-      elif CS.cruiseButtons == Buttons.RES_ACCEL and int(Params().get('OpkrVariableCruise')) == 1 and CS.cruiseState.modeSel != 0 and 30 <= self.v_cruise_kph_last <= round(CS.vEgo*CV.MS_TO_KPH):
+      elif CS.cruiseButtons == Buttons.RES_ACCEL and self.cached_params.get_int('OpkrVariableCruise') == 1 and CS.cruiseState.modeSel != 0 and 30 <= self.v_cruise_kph_last <= round(CS.vEgo*CV.MS_TO_KPH):
         self.v_cruise_kph = round(CS.vEgo*CV.MS_TO_KPH)
         if int(CS.vSetDis)-1 > self.v_cruise_kph:
           self.v_cruise_kph = int(CS.vSetDis)
@@ -341,7 +343,7 @@ class Controls:
       elif CS.cruiseButtons == Buttons.RES_ACCEL or CS.cruiseButtons == Buttons.SET_DECEL:
         self.v_cruise_kph = round(CS.cruiseState.speed * CV.MS_TO_KPH)
         self.v_cruise_kph_last = self.v_cruise_kph
-      elif CS.driverAcc and int(Params().get('OpkrVariableCruise')) == 1 and int(Params().get('UserOption1')) == 1 and 30 <= self.v_cruise_kph < int(round(CS.vEgo*CV.MS_TO_KPH)):
+      elif CS.driverAcc and self.cached_params.get_int('OpkrVariableCruise') == 1 and self.cached_params.get_int('UserOption1') == 1 and 30 <= self.v_cruise_kph < int(round(CS.vEgo*CV.MS_TO_KPH)):
         self.v_cruise_kph = int(round(CS.vEgo*CV.MS_TO_KPH))
         self.v_cruise_kph_last = self.v_cruise_kph
 
@@ -422,7 +424,7 @@ class Controls:
     anglesteer_desire = lat_plan.steerAngleDesireDeg   
     output_scale = lat_plan.outputScale
 
-    live_sr = Params().get('OpkrLiveSteerRatio') == b'1'
+    live_sr = self.cached_params.get_bool('OpkrLiveSteerRatio')
 
     if not live_sr:
       angle_diff = abs(anglesteer_desire) - abs(anglesteer_current)
@@ -73,5 +73,8 @@ enum hclust_fast_methods {
 void hclust_pdist(int n, int m, double* pts, double* out);
 void cluster_points_centroid(int n, int m, double* pts, double dist, int* idx);
 
+// same clusters as cluster_points_centroid in O(n log n), using a grid with cell size sqrt(dist)
+void cluster_points_centroid_grid(int n, int m, double* pts, double dist, int* idx);
+
 
 #endif
@@ -13,16 +13,39 @@ int hclust_fast(int n, double* distmat, int method, int* merge, double* height);
 void cutree_cdist(int n, const int* merge, double* height, double cdist, int* labels);
 void hclust_pdist(int n, int m, double* pts, double* out);
 void cluster_points_centroid(int n, int m, double* pts, double dist, int* idx);
+void cluster_points_centroid_grid(int n, int m, double* pts, double dist, int* idx);
 """)
 
 hclust = ffi.dlopen(cluster_fn)
 
+# the grid only pays off with many points, below this the full distance matrix is faster
+GRID_MIN_POINTS = 256
 
-def cluster_points_centroid(pts, dist):
+
+def _cluster(f, pts, dist):
   pts = np.ascontiguousarray(pts, dtype=np.float64)
   pts_ptr = ffi.cast("double *", pts.ctypes.data)
   n, m = pts.shape
 
+  # hclust_fast never returns for less than two points
+  if n < 2:
+    return [0] * n
+
   labels_ptr = ffi.new("int[]", n)
-  hclust.cluster_points_centroid(n, m, pts_ptr, dist**2, labels_ptr)
+  f(n, m, pts_ptr, dist**2, labels_ptr)
   return list(labels_ptr)
+
+
+def cluster_points_centroid(pts, dist):
+  return _cluster(hclust.cluster_points_centroid, pts, dist)
+
+
+def cluster_points_grid(pts, dist):
+  """Same clusters as cluster_points_centroid, with a grid instead of the full distance matrix"""
+  return _cluster(hclust.cluster_points_centroid_grid, pts, dist)
+
+
+def cluster_points(pts, dist):
+  """cluster_points_centroid, with the grid once there are enough points for it to be faster"""
+  f = cluster_points_grid if len(pts) >= GRID_MIN_POINTS else cluster_points_centroid
+  return f(pts, dist)
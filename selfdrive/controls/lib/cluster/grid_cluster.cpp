@@ -0,0 +1,162 @@
+//
+// Centroid linkage clustering with a distance cutoff on a uniform grid
+//
+// Gives the same clusters as hclust_fast with HCLUST_METHOD_CENTROID followed
+// by cutree_cdist, without building the O(n^2) distance matrix: the closest
+// pair of clusters is merged as long as its squared centroid distance is below
+// the cutoff, and only clusters in neighboring grid cells can be that close.
+//
+
+#include <algorithm>
+#include <cmath>
+#include <cstdint>
+#include <queue>
+#include <tuple>
+#include <vector>
+#include <unordered_map>
+
+
+extern "C" {
+#include "fastcluster.h"
+}
+
+namespace {
+
+// (squared distance, cluster, cluster)
+typedef std::tuple<double, int, int> pair_t;
+
+class Grid {
+public:
+  Grid(int m, double cell_size, int max_clusters) : m(m), cell_size(cell_size), keys(max_clusters), cell(m), offset(m) {}
+
+  void insert(int id, const double *x) {
+    set_cell(x);
+    keys[id] = key(0);
+    grid[keys[id]].push_back(id);
+  }
+
+  void remove(int id) {
+    std::vector<int> &ids = grid[keys[id]];
+    for (size_t i = 0; i < ids.size(); i++) {
+      if (ids[i] == id) {
+        ids[i] = ids.back();
+        ids.pop_back();
+        break;
+      }
+    }
+  }
+
+  // calls f for every cluster in the 3^m cells around x, and maybe for a few more on hash collisions
+  template <typename F>
+  void neighbors(const double *x, F f) {
+    set_cell(x);
+    std::fill(offset.begin(), offset.end(), -1);
+    while (true) {
+      auto it = grid.find(key(1));
+      if (it != grid.end()) {
+        for (int id : it->second) f(id);
+      }
+
+      int k = 0;
+      while (k < m && offset[k] == 1) offset[k++] = -1;
+      if (k == m) break;
+      offset[k]++;
+    }
+  }
+
+private:
+  void set_cell(const double *x) {
+    for (int k = 0; k < m; k++) cell[k] = (int64_t)std::floor(x[k] / cell_size);
+  }
+
+  uint64_t key(int use_offset) const {
+    uint64_t h = 0;
+    for (int k = 0; k < m; k++) h = h * 0x9E3779B97F4A7C15ULL + (uint64_t)(cell[k] + use_offset * offset[k]);
+    return h;
+  }
+
+  int m;
+  double cell_size;
+  std::vector<uint64_t> keys;
+  std::vector<int64_t> cell, offset;
+  std::unordered_map<uint64_t, std::vector<int>> grid;
+};
+
+}
+
+extern "C" {
+  void cluster_points_centroid_grid(int n, int m, double* pts, double dist, int* idx) {
+    if (n <= 0) return;
+
+    // clusters 0..n-1 are the points, every merge creates a new cluster
+    int max_clusters = 2 * n - 1;
+    std::vector<double> centroid(max_clusters * m);
+    std::vector<double> size(max_clusters, 1.);
+    std::vector<int> parent(max_clusters, -1);
+    std::vector<bool> alive(max_clusters, false);
+
+    // dist is the squared cutoff, as in cluster_points_centroid
+    Grid grid(m, std::sqrt(dist), max_clusters);
+    std::priority_queue<pair_t, std::vector<pair_t>, std::greater<pair_t>> heap;
+
+    auto sqdist = [&](int a, int b) {
+      double d = 0;
+      for (int k = 0; k < m; k++) {
+        double e = centroid[a * m + k] - centroid[b * m + k];
+        d += e * e;
+      }
+      return d;
+    };
+
+    auto add_cluster = [&](int id) {
+      grid.neighbors(&centroid[id * m], [&](int other) {
+        double d = sqdist(other, id);
+        if (d < dist) heap.push(pair_t(d, other, id));
+      });
+      grid.insert(id, &centroid[id * m]);
+      alive[id] = true;
+    };
+
+    for (int i = 0; i < n; i++) {
+      for (int k = 0; k < m; k++) centroid[i * m + k] = pts[i * m + k];
+      add_cluster(i);
+    }
+
+    // merge the closest pair of clusters until no pair is closer than the cutoff
+    int next = n;
+    while (!heap.empty()) {
+      int a = std::get<1>(heap.top());
+      int b = std::get<2>(heap.top());
+      heap.pop();
+      if (!alive[a] || !alive[b]) continue;
+
+      alive[a] = alive[b] = false;
+      grid.remove(a);
+      grid.remove(b);
+
+      int c = next++;
+      size[c] = size[a] + size[b];
+      for (int k = 0; k < m; k++) {
+        centroid[c * m + k] = (size[a] * centroid[a * m + k] + size[b] * centroid[b * m + k]) / size[c];
+      }
+      parent[a] = parent[b] = c;
+      add_cluster(c);
+    }
+
+    // label clusters in order of their first point, like cutree_k
+    std::vector<int> label(max_clusters, -1);
+    int next_label = 0;
+    for (int i = 0; i < n; i++) {
+      int root = i;
+      while (parent[root] >= 0) root = parent[root];
+      for (int j = i; parent[j] >= 0;) {
+        int up = parent[j];
+        if (up != root) parent[j] = root;
+        j = up;
+      }
+
+      if (label[root] < 0) label[root] = next_label++;
+      idx[i] = label[root];
+    }
+  }
+}
@@ -41,7 +41,12 @@ class Events:
   def __init__(self):
     self.events = []
     self.static_events = []
-    self.events_prev = dict.fromkeys(EVENTS.keys(), 0)
+    # bitmask of the event types of all current events, see ET_BITS
+    self.types = 0
+    self.static_types = 0
+    # number of consecutive frames each event was active before the current one, indexed by event name
+    self.events_prev = [0] * NUM_EVENTS
+    self._counted = set()
 
   @property
   def names(self):
@@ -53,50 +58,59 @@ class Events:
   def add(self, event_name, static=False):
     if static:
       self.static_events.append(event_name)
+      self.static_types |= EVENT_TYPES[event_name]
     self.events.append(event_name)
+    self.types |= EVENT_TYPES[event_name]
 
   def clear(self):
-    self.events_prev = {k: (v+1 if k in self.events else 0) for k, v in self.events_prev.items()}
+    active = set(self.events)
+    for e in self._counted - active:
+      self.events_prev[e] = 0
+    for e in active:
+      self.events_prev[e] += 1
+    self._counted = active
+
     self.events = self.static_events.copy()
+    self.types = self.static_types
 
   def any(self, event_type):
-    for e in self.events:
-      if event_type in EVENTS.get(e, {}).keys():
-        return True
-    return False
+    return bool(self.types & ET_BITS[event_type])
 
   def create_alerts(self, event_types, callback_args=None):
     if callback_args is None:
       callback_args = []
 
+    mask = 0
+    for et in event_types:
+      mask |= ET_BITS[et]
+
     ret = []
+    if not self.types & mask:
+      return ret
+
     for e in self.events:
-      types = EVENTS[e].keys()
+      if not EVENT_TYPES[e] & mask:
+        continue
+
+      alerts = EVENT_ALERTS[e]
       for et in event_types:
-        if et in types:
-          alert = EVENTS[e][et]
+        if et in alerts:
+          alert, alert_type = alerts[et]
           if not isinstance(alert, Alert):
             alert = alert(*callback_args)
 
           if DT_CTRL * (self.events_prev[e] + 1) >= alert.creation_delay:
-            alert.alert_type = f"{EVENT_NAME[e]}/{et}"
+            alert.alert_type = alert_type
             alert.event_type = et
             ret.append(alert)
     return ret
 
   def add_from_msg(self, events):
     for e in events:
-      self.events.append(e.name.raw)
+      self.add(e.name.raw)
 
   def to_msg(self):
-    ret = []
-    for event_name in self.events:
-      event = car.CarEvent.new_message()
-      event.name = event_name
-      for event_type in EVENTS.get(event_name, {}).keys():
-        setattr(event, event_type , True)
-      ret.append(event)
-    return ret
+    return [car_event(event_name) for event_name in self.events]
 
 class Alert:
   def __init__(self,
@@ -833,3 +847,33 @@ EVENTS: Dict[int, Dict[str, Union[Alert, Callable[[Any, messaging.SubMaster, boo
   },
 
 }
+
+
+# ********** lookup tables for Events **********
+
+ET_BITS = {et: 1 << i for i, et in enumerate([ET.ENABLE, ET.PRE_ENABLE, ET.NO_ENTRY, ET.WARNING, ET.USER_DISABLE,
+                                               ET.SOFT_DISABLE, ET.IMMEDIATE_DISABLE, ET.PERMANENT])}
+NUM_EVENTS = max(EVENT_NAME) + 1
+
+# event name -> bitmask of its event types
+EVENT_TYPES = [0] * NUM_EVENTS
+# event name -> {event type: (alert or alert callback, alert type)}
+EVENT_ALERTS = [{} for _ in range(NUM_EVENTS)]
+for _e, _alerts in EVENTS.items():
+  for _et, _alert in _alerts.items():
+    EVENT_TYPES[_e] |= ET_BITS[_et]
+    EVENT_ALERTS[_e][_et] = (_alert, f"{EVENT_NAME[_e]}/{_et}")
+
+_car_events: Dict[int, Any] = {}
+
+
+def car_event(event_name):
+  """Prebuilt CarEvent for an event name, shared between calls and not to be modified"""
+  event = _car_events.get(event_name)
+  if event is None:
+    event = car.CarEvent.new_message()
+    event.name = event_name
+    for event_type in EVENTS.get(event_name, {}).keys():
+      setattr(event, event_type, True)
+    event = _car_events[event_name] = event.as_reader()
+  return event
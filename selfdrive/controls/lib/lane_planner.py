@@ -2,7 +2,7 @@ from common.numpy_fast import interp
 import numpy as np
 from selfdrive.hardware import EON, TICI
 from cereal import car, log
-from common.params import Params
+from common.params import Params, CachedParams
 
 TRAJECTORY_SIZE = 33
 # camera offset is meters from center car to camera
@@ -35,6 +35,8 @@ class LanePlanner:
     self.l_lane_change_prob = 0.
     self.r_lane_change_prob = 0.
 
+    self.params = CachedParams()
+
 
   def parse_model(self, md, sm, v_ego):
     curvature = sm['controlsState'].curvature
@@ -49,9 +51,9 @@ class LanePlanner:
     else:
       lean_offset = 0
 
-    if (int(Params().get("LeftCurvOffsetAdj", encoding='utf8')) != 0 or int(Params().get("RightCurvOffsetAdj", encoding='utf8')) != 0) and v_ego > 8:
-      leftCurvOffsetAdj = int(Params().get("LeftCurvOffsetAdj", encoding='utf8'))
-      rightCurvOffsetAdj = int(Params().get("RightCurvOffsetAdj", encoding='utf8'))
+    leftCurvOffsetAdj = self.params.get_int("LeftCurvOffsetAdj")
+    rightCurvOffsetAdj = self.params.get_int("RightCurvOffsetAdj")
+    if (leftCurvOffsetAdj != 0 or rightCurvOffsetAdj != 0) and v_ego > 8:
       if curvature > 0.0008 and leftCurvOffsetAdj < 0 and lane_differ >= 0: # left curve
         if lane_differ > 0.6:
           lane_differ = 0.6          
@@ -1,5 +1,6 @@
-from common.numpy_fast import mean
-from common.kalman.simple_kalman import KF1D
+import numpy as np
+
+from common.lazy_property import lazy_property
 from selfdrive.config import RADAR_TO_CAMERA
 
 
@@ -7,113 +8,141 @@ from selfdrive.config import RADAR_TO_CAMERA
 # TODO is this a good default?
 _LEAD_ACCEL_TAU = 1.5
 
-# radar tracks
-SPEED, ACCEL = 0, 1   # Kalman filter states enum
-
 # stationary qualification parameters
 v_ego_stationary = 4.   # no stationary object flag below this speed
 
-
-class Track():
-  def __init__(self, v_lead, kalman_params):
-    self.cnt = 0
-    self.aLeadTau = _LEAD_ACCEL_TAU
-    self.K_A = kalman_params.A
-    self.K_C = kalman_params.C
-    self.K_K = kalman_params.K
-    self.kf = KF1D([[v_lead], [0.0]], self.K_A, self.K_C, self.K_K)
-
-  def update(self, d_rel, y_rel, v_rel, v_lead, measured):
-    # relative values, copy
-    self.dRel = d_rel   # LONG_DIST
-    self.yRel = y_rel   # -LAT_DIST
-    self.vRel = v_rel   # REL_SPEED
+# cnt, KF speed, KF accel and aLeadTau of a track that wasn't updated yet
+_NEW_TRACK_STATE = np.array([[0.], [0.], [0.], [_LEAD_ACCEL_TAU]])
+
+
+class Tracks():
+  """Radar tracks as a structure of arrays, one row per track sorted by track id.
+  Every track runs the same KF1D, so all of them are updated in one vectorized step."""
+  def __init__(self, kalman_params):
+    A, C, K = kalman_params.A, kalman_params.C, kalman_params.K
+    # one KF1D step of (speed, accel, measured speed) for all tracks: x' = (A - KC) x + K z
+    self.kf_step = np.array([[A[0][0] - K[0][0] * C[0], A[0][1] - K[0][0] * C[1], K[0][0]],
+                             [A[1][0] - K[1][0] * C[0], A[1][1] - K[1][0] * C[1], K[1][0]]])
+
+    self.ids = np.zeros(0, dtype=np.int64)
+    self.state = np.zeros((4, 0))
+    self.update(self.ids, *np.zeros((5, 0)))
+
+  def __len__(self):
+    return len(self.ids)
+
+  def update(self, ids, d_rel, y_rel, v_rel, v_lead, measured):
+    """Replaces the tracks with the points in ids (unique and sorted), keeping the filter state of known tracks"""
+    # filter state rows: cnt, KF speed, KF accel, aLeadTau
+    if len(ids) == len(self.ids) and (ids == self.ids).all():
+      # the same tracks as last cycle, all of them have been filtered before
+      cnt, x0, x1, a_lead_tau = self.state
+      v_lead_k, a_lead_k = self.kf_step.dot([x0, x1, v_lead])
+    else:
+      # the last column is the state of a new track
+      prev = np.hstack((self.state, _NEW_TRACK_STATE))
+      cols = np.full(len(ids), len(self.ids))
+      if len(self.ids):
+        pos = np.minimum(np.searchsorted(self.ids, ids), len(self.ids) - 1)
+        cols = np.where(self.ids[pos] == ids, pos, cols)
+      cnt, x0, x1, a_lead_tau = prev[:, cols]
+
+      # tracks that are not reported anymore are dropped, new tracks start at the measured speed
+      filtered = cnt > 0
+      v_lead_k, a_lead_k = np.where(filtered, self.kf_step.dot([x0, x1, v_lead]), [v_lead, x1])
+
+    self.ids = ids
+    self.dRel = d_rel
+    self.yRel = y_rel
+    self.vRel = v_rel
     self.vLead = v_lead
-    self.measured = measured   # measured or estimate
-
-    # computed velocity and accelerations
-    if self.cnt > 0:
-      self.kf.update(self.vLead)
-
-    self.vLeadK = float(self.kf.x[SPEED][0])
-    self.aLeadK = float(self.kf.x[ACCEL][0])
+    self.measured = measured
 
     # Learn if constant acceleration
-    if abs(self.aLeadK) < 0.5:
-      self.aLeadTau = _LEAD_ACCEL_TAU
-    else:
-      self.aLeadTau *= 0.9
+    a_lead_tau = np.where(np.abs(a_lead_k) < 0.5, _LEAD_ACCEL_TAU, a_lead_tau * 0.9)
 
-    self.cnt += 1
+    self.state = np.array([cnt + 1, v_lead_k, a_lead_k, a_lead_tau])
+    self.cnt, self.vLeadK, self.aLeadK, self.aLeadTau = self.state
 
-  def get_key_for_cluster(self):
+  def get_keys_for_cluster(self):
     # Weigh y higher since radar is inaccurate in this dimension
-    return [self.dRel, self.yRel*2, self.vRel]
-
-  def reset_a_lead(self, aLeadK, aLeadTau):
-    self.kf = KF1D([[self.vLead], [aLeadK]], self.K_A, self.K_C, self.K_K)
-    self.aLeadK = aLeadK
-    self.aLeadTau = aLeadTau
-
-
-class Cluster():
-  def __init__(self):
-    self.tracks = set()
-
-  def add(self, t):
-    # add the first track
-    self.tracks.add(t)
-
-  # TODO: make generic
-  @property
+    return np.column_stack((self.dRel, self.yRel*2, self.vRel))
+
+  def reset_a_lead(self, mask, aLeadK, aLeadTau):
+    self.vLeadK[mask] = self.vLead[mask]
+    self.aLeadK[mask] = aLeadK
+    self.aLeadTau[mask] = aLeadTau
+
+
+class Clusters():
+  """Mean state of the tracks in each cluster, one row per cluster"""
+  def __init__(self, tracks, cluster_idxs):
+    self.tracks = tracks
+    self.cluster_idxs = cluster_idxs
+    self.count = np.bincount(cluster_idxs)
+
+    # accel is only learned by tracks that have been filtered, new tracks are reset to these every cycle
+    filtered = tracks.cnt > 1
+    filtered_count = self.sum(filtered)
+    has_filtered = filtered_count > 0
+    filtered_count[~has_filtered] = 1.
+    self.aLeadK = self.sum(tracks.aLeadK * filtered) / filtered_count
+    self.aLeadTau = np.where(has_filtered, self.sum(tracks.aLeadTau * filtered) / filtered_count, _LEAD_ACCEL_TAU)
+
+  def sum(self, values):
+    return np.bincount(self.cluster_idxs, values, len(self.count))
+
+  # the rest is only needed to pick the leads
+  @lazy_property
   def dRel(self):
-    return mean([t.dRel for t in self.tracks])
+    return self.sum(self.tracks.dRel) / self.count
 
-  @property
+  @lazy_property
   def yRel(self):
-    return mean([t.yRel for t in self.tracks])
+    return self.sum(self.tracks.yRel) / self.count
 
-  @property
+  @lazy_property
   def vRel(self):
-    return mean([t.vRel for t in self.tracks])
-
-  @property
-  def aRel(self):
-    return mean([t.aRel for t in self.tracks])
+    return self.sum(self.tracks.vRel) / self.count
 
-  @property
+  @lazy_property
   def vLead(self):
-    return mean([t.vLead for t in self.tracks])
+    return self.sum(self.tracks.vLead) / self.count
 
-  @property
-  def dPath(self):
-    return mean([t.dPath for t in self.tracks])
+  @lazy_property
+  def vLeadK(self):
+    return self.sum(self.tracks.vLeadK) / self.count
 
-  @property
-  def vLat(self):
-    return mean([t.vLat for t in self.tracks])
+  @lazy_property
+  def measured(self):
+    return self.sum(self.tracks.measured) > 0
 
-  @property
-  def vLeadK(self):
-    return mean([t.vLeadK for t in self.tracks])
+  def __len__(self):
+    return len(self.dRel)
 
-  @property
-  def aLeadK(self):
-    if all(t.cnt <= 1 for t in self.tracks):
-      return 0.
-    else:
-      return mean([t.aLeadK for t in self.tracks if t.cnt > 1])
+  def __getitem__(self, i):
+    return self.clusters[i]
 
-  @property
-  def aLeadTau(self):
-    if all(t.cnt <= 1 for t in self.tracks):
-      return _LEAD_ACCEL_TAU
-    else:
-      return mean([t.aLeadTau for t in self.tracks if t.cnt > 1])
+  def __iter__(self):
+    return iter(self.clusters)
 
-  @property
-  def measured(self):
-    return any(t.measured for t in self.tracks)
+  @lazy_property
+  def clusters(self):
+    # plain floats, per cluster math on numpy scalars is slow
+    cols = [self.dRel, self.yRel, self.vRel, self.vLead, self.vLeadK, self.aLeadK, self.aLeadTau, self.measured]
+    return [Cluster(*c) for c in zip(*[col.tolist() for col in cols])]
+
+
+class Cluster():
+  def __init__(self, dRel, yRel, vRel, vLead, vLeadK, aLeadK, aLeadTau, measured):
+    self.dRel = dRel
+    self.yRel = yRel
+    self.vRel = vRel
+    self.vLead = vLead
+    self.vLeadK = vLeadK
+    self.aLeadK = aLeadK
+    self.aLeadTau = aLeadTau
+    self.measured = measured
 
   def get_RadarState(self, model_prob=0.0):
     return {
@@ -130,7 +159,8 @@ class Cluster():
       "aLeadTau": float(self.aLeadTau)
     }
 
-  def get_RadarState_from_vision(self, lead_msg, v_ego):
+  @staticmethod
+  def get_RadarState_from_vision(lead_msg, v_ego):
     return {
       "dRel": float(lead_msg.xyva[0] - RADAR_TO_CAMERA),
       "yRel": float(-lead_msg.xyva[1]),
@@ -1,7 +1,9 @@
 #!/usr/bin/env python3
 import importlib
-import math
-from collections import defaultdict, deque
+import os
+from collections import deque
+
+import numpy as np
 
 import cereal.messaging as messaging
 from cereal import car
@@ -9,10 +11,19 @@ from common.numpy_fast import interp
 from common.params import Params
 from common.realtime import Ratekeeper, Priority, config_realtime_process
 from selfdrive.config import RADAR_TO_CAMERA
-from selfdrive.controls.lib.cluster.fastcluster_py import cluster_points_centroid
-from selfdrive.controls.lib.radar_helpers import Cluster, Track
+from selfdrive.controls.lib.cluster.fastcluster_py import cluster_points, cluster_points_centroid, cluster_points_grid
+from selfdrive.controls.lib.radar_helpers import Cluster, Clusters, Tracks, v_ego_stationary
 from selfdrive.swaglog import cloudlog
 
+# RADAR_CLUSTER=fastcluster or grid forces one of the clusterings, to compare them
+RADAR_CLUSTER = os.environ.get('RADAR_CLUSTER')
+CLUSTER_POINTS = {
+  'fastcluster': cluster_points_centroid,
+  'grid': cluster_points_grid,
+}
+
+POINT_DTYPE = np.dtype([('trackId', np.int64), ('dRel', np.float64), ('yRel', np.float64), ('vRel', np.float64), ('measured', np.bool_)])
+
 
 class KalmanParams():
   def __init__(self, dt):
@@ -31,71 +42,81 @@ class KalmanParams():
 
 
 def laplacian_cdf(x, mu, b):
-  b = max(b, 1e-4)
-  return math.exp(-abs(x-mu)/b)
-
+  b = np.maximum(b, 1e-4)
+  return np.exp(-np.abs(x-mu)/b)
 
-def match_vision_to_cluster(v_ego, lead, clusters):
-  # match vision point to best statistical cluster match
-  offset_vision_dist = lead.xyva[0] - RADAR_TO_CAMERA
 
-  def prob(c):
-    prob_d = laplacian_cdf(c.dRel, offset_vision_dist, lead.xyvaStd[0])
-    prob_y = laplacian_cdf(c.yRel, -lead.xyva[1], lead.xyvaStd[1])
-    prob_v = laplacian_cdf(c.vRel, lead.xyva[2], lead.xyvaStd[2])
+def match_vision_to_clusters(v_ego, leads, clusters):
+  """Index of the best statistical cluster match for each vision lead, -1 if there is no sane match.
+  All leads are scored against all clusters at once, ties go to the first cluster."""
+  xyva = np.array([list(lead.xyva)[:3] for lead in leads])
+  xyva_std = np.array([list(lead.xyvaStd)[:3] for lead in leads])
+  offset_vision_dist = xyva[:, 0] - RADAR_TO_CAMERA
 
-    # This is isn't exactly right, but good heuristic
-    return prob_d * prob_y * prob_v
+  # leads x clusters
+  prob_d = laplacian_cdf(clusters.dRel, offset_vision_dist[:, None], xyva_std[:, 0:1])
+  prob_y = laplacian_cdf(clusters.yRel, -xyva[:, 1:2], xyva_std[:, 1:2])
+  prob_v = laplacian_cdf(clusters.vRel, xyva[:, 2:3], xyva_std[:, 2:3])
 
-  cluster = max(clusters, key=prob)
+  # This is isn't exactly right, but good heuristic
+  idxs = np.argmax(prob_d * prob_y * prob_v, axis=1)
 
   # if no 'sane' match is found return -1
   # stationary radar points can be false positives
-  dist_sane = abs(cluster.dRel - offset_vision_dist) < max([(offset_vision_dist)*.25, 5.0])
-  vel_sane = (abs(cluster.vRel - lead.xyva[2]) < 10) or (v_ego + cluster.vRel > 3)
-  if dist_sane and vel_sane:
-    return cluster
-  else:
-    return None
+  d_rel, v_rel = clusters.dRel[idxs], clusters.vRel[idxs]
+  dist_sane = np.abs(d_rel - offset_vision_dist) < np.maximum(offset_vision_dist*.25, 5.0)
+  vel_sane = (np.abs(v_rel - xyva[:, 2]) < 10) | (v_ego + v_rel > 3)
+  return np.where(dist_sane & vel_sane, idxs, -1)
 
 
-def get_lead(v_ego, ready, clusters, lead_msg, low_speed_override=True):
+def get_leads(v_ego, ready, clusters, lead_msgs, low_speed_override=(True, False)):
   # Determine leads, this is where the essential logic happens
-  if len(clusters) > 0 and ready and lead_msg.prob > .5:
-    cluster = match_vision_to_cluster(v_ego, lead_msg, clusters)
-  else:
-    cluster = None
-
-  lead_dict = {'status': False}
-  if cluster is not None:
-    lead_dict = cluster.get_RadarState(lead_msg.prob)
-  elif (cluster is None) and ready and (lead_msg.prob > .5):
-    lead_dict = Cluster().get_RadarState_from_vision(lead_msg, v_ego)
-
-  if low_speed_override:
-    low_speed_clusters = [c for c in clusters if c.potential_low_speed_lead(v_ego)]
-    if len(low_speed_clusters) > 0:
-      closest_cluster = min(low_speed_clusters, key=lambda c: c.dRel)
-
-      # Only choose new cluster if it is actually closer than the previous one
+  idxs = [-1] * len(lead_msgs)
+  confident = [i for i, lead_msg in enumerate(lead_msgs) if lead_msg.prob > .5]
+  if len(clusters) > 0 and ready and len(confident):
+    for i, idx in zip(confident, match_vision_to_clusters(v_ego, [lead_msgs[i] for i in confident], clusters)):
+      idxs[i] = idx
+
+  # stop for stuff in front of you and low speed, even without model confirmation
+  closest_cluster = None
+  if any(low_speed_override) and len(clusters) > 0 and v_ego < v_ego_stationary:
+    low_speed = (np.abs(clusters.yRel) < 1.5) & (clusters.dRel < 25)
+    if low_speed.any():
+      closest_cluster = clusters[int(np.argmin(np.where(low_speed, clusters.dRel, np.inf)))]
+
+  lead_dicts = []
+  for lead_msg, idx, override in zip(lead_msgs, idxs, low_speed_override):
+    lead_dict = {'status': False}
+    if ready and lead_msg.prob > .5:
+      if idx >= 0:
+        lead_dict = clusters[idx].get_RadarState(lead_msg.prob)
+      else:
+        lead_dict = Cluster.get_RadarState_from_vision(lead_msg, v_ego)
+
+    # Only choose new cluster if it is actually closer than the previous one
+    if override and closest_cluster is not None:
       if (not lead_dict['status']) or (closest_cluster.dRel < lead_dict['dRel']):
         lead_dict = closest_cluster.get_RadarState()
 
-  return lead_dict
+    lead_dicts.append(lead_dict)
+  return lead_dicts
 
 
 class RadarD():
-  def __init__(self, radar_ts, delay=0):
+  def __init__(self, radar_ts, delay=0, cluster=RADAR_CLUSTER):
     self.current_time = 0
 
-    self.tracks = defaultdict(dict)
     self.kalman_params = KalmanParams(radar_ts)
+    self.tracks = Tracks(self.kalman_params)
+    self.cluster_points = CLUSTER_POINTS.get(cluster, cluster_points)
 
     # v_ego
     self.v_ego = 0.
     self.v_ego_hist = deque([0], maxlen=delay+1)
 
     self.ready = False
+    self.points = np.zeros(0, dtype=POINT_DTYPE)
+    self.clusters = None
 
   def update(self, sm, rr, enable_lead):
     self.current_time = 1e-9*max(sm.logMonoTime.values())
@@ -106,54 +127,15 @@ class RadarD():
     if sm.updated['modelV2']:
       self.ready = True
 
-    ar_pts = {}
-    for pt in rr.points:
-      ar_pts[pt.trackId] = [pt.dRel, pt.yRel, pt.vRel, pt.measured]
+    # the last point of a track id wins, points are kept sorted by id
+    ar_pts = {pt.trackId: (pt.trackId, pt.dRel, pt.yRel, pt.vRel, pt.measured) for pt in rr.points}
+    self.points = np.array(sorted(ar_pts.values()), dtype=POINT_DTYPE)
 
-    # *** remove missing points from meta data ***
-    for ids in list(self.tracks.keys()):
-      if ids not in ar_pts:
-        self.tracks.pop(ids, None)
-
-    # *** compute the tracks ***
-    for ids in ar_pts:
-      rpt = ar_pts[ids]
-
-      # align v_ego by a fixed time to align it with the radar measurement
-      v_lead = rpt[2] + self.v_ego_hist[0]
-
-      # create the track if it doesn't exist or it's a new track
-      if ids not in self.tracks:
-        self.tracks[ids] = Track(v_lead, self.kalman_params)
-      self.tracks[ids].update(rpt[0], rpt[1], rpt[2], v_lead, rpt[3])
-
-    idens = list(sorted(self.tracks.keys()))
-    track_pts = list([self.tracks[iden].get_key_for_cluster() for iden in idens])
-
-    # If we have multiple points, cluster them
-    if len(track_pts) > 1:
-      cluster_idxs = cluster_points_centroid(track_pts, 2.5)
-      clusters = [None] * (max(cluster_idxs) + 1)
-
-      for idx in range(len(track_pts)):
-        cluster_i = cluster_idxs[idx]
-        if clusters[cluster_i] is None:
-          clusters[cluster_i] = Cluster()
-        clusters[cluster_i].add(self.tracks[idens[idx]])
-    elif len(track_pts) == 1:
-      # FIXME: cluster_point_centroid hangs forever if len(track_pts) == 1
-      cluster_idxs = [0]
-      clusters = [Cluster()]
-      clusters[0].add(self.tracks[idens[0]])
-    else:
-      clusters = []
-
-    # if a new point, reset accel to the rest of the cluster
-    for idx in range(len(track_pts)):
-      if self.tracks[idens[idx]].cnt <= 1:
-        aLeadK = clusters[cluster_idxs[idx]].aLeadK
-        aLeadTau = clusters[cluster_idxs[idx]].aLeadTau
-        self.tracks[idens[idx]].reset_a_lead(aLeadK, aLeadTau)
+    if enable_lead:
+      self.update_tracks()
+    elif len(self.tracks):
+      # only the leads read the filters, the tracks start over once leads are enabled
+      self.tracks = Tracks(self.kalman_params)
 
     # *** publish radarState ***
     dat = messaging.new_message('radarState')
@@ -165,11 +147,28 @@ class RadarD():
     radarState.carStateMonoTime = sm.logMonoTime['carState']
 
     if enable_lead:
-      if len(sm['modelV2'].leads) > 1:
-        radarState.leadOne = get_lead(self.v_ego, self.ready, clusters, sm['modelV2'].leads[0], low_speed_override=True)
-        radarState.leadTwo = get_lead(self.v_ego, self.ready, clusters, sm['modelV2'].leads[1], low_speed_override=False)
+      leads = sm['modelV2'].leads
+      if len(leads) > 1:
+        radarState.leadOne, radarState.leadTwo = get_leads(self.v_ego, self.ready, self.clusters, [leads[0], leads[1]])
     return dat
 
+  def update_tracks(self):
+    pts = self.points
+
+    # align v_ego by a fixed time to align it with the radar measurement
+    v_lead = pts['vRel'] + self.v_ego_hist[0]
+
+    # *** compute the tracks ***
+    self.tracks.update(pts['trackId'], pts['dRel'], pts['yRel'], pts['vRel'], v_lead, pts['measured'])
+
+    # cluster the points
+    cluster_idxs = np.array(self.cluster_points(self.tracks.get_keys_for_cluster(), 2.5), dtype=np.int64)
+    self.clusters = Clusters(self.tracks, cluster_idxs)
+
+    # if a new point, reset accel to the rest of the cluster
+    new = self.tracks.cnt <= 1
+    self.tracks.reset_a_lead(new, self.clusters.aLeadK[cluster_idxs[new]], self.clusters.aLeadTau[cluster_idxs[new]])
+
 
 # fuses camera and radar data for best lead detection
 def radard_thread(sm=None, pm=None, can_sock=None):
@@ -215,15 +214,15 @@ def radard_thread(sm=None, pm=None, can_sock=None):
     pm.send('radarState', dat)
 
     # *** publish tracks for UI debugging (keep last) ***
-    tracks = RD.tracks
-    dat = messaging.new_message('liveTracks', len(tracks))
+    points = RD.points
+    dat = messaging.new_message('liveTracks', len(points))
 
-    for cnt, ids in enumerate(sorted(tracks.keys())):
+    for cnt, (track_id, d_rel, y_rel, v_rel, _) in enumerate(points.tolist()):
       dat.liveTracks[cnt] = {
-        "trackId": ids,
-        "dRel": float(tracks[ids].dRel),
-        "yRel": float(tracks[ids].yRel),
-        "vRel": float(tracks[ids].vRel),
+        "trackId": track_id,
+        "dRel": d_rel,
+        "yRel": y_rel,
+        "vRel": v_rel,
       }
     pm.send('liveTracks', dat)
 
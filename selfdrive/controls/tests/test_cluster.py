@@ -0,0 +1,42 @@
+#!/usr/bin/env python3
+import unittest
+
+import numpy as np
+
+from selfdrive.controls.lib.cluster.fastcluster_py import GRID_MIN_POINTS, cluster_points, cluster_points_centroid, cluster_points_grid
+from selfdrive.test.synthetic import radar_points
+
+DIST = 2.5
+
+
+class TestCluster(unittest.TestCase):
+  def test_grid_equals_fastcluster(self):
+    rnd = np.random.RandomState(0)
+    for n in [2, 3, 5, 16, 32, 64, 200]:
+      for _ in range(50):
+        pts = radar_points(n, rnd)
+        self.assertEqual(cluster_points_grid(pts, DIST), cluster_points_centroid(pts, DIST))
+
+  def test_dense(self):
+    # chains of points that merge into few clusters
+    rnd = np.random.RandomState(1)
+    for _ in range(50):
+      pts = rnd.uniform(0, 6, (40, 3))
+      self.assertEqual(cluster_points_grid(pts, DIST), cluster_points_centroid(pts, DIST))
+
+  def test_few_points(self):
+    for f in [cluster_points_grid, cluster_points_centroid]:
+      self.assertEqual(f(np.zeros((0, 3)), DIST), [])
+      self.assertEqual(f(np.array([[10., 1., 2.]]), DIST), [0])
+      self.assertEqual(f(np.array([[10., 1., 2.], [10., 1., 3.]]), DIST), [0, 0])
+      self.assertEqual(f(np.array([[10., 1., 2.], [20., 1., 3.]]), DIST), [0, 1])
+
+  def test_cluster_points(self):
+    # the full distance matrix below GRID_MIN_POINTS, same clusters either way
+    rnd = np.random.RandomState(2)
+    for n in [16, GRID_MIN_POINTS - 1, GRID_MIN_POINTS]:
+      pts = radar_points(n, rnd)
+      self.assertEqual(cluster_points(pts, DIST), cluster_points_centroid(pts, DIST))
+
+if __name__ == "__main__":
+  unittest.main()
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+import random
+import unittest
+
+from cereal import car
+from common.realtime import DT_CTRL
+from selfdrive.controls.lib.events import ET, EVENTS, EVENT_NAME, Alert, EventName, Events
+
+EVENT_TYPES = [ET.ENABLE, ET.PRE_ENABLE, ET.NO_ENTRY, ET.WARNING, ET.USER_DISABLE, ET.SOFT_DISABLE, ET.IMMEDIATE_DISABLE, ET.PERMANENT]
+
+# events without callback alerts, so no CarParams or SubMaster is needed
+STATIC_EVENTS = sorted(e for e, alerts in EVENTS.items() if all(isinstance(a, Alert) for a in alerts.values()))
+
+# a typical frame while engaged: a few warnings and the events carState always sends
+TYPICAL_EVENTS = [EventName.ldw, EventName.preDriverDistracted, EventName.steerSaturated, EventName.pcmEnable]
+
+
+def reference_alerts(names, event_types, frames_active):
+  """Reference for create_alerts: every event and type looked up in EVENTS"""
+  ret = []
+  for e in names:
+    for et in event_types:
+      if et in EVENTS[e]:
+        alert = EVENTS[e][et]
+        if not isinstance(alert, Alert):
+          alert = alert()
+        if DT_CTRL * (frames_active.get(e, 0) + 1) >= alert.creation_delay:
+          ret.append((f"{EVENT_NAME[e]}/{et}", et, alert.alert_text_1))
+  return ret
+
+
+def reference_msg(names):
+  ret = []
+  for e in names:
+    event = car.CarEvent.new_message(name=e)
+    for et in EVENTS.get(e, {}).keys():
+      setattr(event, et, True)
+    ret.append(event.to_dict())
+  return ret
+
+
+def alerts_of(events, event_types):
+  return [(a.alert_type, a.event_type, a.alert_text_1) for a in events.create_alerts(event_types)]
+
+
+def frame(events, active, alert_types):
+  events.clear()
+  for e in active:
+    events.add(e)
+  events.any(ET.NO_ENTRY)
+  events.any(ET.SOFT_DISABLE)
+  alerts = events.create_alerts(alert_types)
+  msg = car.CarState.new_message()
+  msg.events = events.to_msg()
+  return alerts, msg
+
+
+class TestEvents(unittest.TestCase):
+  def test_indexed_equals_reference(self):
+    rnd = random.Random(0)
+    events = Events()
+    for e in [EventName.carUnrecognized, EventName.communityFeatureDisallowed]:
+      events.add(e, static=True)
+
+    # events that stay active for a while, so creation delays are crossed
+    active = set(rnd.sample(STATIC_EVENTS, 5))
+    frames_active = {}
+    for _ in range(1000):
+      if rnd.random() < 0.1:
+        active ^= {rnd.choice(STATIC_EVENTS)}
+
+      frames_active = {e: frames_active.get(e, 0) + 1 for e in set(events.names)}
+      events.clear()
+      for e in sorted(active):
+        events.add(e)
+
+      for et in EVENT_TYPES:
+        self.assertEqual(events.any(et), any(et in EVENTS.get(e, {}) for e in events.names))
+      alert_types = rnd.sample(EVENT_TYPES, rnd.randint(1, 3))
+      self.assertEqual(alerts_of(events, alert_types), reference_alerts(events.names, alert_types, frames_active))
+      self.assertEqual([e.to_dict() for e in events.to_msg()], reference_msg(events.names))
+
+  def test_typical_frame(self):
+    alert_types = [ET.PERMANENT, ET.WARNING]
+    events = Events()
+    for i in range(3):
+      alerts, msg = frame(events, TYPICAL_EVENTS, alert_types)
+      frames_active = dict.fromkeys(TYPICAL_EVENTS, i)
+      self.assertEqual([(a.alert_type, a.event_type, a.alert_text_1) for a in alerts], reference_alerts(TYPICAL_EVENTS, alert_types, frames_active))
+      self.assertEqual([e.to_dict() for e in msg.events], reference_msg(TYPICAL_EVENTS))
+
+
+if __name__ == "__main__":
+  unittest.main()
@@ -0,0 +1,160 @@
+#!/usr/bin/env python3
+import math
+import unittest
+
+import numpy as np
+
+from common.kalman.simple_kalman import KF1D
+from selfdrive.config import RADAR_TO_CAMERA
+from selfdrive.controls.lib.radar_helpers import _LEAD_ACCEL_TAU, Cluster, Clusters, Tracks, v_ego_stationary
+from selfdrive.controls.radard import POINT_DTYPE, KalmanParams, RadarD, get_leads
+from selfdrive.test.synthetic import RADAR_TS, FakeSubMaster, SyntheticRadar, drive
+
+
+def kf1d_tracks(kalman_params, frames):
+  """Reference for Tracks: a KF1D per track id. Returns cnt, vLeadK, aLeadK and aLeadTau by id for every frame"""
+  A, C, K = kalman_params.A, kalman_params.C, kalman_params.K
+  filters, ret = {}, []
+  for ids, v_lead in frames:
+    prev, filters = filters, {}
+    for track_id, v in zip(ids, v_lead):
+      if track_id in prev:
+        cnt, kf, a_lead_tau = prev[track_id]
+        kf.update(v)
+      else:
+        cnt, kf, a_lead_tau = 0, KF1D([[v], [0.0]], A, C, K), _LEAD_ACCEL_TAU
+      a_lead_k = float(kf.x[1][0])
+      a_lead_tau = _LEAD_ACCEL_TAU if abs(a_lead_k) < 0.5 else a_lead_tau * 0.9
+      filters[track_id] = (cnt + 1, kf, a_lead_tau)
+    ret.append({i: (cnt, float(kf.x[0][0]), float(kf.x[1][0]), tau) for i, (cnt, kf, tau) in filters.items()})
+  return ret
+
+
+def get_lead(v_ego, ready, clusters, lead_msg, low_speed_override=True):
+  """Reference for get_leads: one lead at a time against a list of Cluster"""
+  def prob(c):
+    laplacian_cdf = lambda x, mu, b: math.exp(-abs(x - mu) / max(b, 1e-4))
+    return (laplacian_cdf(c.dRel, lead_msg.xyva[0] - RADAR_TO_CAMERA, lead_msg.xyvaStd[0]) *
+            laplacian_cdf(c.yRel, -lead_msg.xyva[1], lead_msg.xyvaStd[1]) *
+            laplacian_cdf(c.vRel, lead_msg.xyva[2], lead_msg.xyvaStd[2]))
+
+  cluster = None
+  if len(clusters) > 0 and ready and lead_msg.prob > .5:
+    offset_vision_dist = lead_msg.xyva[0] - RADAR_TO_CAMERA
+    cluster = max(clusters, key=prob)
+    dist_sane = abs(cluster.dRel - offset_vision_dist) < max([(offset_vision_dist)*.25, 5.0])
+    vel_sane = (abs(cluster.vRel - lead_msg.xyva[2]) < 10) or (v_ego + cluster.vRel > 3)
+    if not (dist_sane and vel_sane):
+      cluster = None
+
+  lead_dict = {'status': False}
+  if cluster is not None:
+    lead_dict = cluster.get_RadarState(lead_msg.prob)
+  elif ready and lead_msg.prob > .5:
+    lead_dict = Cluster.get_RadarState_from_vision(lead_msg, v_ego)
+
+  if low_speed_override:
+    low_speed_clusters = [c for c in clusters if abs(c.yRel) < 1.5 and v_ego < v_ego_stationary and c.dRel < 25]
+    if len(low_speed_clusters) > 0:
+      closest_cluster = min(low_speed_clusters, key=lambda c: c.dRel)
+      if (not lead_dict['status']) or (closest_cluster.dRel < lead_dict['dRel']):
+        lead_dict = closest_cluster.get_RadarState()
+  return lead_dict
+
+
+def random_tracks(rnd, n, steps=1):
+  tracks = Tracks(KalmanParams(RADAR_TS))
+  for _ in range(steps):
+    tracks.update(np.arange(n), rnd.uniform(0, 100, n), rnd.uniform(-5, 5, n), rnd.uniform(-10, 2, n), rnd.uniform(0, 30, n), rnd.rand(n) > 0.3)
+  return tracks
+
+
+class TestRadard(unittest.TestCase):
+  def test_tracks_equal_kf1d(self):
+    for n in [0, 1, 8, 32]:
+      sm = FakeSubMaster()
+      radar = SyntheticRadar(n, seed=n)
+      kalman_params = KalmanParams(RADAR_TS)
+      tracks = Tracks(kalman_params)
+
+      frames, states = [], []
+      for step in range(100):
+        rr = drive(sm, radar, 25., [20., 60.], step)
+        pts = np.array(sorted((pt.trackId, pt.dRel, pt.yRel, pt.vRel, pt.measured) for pt in rr.points), dtype=POINT_DTYPE)
+        v_lead = pts['vRel'] + 25.
+        tracks.update(pts['trackId'], pts['dRel'], pts['yRel'], pts['vRel'], v_lead, pts['measured'])
+        frames.append((pts['trackId'], v_lead))
+        states.append((tracks.ids, tracks.state))
+
+      for step, (expected, (ids, state)) in enumerate(zip(kf1d_tracks(kalman_params, frames), states)):
+        self.assertEqual(list(ids), sorted(expected))
+        for i, track_id in enumerate(ids):
+          np.testing.assert_allclose(state[:, i], expected[track_id], err_msg=f"{n} points, step {step}, track {track_id}")
+
+  def test_clusters_equal_means(self):
+    rnd = np.random.RandomState(0)
+    for n in [1, 4, 16, 64]:
+      # some tracks are new, their accel isn't learned yet
+      tracks = random_tracks(rnd, n, steps=2)
+      tracks.cnt[rnd.rand(n) > 0.6] = 1
+      cluster_idxs = rnd.randint(0, max(n // 3, 1), n)
+      cluster_idxs = np.unique(cluster_idxs, return_inverse=True)[1]
+      clusters = Clusters(tracks, cluster_idxs)
+
+      for c in range(cluster_idxs.max() + 1):
+        members = cluster_idxs == c
+        filtered = members & (tracks.cnt > 1)
+        for name in ['dRel', 'yRel', 'vRel', 'vLead', 'vLeadK']:
+          self.assertAlmostEqual(getattr(clusters, name)[c], getattr(tracks, name)[members].mean())
+        self.assertEqual(clusters.measured[c], tracks.measured[members].any())
+        self.assertAlmostEqual(clusters.aLeadK[c], tracks.aLeadK[filtered].mean() if filtered.any() else 0.)
+        self.assertAlmostEqual(clusters.aLeadTau[c], tracks.aLeadTau[filtered].mean() if filtered.any() else _LEAD_ACCEL_TAU)
+
+  def test_new_tracks_reset(self):
+    sm = FakeSubMaster()
+    radar = SyntheticRadar(16)
+    rd = RadarD(RADAR_TS)
+    for step in range(50):
+      rd.update(sm, drive(sm, radar, 25., [20., 60.], step), True)
+
+      # new tracks take the accel of the rest of their cluster
+      new = rd.tracks.cnt <= 1
+      np.testing.assert_array_equal(rd.tracks.aLeadK[new], rd.clusters.aLeadK[rd.clusters.cluster_idxs[new]])
+      np.testing.assert_array_equal(rd.tracks.aLeadTau[new], rd.clusters.aLeadTau[rd.clusters.cluster_idxs[new]])
+      np.testing.assert_array_equal(rd.tracks.vLeadK[new], rd.tracks.vLead[new])
+
+  def test_without_leads(self):
+    sm = FakeSubMaster()
+    radar = SyntheticRadar(16)
+    rd, rd_fresh = RadarD(RADAR_TS), RadarD(RADAR_TS)
+    for step in range(40):
+      rr = drive(sm, radar, 25., [20., 60.], step)
+      # leads are enabled halfway, the tracks start over like in a fresh radard
+      enable_lead = step >= 20
+      rd.update(sm, rr, enable_lead)
+      self.assertEqual(list(rd.points['trackId']), sorted(pt.trackId for pt in rr.points))
+      if not enable_lead:
+        self.assertEqual(len(rd.tracks), 0)
+        continue
+
+      rd_fresh.update(sm, rr, True)
+      np.testing.assert_array_equal(rd.tracks.state, rd_fresh.tracks.state)
+
+  def test_batched_lead_matching(self):
+    rnd = np.random.RandomState(0)
+    sm = FakeSubMaster()
+    for n in [1, 4, 16, 64, 256]:
+      tracks = random_tracks(rnd, n)
+      clusters = Clusters(tracks, np.arange(n))
+      cluster_list = list(clusters)
+
+      for v_ego in [2., 25.]:
+        drive(sm, SyntheticRadar(0), v_ego, rnd.uniform(5, 80, 2).tolist(), 0)
+        leads = sm['modelV2'].leads
+        lead_dicts = get_leads(v_ego, True, clusters, [leads[0], leads[1]])
+        self.assertEqual(lead_dicts[0], get_lead(v_ego, True, cluster_list, leads[0], low_speed_override=True))
+        self.assertEqual(lead_dicts[1], get_lead(v_ego, True, cluster_list, leads[1], low_speed_override=False))
+
+
+if __name__ == "__main__":
+  unittest.main()
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+import argparse
+import random
+import timeit
+
+from cereal import log
+from panda import Panda
+from panda.python import parse_can_buffer as parse_can_buffer_struct
+from selfdrive.boardd.boardd import can_capnp_to_can_batch, can_capnp_to_can_list, can_list_to_can_capnp
+from selfdrive.boardd.can_batch import CanBatch, parse_can_buffer_batch
+from selfdrive.boardd.panda_can import CanBatchPanda, parse_can_buffer
+
+
+def random_frames(n, seed=0):
+  rnd = random.Random(seed)
+  frames = []
+  for _ in range(n):
+    address = rnd.randint(0x800, 0x1fffffff) if rnd.random() < 0.2 else rnd.randint(0, 0x7ff)
+    frames.append((address, rnd.getrandbits(16), bytes(rnd.getrandbits(8) for _ in range(rnd.randint(0, 8))), rnd.randint(0, 2)))
+  return frames
+
+
+class FakeHandle():
+  def __init__(self):
+    self.written = []
+
+  def bulkWrite(self, endpoint, dat, timeout=0):
+    self.written.append(bytes(dat))
+
+
+def fake_panda(cls):
+  p = cls.__new__(cls)
+  p.wifi = False
+  p._handle = FakeHandle()
+  return p
+
+
+def panda_buffer(p, frames):
+  p._handle.written.clear()
+  p.can_send_many(frames)
+  return p._handle.written[0]
+
+
+def best_time(f, number, repeat=5):
+  return min(timeit.repeat(f, number=number, repeat=repeat)) / number
+
+
+def codec_speed(sizes):
+  """panda's struct codec against the numpy one in CanBatchPanda"""
+  old, new = fake_panda(Panda), fake_panda(CanBatchPanda)
+  for n in sizes:
+    frames = random_frames(n)
+    buf = panda_buffer(old, frames)
+    number = max(40960 // n, 1)
+    for name, f_old, f_new in [("parse", lambda: parse_can_buffer_struct(buf), lambda: parse_can_buffer(buf)),
+                               ("pack", lambda: panda_buffer(old, frames), lambda: panda_buffer(new, frames))]:
+      print(f"{n} frames, {name}: struct {best_time(f_old, number) * 1e6:.0f} us, numpy {best_time(f_new, number) * 1e6:.0f} us")
+
+
+def batch_speed(n):
+  """Tuple lists against CanBatch on the panda and capnp paths"""
+  frames = random_frames(n)
+  batch = CanBatch.from_list(frames)
+  old, new = fake_panda(Panda), fake_panda(CanBatchPanda)
+  buf = panda_buffer(old, frames)
+  dat = can_list_to_can_capnp(frames)
+  paths = [
+    ("panda buffer -> frames", lambda: parse_can_buffer_struct(buf), lambda: parse_can_buffer_batch(buf)),
+    ("frames -> panda buffer", lambda: panda_buffer(old, frames), lambda: panda_buffer(new, batch)),
+    ("frames -> capnp", lambda: can_list_to_can_capnp(frames), lambda: can_list_to_can_capnp(batch)),
+    ("capnp -> frames", lambda: can_capnp_to_can_list(log.Event.from_bytes(dat).can), lambda: can_capnp_to_can_batch([dat])),
+  ]
+  for name, f_list, f_batch in paths:
+    print(f"{n} frames, {name}: tuples {best_time(f_list, 5, 3) * 1e3:.2f} ms, batch {best_time(f_batch, 5, 3) * 1e3:.2f} ms")
+
+
+if __name__ == "__main__":
+  parser = argparse.ArgumentParser(description="Time the CanBatch paths against the tuple list ones")
+  parser.add_argument("--sizes", type=int, nargs="*", default=[1, 16, 64, 256, 4096], help="frames per call")
+  parser.add_argument("--batch-frames", type=int, default=10000, help="frames for the CanBatch paths")
+  args = parser.parse_args()
+
+  codec_speed(args.sizes)
+  batch_speed(args.batch_frames)
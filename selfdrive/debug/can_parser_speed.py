@@ -0,0 +1,42 @@
+#!/usr/bin/env python3
+import argparse
+import timeit
+
+from cereal import car
+from opendbc.can.parser import CANParser
+from selfdrive.car.hyundai.carstate import CarState
+from selfdrive.car.hyundai.values import CAR
+from selfdrive.test.synthetic import can_bus
+
+if __name__ == "__main__":
+  parser = argparse.ArgumentParser(description="Time CANParser.update_string per string against update_strings on the Hyundai parser")
+  parser.add_argument("-n", type=int, default=1000, help="frames to parse")
+  args = parser.parse_args()
+
+  CP = car.CarParams.new_message(carFingerprint=CAR.SONATA, enableCruise=True, mdpsBus=0, sasBus=0, sccBus=0)
+  cp, cp_batch = CarState.get_can_parser(CP), CarState.get_can_parser(CP)
+
+  # the same signals, values only exported to vl_array
+  signals = [None] * len(cp.vl_array)
+  for (msg, sig), idx in cp.sig_index.items():
+    if isinstance(msg, str):
+      signals[idx] = (sig, msg, cp.vl_array[idx])
+  cp_array = CANParser(cp.dbc_name.decode(), signals, [], 0, export_dicts=False)
+
+  addresses = sorted({msg for msg, _ in cp.sig_index if isinstance(msg, int)})
+  frames = can_bus(addresses, 100)
+
+  def sequential():
+    for i in range(args.n):
+      for s in frames[i % len(frames)]:
+        cp.update_string(s)
+
+  def batch(p):
+    for i in range(args.n):
+      p.update_strings(frames[i % len(frames)])
+
+  t_seq = timeit.timeit(sequential, number=1)
+  t_batch = timeit.timeit(lambda: batch(cp_batch), number=1)
+  t_array = timeit.timeit(lambda: batch(cp_array), number=1)
+  print(f"{len(addresses)} msgs/frame: sequential {t_seq / args.n * 1e6:.1f} us/frame, "
+        f"batch {t_batch / args.n * 1e6:.1f} us/frame, batch without dicts {t_array / args.n * 1e6:.1f} us/frame")
@@ -0,0 +1,23 @@
+#!/usr/bin/env python3
+import argparse
+import timeit
+
+import numpy as np
+
+from selfdrive.controls.lib.cluster.fastcluster_py import cluster_points_centroid, cluster_points_grid
+from selfdrive.test.synthetic import radar_points
+
+DIST = 2.5
+
+if __name__ == "__main__":
+  parser = argparse.ArgumentParser(description="Time fastcluster against the grid clustering on synthetic radar points")
+  parser.add_argument("--points", type=int, nargs="*", default=[16, 32, 64, 256, 1024], help="points to cluster")
+  args = parser.parse_args()
+
+  rnd = np.random.RandomState(2)
+  for n in args.points:
+    pts = radar_points(n, rnd)
+    number = max(10000 // n, 3)
+    t_fc = min(timeit.repeat(lambda: cluster_points_centroid(pts, DIST), number=number, repeat=5)) / number
+    t_grid = min(timeit.repeat(lambda: cluster_points_grid(pts, DIST), number=number, repeat=5)) / number
+    print(f"{n} points: fastcluster {t_fc * 1e6:.1f} us, grid {t_grid * 1e6:.1f} us")
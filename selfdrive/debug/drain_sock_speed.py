@@ -0,0 +1,34 @@
+#!/usr/bin/env python3
+import argparse
+import time
+import timeit
+
+from cereal import log
+import cereal.messaging as messaging
+from selfdrive.test.synthetic import random_can_packet
+
+if __name__ == "__main__":
+  parser = argparse.ArgumentParser(description="Time draining a can socket, run it before and after a change to compare")
+  parser.add_argument("--msgs", type=int, default=100, help="can msgs queued per drain")
+  parser.add_argument("--frames", type=int, default=64, help="can frames per msg")
+  parser.add_argument("-n", type=int, default=20, help="drains per measurement")
+  args = parser.parse_args()
+
+  pub = messaging.pub_sock('can')
+  sock = messaging.sub_sock('can', timeout=100)
+  time.sleep(0.1)
+  packets = [random_can_packet(args.frames, range(0x100, 0x800), [0, 1, 2]) for _ in range(args.msgs)]
+
+  # only the drain is timed
+  t = []
+  for _ in range(args.n):
+    for dat in packets:
+      pub.send(dat)
+    t0 = time.perf_counter()
+    assert len(messaging.drain_sock_raw(sock)) == args.msgs
+    t.append(time.perf_counter() - t0)
+  t_drain = min(t)
+  print(f"drain {args.msgs} can msgs of {args.frames} frames: {t_drain * 1e3:.3f} ms ({args.msgs / t_drain / 1e6:.2f}M msgs/s)")
+
+  t_decode = timeit.timeit(lambda: [log.Event.from_bytes(d) for d in packets], number=args.n) / args.n
+  print(f"from_bytes for the same {args.msgs} msgs: {t_decode * 1e3:.3f} ms")
@@ -0,0 +1,33 @@
+#!/usr/bin/env python3
+import argparse
+import timeit
+
+from cereal import car
+from selfdrive.controls.lib.events import ET, EventName, Events
+
+# a typical frame while engaged: a few warnings and the events carState always sends
+TYPICAL_EVENTS = [EventName.ldw, EventName.preDriverDistracted, EventName.steerSaturated, EventName.pcmEnable]
+
+
+def frame(events, active, alert_types):
+  """The Events calls controlsd makes every frame"""
+  events.clear()
+  for e in active:
+    events.add(e)
+  events.any(ET.NO_ENTRY)
+  events.any(ET.SOFT_DISABLE)
+  events.create_alerts(alert_types)
+  msg = car.CarState.new_message()
+  msg.events = events.to_msg()
+
+
+if __name__ == "__main__":
+  parser = argparse.ArgumentParser(description="Time a controlsd frame of Events calls, run it before and after a change to compare")
+  parser.add_argument("-n", type=int, default=2000, help="frames per measurement")
+  args = parser.parse_args()
+
+  alert_types = [ET.PERMANENT, ET.WARNING]
+  for active in [TYPICAL_EVENTS, TYPICAL_EVENTS + [EventName.fcw, EventName.outOfSpace, EventName.lowMemory]]:
+    events = Events()
+    t = min(timeit.repeat(lambda: frame(events, active, alert_types), number=args.n, repeat=3)) / args.n
+    print(f"{len(active)} active events, clear/add/any/create_alerts/to_msg: {t * 1e6:.1f} us")
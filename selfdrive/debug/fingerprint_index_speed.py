@@ -0,0 +1,34 @@
+#!/usr/bin/env python3
+import argparse
+import random
+import timeit
+
+from selfdrive.car.fingerprints import FINGERPRINT_INDEX, _FINGERPRINTS, all_known_cars, eliminate_incompatible_cars
+from selfdrive.test.synthetic import fingerprint_frames
+
+
+def replay_list(frames):
+  candidates = all_known_cars()
+  for msg in frames:
+    candidates = eliminate_incompatible_cars(msg, candidates)
+  return candidates
+
+
+def replay_index(frames):
+  candidates = FINGERPRINT_INDEX.all_cars
+  for msg in frames:
+    candidates = FINGERPRINT_INDEX.eliminate(msg, candidates)
+  return FINGERPRINT_INDEX.to_list(candidates)
+
+
+if __name__ == "__main__":
+  parser = argparse.ArgumentParser(description="Time fingerprinting with FINGERPRINT_INDEX against eliminate_incompatible_cars")
+  parser.add_argument("-n", type=int, default=2000, help="can messages replayed per car")
+  args = parser.parse_args()
+
+  frames = [fingerprint_frames(random.choice(_FINGERPRINTS[car_name]), args.n) for car_name in all_known_cars()]
+  n = sum(len(f) for f in frames)
+
+  t_list = timeit.timeit(lambda: [replay_list(f) for f in frames], number=1)
+  t_index = timeit.timeit(lambda: [replay_index(f) for f in frames], number=1)
+  print(f"{n} frames, list: {t_list / n * 1e6:.2f} us/msg, index: {t_index / n * 1e6:.2f} us/msg")
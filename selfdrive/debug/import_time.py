@@ -0,0 +1,53 @@
+#!/usr/bin/env python3
+import argparse
+import statistics
+import subprocess
+import sys
+
+# prints the import time in seconds and the max RSS in kB
+IMPORT_SCRIPT = """
+import resource, time
+t = time.monotonic()
+import {module}
+print(time.monotonic() - t, resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)
+"""
+
+
+def measure_import(module):
+  out = subprocess.check_output([sys.executable, "-c", IMPORT_SCRIPT.format(module=module)], stderr=subprocess.DEVNULL)
+  dt, rss = out.split()[-2:]
+  return float(dt), int(rss)
+
+
+def slowest_imports(module, n):
+  """The n imports with the highest cumulative time, from python -X importtime"""
+  err = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                       stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, encoding="utf8", check=False).stderr
+  imports = []
+  for line in err.splitlines():
+    if not line.startswith("import time:") or "cumulative" in line:
+      continue
+    _, cumulative, name = line[len("import time:"):].split("|")
+    imports.append((int(cumulative), name.strip()))
+  return sorted(imports, reverse=True)[:n]
+
+
+if __name__ == "__main__":
+  parser = argparse.ArgumentParser(description="Import time and RSS of modules, each imported in a fresh interpreter. "
+                                               "Run it on two checkouts to compare them.")
+  parser.add_argument("modules", nargs="*", default=["selfdrive.controls.controlsd", "selfdrive.car.car_helpers", "selfdrive.car.fingerprints"])
+  parser.add_argument("-n", type=int, default=5, help="imports per module")
+  parser.add_argument("--top", type=int, default=0, help="also show the N slowest imports of each module")
+  args = parser.parse_args()
+
+  for module in args.modules:
+    try:
+      results = [measure_import(module) for _ in range(args.n)]
+    except subprocess.CalledProcessError:
+      print(f"{module}: import failed")
+      continue
+
+    times, rss = zip(*results)
+    print(f"{module}: median {statistics.median(times) * 1e3:.0f} ms, min {min(times) * 1e3:.0f} ms, max RSS {max(rss) / 1024:.1f} MB")
+    for cumulative, name in slowest_imports(module, args.top):
+      print(f"  {cumulative / 1e3:8.1f} ms  {name}")
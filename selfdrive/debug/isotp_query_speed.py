@@ -0,0 +1,32 @@
+#!/usr/bin/env python3
+import argparse
+import random
+import timeit
+
+from cereal import log
+from selfdrive.car.fw_versions import REQUESTS
+from selfdrive.car.isotp_parallel_query import IsoTpParallelQuery
+from selfdrive.test.synthetic import ReplaySocket, random_can_packet
+
+BUS = 1
+PACKET_RATE = 100  # boardd sends a can packet every 10ms
+
+if __name__ == "__main__":
+  parser = argparse.ArgumentParser(description="Time the ISO-TP receive path on a second of unrelated bus traffic")
+  parser.add_argument("--rate", type=int, default=2000, help="background msgs/s")
+  parser.add_argument("-n", type=int, default=20, help="seconds of traffic to receive")
+  args = parser.parse_args()
+
+  addrs = [random.randint(0x100, 0x5ff) for _ in range(40)]
+  background = [random_can_packet(args.rate // PACKET_RATE, addrs, [0, BUS, 2]) for _ in range(PACKET_RATE)]
+
+  _, request, response = next(r for r in REQUESTS if r[0] == 'honda')
+  query = IsoTpParallelQuery(None, None, BUS, [0x18da30f1, 0x18da28f1], request, response)
+
+  def rx_second():
+    query.logcan = ReplaySocket(background)
+    query.rx()
+
+  t_rx = timeit.timeit(rx_second, number=args.n) / args.n
+  t_decode = timeit.timeit(lambda: [m.address for d in background for m in log.Event.from_bytes(d).can], number=args.n) / args.n
+  print(f"{args.rate} background msgs: rx {t_rx * 1e3:.2f} ms, decoding every packet {t_decode * 1e3:.2f} ms")
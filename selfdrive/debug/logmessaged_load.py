@@ -0,0 +1,57 @@
+#!/usr/bin/env python3
+import argparse
+import json
+import time
+from multiprocessing import Process
+
+import zmq
+import cereal.messaging as messaging
+
+
+def push_lines(n, size, level):
+  sock = zmq.Context.instance().socket(zmq.PUSH)
+  sock.connect("ipc:///tmp/logmessage")
+  for i in range(n):
+    line = json.dumps({'msg': {'event': 'load_test', 'i': i, 'pad': 'x' * size}, 'levelnum': level})
+    sock.send((chr(level) + line).encode('utf8'))
+  sock.close(linger=1000)
+
+
+if __name__ == "__main__":
+  parser = argparse.ArgumentParser(description="Push log lines through logmessaged and report its throughput")
+  parser.add_argument("-n", type=int, default=100000, help="number of log lines")
+  parser.add_argument("--size", type=int, default=200, help="padding bytes per line")
+  # lines below INFO aren't forwarded to logentries, so by default this doesn't flood it
+  parser.add_argument("--level", type=int, default=10, help="log level of the pushed lines")
+  parser.add_argument("--start", action="store_true", help="start logmessaged instead of using a running one")
+  args = parser.parse_args()
+
+  if args.start:
+    from selfdrive.logmessaged import main
+    proc = Process(name="logmessaged", target=main, daemon=True)
+    proc.start()
+    time.sleep(1)
+
+  sub = messaging.sub_sock('logMessage', timeout=1000)
+  # SubSocket.receive holds the GIL, so push from another process
+  pusher = Process(name="pusher", target=push_lines, args=(args.n, args.size, args.level))
+
+  received, nbytes = 0, 0
+  t_start = time.monotonic()
+  t_last = t_start
+  pusher.start()
+  while received < args.n:
+    # decoding here would make us the bottleneck
+    msgs = messaging.drain_sock_raw(sub, wait_for_one=True)
+    if not msgs:
+      break
+    t_last = time.monotonic()
+    received += len(msgs)
+    nbytes += sum(map(len, msgs))
+  pusher.join()
+
+  dt = t_last - t_start
+  print(f"pushed {args.n} lines, received {received} logMessage events in {dt:.2f} s")
+  print(f"{received / dt:.0f} lines/s, {nbytes / dt / 1e6:.2f} MB/s of logMessage events")
+  if received < args.n:
+    print(f"lost {args.n - received} lines")
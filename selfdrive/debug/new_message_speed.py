@@ -0,0 +1,48 @@
+#!/usr/bin/env python3
+import argparse
+import timeit
+
+from cereal import car
+import cereal.messaging as messaging
+
+
+def controlsd_publish(CS, CC, car_events):
+  """The messages controlsd publishes every frame, serialized like PubMaster.send"""
+  dat = messaging.new_message('controlsState')
+  controlsState = dat.controlsState
+  controlsState.canMonoTimes = list(CS.canMonoTimes)
+  controlsState.enabled = True
+  controlsState.active = True
+  controlsState.vCruise = 80.
+  controlsState.lateralControlState.init('pidState').p = 0.1
+  ret = [dat.to_bytes()]
+
+  cs_send = messaging.new_message('carState')
+  cs_send.carState = CS
+  cs_send.carState.events = car_events
+  ret.append(cs_send.to_bytes())
+
+  ce_send = messaging.new_message('carEvents', len(car_events))
+  ce_send.carEvents = car_events
+  ret.append(ce_send.to_bytes())
+
+  cc_send = messaging.new_message('carControl')
+  cc_send.carControl = CC
+  ret.append(cc_send.to_bytes())
+  return ret
+
+
+if __name__ == "__main__":
+  parser = argparse.ArgumentParser(description="Time new_message, run it before and after a change to compare")
+  parser.add_argument("-n", type=int, default=2000, help="calls per measurement")
+  args = parser.parse_args()
+
+  CS = car.CarState.new_message(vEgo=20., aEgo=0.1, steeringAngleDeg=2., gas=0.1, canMonoTimes=[1, 2, 3])
+  CC = car.CarControl.new_message(enabled=True, active=True)
+  CC.actuators.steer = 0.2
+  car_events = [car.CarEvent.new_message(name=car.CarEvent.EventName.ldw, warning=True)]
+
+  for name, f in [('new_message', lambda: messaging.new_message('carControl')),
+                  ('controlsd publish set', lambda: controlsd_publish(CS, CC, car_events))]:
+    t = min(timeit.repeat(f, number=args.n, repeat=5)) / args.n
+    print(f"{name}: {t * 1e6:.1f} us")
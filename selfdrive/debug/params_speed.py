@@ -0,0 +1,19 @@
+#!/usr/bin/env python3
+import shutil
+import tempfile
+import timeit
+
+from common.params import CachedParams, Params
+
+if __name__ == "__main__":
+  d = tempfile.mkdtemp()
+  try:
+    Params(d).put("OpkrVariableCruise", "1")
+    cached = CachedParams(d)
+
+    n = 10000
+    t_params = timeit.timeit(lambda: int(Params(d).get("OpkrVariableCruise")), number=n)
+    t_cached = timeit.timeit(lambda: cached.get_int("OpkrVariableCruise"), number=n)
+    print(f"Params().get: {t_params / n * 1e6:.2f} us/call, CachedParams.get_int: {t_cached / n * 1e6:.2f} us/call")
+  finally:
+    shutil.rmtree(d)
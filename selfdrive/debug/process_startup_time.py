@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+import argparse
+import os
+import signal
+import statistics
+import time
+from multiprocessing import Process
+
+import cereal.messaging as messaging
+from selfdrive.manager.process import join_process, launcher, start_zygote, zygote
+from selfdrive.manager.process_config import managed_processes
+
+# first service each process publishes
+PROCESS_SERVICES = {
+  "controlsd": "controlsState",
+  "plannerd": "longitudinalPlan",
+  "radard": "radarState",
+}
+
+
+def time_to_first_message(start_process, service, timeout):
+  sock = messaging.sub_sock(service, timeout=100)
+  t = time.monotonic()
+  proc = start_process()
+  dt = None
+  while time.monotonic() - t < timeout:
+    if messaging.recv_one(sock) is not None:
+      dt = time.monotonic() - t
+      break
+
+  if proc.exitcode is None:
+    os.kill(proc.pid, signal.SIGINT)
+  join_process(proc, 5)
+  if proc.exitcode is None:
+    proc.kill()
+    proc.join()
+  return dt
+
+
+if __name__ == "__main__":
+  parser = argparse.ArgumentParser(description="Time from starting a process to its first message, forked cold or from the zygote. "
+                                               "The processes need their inputs, so run this on a car or next to a replay.")
+  parser.add_argument("procs", nargs="*", default=list(PROCESS_SERVICES), help="processes to start")
+  parser.add_argument("-n", type=int, default=5, help="starts per process and mode")
+  parser.add_argument("--timeout", type=float, default=30., help="seconds to wait for the first message")
+  args = parser.parse_args()
+
+  start_zygote()
+  for name in args.procs:
+    module = managed_processes[name].module
+    service = PROCESS_SERVICES[name]
+    modes = {
+      # this script never imports the module, so every fork imports it again
+      "cold": lambda: Process(name=name, target=launcher, args=(module,)),
+      "zygote": lambda: zygote.Process(name=name, target=launcher, args=(module,)),
+    }
+
+    for mode, make_process in modes.items():
+      times = []
+      for _ in range(args.n):
+        def start():
+          proc = make_process()
+          proc.start()
+          return proc
+        dt = time_to_first_message(start, service, args.timeout)
+        if dt is not None:
+          times.append(dt)
+
+      if times:
+        print(f"{name} {mode}: median {statistics.median(times) * 1e3:.0f} ms, min {min(times) * 1e3:.0f} ms over {len(times)} starts")
+      else:
+        print(f"{name} {mode}: no {service} within {args.timeout} s")
@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+import argparse
+import timeit
+
+import numpy as np
+
+from selfdrive.controls.lib.radar_helpers import Clusters, Tracks
+from selfdrive.controls.radard import KalmanParams, RadarD, get_leads
+from selfdrive.test.synthetic import RADAR_TS, FakeSubMaster, SyntheticRadar, drive
+
+
+def update_speed(n, enable_lead, steps=100, repeat=20):
+  """Per cycle time of RadarD.update"""
+  sm = FakeSubMaster()
+  radar = SyntheticRadar(n)
+  msgs = [drive(sm, radar, 25., [20., 60.], step) for step in range(steps)]
+
+  def run():
+    rd = RadarD(RADAR_TS)
+    for rr in msgs:
+      rd.update(sm, rr, enable_lead)
+  return min(timeit.repeat(run, number=1, repeat=repeat)) / steps
+
+
+def lead_speed(n):
+  """get_leads for both leads on n clusters"""
+  rnd = np.random.RandomState(0)
+  tracks = Tracks(KalmanParams(RADAR_TS))
+  tracks.update(np.arange(n), rnd.uniform(0, 100, n), rnd.uniform(-5, 5, n), rnd.uniform(-10, 2, n), rnd.uniform(0, 30, n), np.ones(n, dtype=bool))
+  clusters = Clusters(tracks, np.arange(n))
+
+  sm = FakeSubMaster()
+  drive(sm, SyntheticRadar(0), 25., [20., 60.], 0)
+  leads = sm['modelV2'].leads
+
+  number = max(2000 // n, 10)
+  return min(timeit.repeat(lambda: get_leads(25., True, clusters, [leads[0], leads[1]]), number=number, repeat=5)) / number
+
+
+if __name__ == "__main__":
+  parser = argparse.ArgumentParser(description="Time radard on synthetic radar points, run it before and after a change to compare")
+  parser.add_argument("--points", type=int, nargs="*", default=[8, 16, 32, 64, 128], help="radar points per cycle")
+  args = parser.parse_args()
+
+  for n in args.points:
+    for enable_lead in [False, True]:
+      print(f"{n} points, update {'with' if enable_lead else 'without'} leads: {update_speed(n, enable_lead) * 1e3:.3f} ms")
+  for n in args.points:
+    print(f"{n} clusters, both leads: {lead_speed(n) * 1e6:.1f} us")
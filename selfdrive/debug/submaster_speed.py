@@ -0,0 +1,30 @@
+#!/usr/bin/env python3
+import argparse
+import timeit
+
+from cereal import log
+import cereal.messaging as messaging
+from selfdrive.test.synthetic import CONTROLSD_SERVICES, service_frames
+
+if __name__ == "__main__":
+  parser = argparse.ArgumentParser(description="Time a lazy and an eager SubMaster on the controlsd services")
+  parser.add_argument("-n", type=int, default=1000, help="frames to update")
+  args = parser.parse_args()
+
+  frames = service_frames(100)
+
+  # controlsd reads only a few services most frames
+  def run(lazy):
+    sm = messaging.SubMaster(CONTROLSD_SERVICES, addr=None, lazy=lazy)
+    for i in range(args.n):
+      msgs = frames[i % len(frames)]
+      if not lazy:
+        msgs = [log.Event.from_bytes(m) for m in msgs]
+      sm.update_msgs(i * 0.01, msgs)
+      sm.all_alive_and_valid()
+      sm['lateralPlan']
+      sm['longitudinalPlan']
+
+  t_eager = timeit.timeit(lambda: run(False), number=1)
+  t_lazy = timeit.timeit(lambda: run(True), number=1)
+  print(f"eager: {t_eager / args.n * 1e6:.1f} us/frame, lazy: {t_lazy / args.n * 1e6:.1f} us/frame")
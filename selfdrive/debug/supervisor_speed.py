@@ -0,0 +1,49 @@
+#!/usr/bin/env python3
+import argparse
+import os
+import signal
+import time
+
+from selfdrive.manager.process import NativeProcess
+from selfdrive.manager.supervisor import Supervisor
+
+
+def restart_latency(supervisor, p, n=5):
+  """Time from a SIGKILL until the supervisor has restarted the process"""
+  times = []
+  for _ in range(n):
+    os.kill(p.proc.pid, signal.SIGKILL)
+    t = time.monotonic()
+    while p not in supervisor.wait(5.):
+      pass
+    p.restart()
+    supervisor.refresh(p)
+    times.append(time.monotonic() - t)
+  return min(times)
+
+
+def cpu_usage(supervisor, n):
+  """Cpu time of the supervisor's work per deviceState"""
+  t = time.process_time()
+  for _ in range(n):
+    supervisor.wait(0)
+    supervisor.update(started=True)
+    supervisor.get_manager_state_msg()
+  return (time.process_time() - t) / n
+
+
+if __name__ == "__main__":
+  parser = argparse.ArgumentParser(description="Time the process supervisor on dummy processes, run it before and after a change to compare")
+  parser.add_argument("--procs", type=int, default=20, help="dummy processes to supervise")
+  parser.add_argument("-n", type=int, default=200, help="deviceState iterations for the cpu measurement")
+  args = parser.parse_args()
+
+  procs = [NativeProcess(f"dummy{i}", "selfdrive", ["sleep", "600"]) for i in range(args.procs)]
+  try:
+    supervisor = Supervisor(procs)
+    supervisor.update(started=True)
+    print(f"kill to restart: {restart_latency(supervisor, procs[0]) * 1e3:.1f} ms")
+    print(f"{args.procs} processes, cpu per deviceState: {cpu_usage(supervisor, args.n) * 1e6:.0f} us")
+  finally:
+    for p in procs:
+      p.stop(retry=False)
@@ -0,0 +1,44 @@
+#!/usr/bin/env python3
+import argparse
+import logging
+import shutil
+import tempfile
+import timeit
+
+import zmq
+
+from common.logging_extra import SwagLogger, SwagFormatter
+from selfdrive.swaglog import LogMessageHandler
+
+if __name__ == "__main__":
+  parser = argparse.ArgumentParser(description="Time swaglog emits in bursts, run it before and after a change to compare")
+  parser.add_argument("--burst", type=int, default=200, help="log.event calls per burst")
+  parser.add_argument("-n", type=int, default=20, help="bursts per measurement")
+  args = parser.parse_args()
+
+  # not the logmessaged endpoint, so it can run next to openpilot
+  tmpdir = tempfile.mkdtemp()
+  endpoint = f"ipc://{tmpdir}/logmessage"
+  sock = zmq.Context.instance().socket(zmq.PULL)
+  sock.bind(endpoint)
+
+  log = SwagLogger()
+  log.setLevel(logging.DEBUG)
+  handler = LogMessageHandler(SwagFormatter(log), endpoint=endpoint)
+  log.addHandler(handler)
+  alert = {'alertText1': 'TAKE CONTROL IMMEDIATELY', 'alertText2': 'Steering Temporarily Unavailable', 'alertSize': 'full'}
+
+  def run():
+    for i in range(args.burst):
+      log.event('alert_add', alert_type="steerTempUnavailable", enabled=True, i=i, alert=alert)
+
+  times = []
+  for _ in range(args.n):
+    times.append(timeit.timeit(run, number=1))
+    handler.flush()
+    while sock.poll(100):
+      sock.recv()
+  print(f"{min(times) / args.burst * 1e6:.1f} us per emit in bursts of {args.burst}")
+
+  sock.close(linger=0)
+  shutil.rmtree(tmpdir)
@@ -0,0 +1,38 @@
+#!/usr/bin/env python3
+import argparse
+import shutil
+import tempfile
+import timeit
+
+from selfdrive.hardware.eon.hardware import SYSFS_NODES
+from selfdrive.hardware.sysfs import SysfsSampler
+from selfdrive.test.synthetic import EON_ZONES, THERMAL_ZONE, write_eon_sysfs
+
+
+def read_syscalls():
+  with open("/proc/self/io") as f:
+    return int(next(line for line in f if line.startswith("syscr:")).split()[1])
+
+
+if __name__ == "__main__":
+  parser = argparse.ArgumentParser(description="Time a SysfsSampler read of the EON thermald nodes, run it before and after a change to compare")
+  parser.add_argument("-n", type=int, default=1000, help="iterations per measurement")
+  args = parser.parse_args()
+
+  root = tempfile.mkdtemp()
+  try:
+    write_eon_sysfs(root)
+    sampler = SysfsSampler(root)
+    for z in EON_ZONES:
+      sampler.add(f"tz{z}", THERMAL_ZONE % z)
+    for name, (path, node_parser, default) in SYSFS_NODES.items():
+      sampler.add(name, path, node_parser, default)
+    sampler.read()
+
+    reads = read_syscalls()
+    t = timeit.timeit(sampler.read, number=args.n) / args.n
+    r = (read_syscalls() - reads - 1) / args.n
+    print(f"{len(sampler.nodes)} nodes: {r:.0f} read syscalls per iteration, {t * 1e6:.0f} us")
+    sampler.close()
+  finally:
+    shutil.rmtree(root)
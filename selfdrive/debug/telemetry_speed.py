@@ -0,0 +1,23 @@
+#!/usr/bin/env python3
+import subprocess
+import timeit
+
+from selfdrive.hardware.telemetry import TelemetryCollector, get_ip_address
+
+
+def best_time(f, number=20):
+  return min(timeit.repeat(f, number=number, repeat=3)) / number
+
+
+if __name__ == "__main__":
+  # thermald used to fork on its own loop, every fork stalled one iteration
+  t_fork = best_time(lambda: subprocess.check_output(["cat", "/proc/net/dev"]))
+  t_ifconfig = best_time(lambda: subprocess.check_output(["ifconfig", "lo"], encoding='utf8'))
+  t_ioctl = best_time(lambda: get_ip_address("lo"))
+
+  collector = TelemetryCollector(None, {"ip_addr": lambda hardware: {"ip_addr": get_ip_address("lo")}})
+  collector.collect("ip_addr")
+  t_snapshot = best_time(lambda: collector.snapshot["ip_addr"])
+
+  print(f"fork: {t_fork * 1e6:.0f} us, snapshot read: {t_snapshot * 1e6:.2f} us")
+  print(f"ip address: ifconfig {t_ifconfig * 1e6:.0f} us, ioctl {t_ioctl * 1e6:.0f} us")
@@ -1,6 +1,8 @@
 from abc import abstractmethod
 from collections import namedtuple
 
+from selfdrive.hardware.sysfs import read_node
+
 ThermalConfig = namedtuple('ThermalConfig', ['cpu', 'gpu', 'mem', 'bat', 'ambient'])
 
 class HardwareBase:
@@ -12,11 +14,12 @@ class HardwareBase:
 
   @staticmethod
   def read_param_file(path, parser, default=0):
-    try:
-      with open(path) as f:
-        return parser(f.read())
-    except Exception:
-      return default
+    # the file stays open, later reads are a single pread
+    return read_node(path, parser, default)
+
+  def get_sysfs_nodes(self):
+    """deviceState fields that are read from sysfs, name to (path, parser, default)"""
+    return {}
 
   @abstractmethod
   def reboot(self, reason=None):
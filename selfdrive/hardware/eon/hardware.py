@@ -7,10 +7,20 @@ import subprocess
 
 from cereal import log
 from selfdrive.hardware.base import HardwareBase, ThermalConfig
+from selfdrive.hardware.sysfs import read_node
 
 NetworkType = log.DeviceState.NetworkType
 NetworkStrength = log.DeviceState.NetworkStrength
 
+SYSFS_NODES = {
+  "batteryPercent": ("/sys/class/power_supply/battery/capacity", int, 100),
+  "batteryStatus": ("/sys/class/power_supply/battery/status", lambda x: x.strip(), ''),
+  "batteryCurrent": ("/sys/class/power_supply/battery/current_now", int, 0),
+  "batteryVoltage": ("/sys/class/power_supply/battery/voltage_now", int, 0),
+  "usbOnline": ("/sys/class/power_supply/usb/present", lambda x: bool(int(x)), False),
+}
+WIRELESS_PATH = "/proc/net/wireless"
+
 
 def service_call(call):
   try:
@@ -60,6 +70,175 @@ def getprop(key):
   return subprocess.check_output(["getprop", key], encoding='utf8').strip()
 
 
+# from SignalStrength.java
+def get_lte_level(rsrp, rssnr):
+  INT_MAX = 2147483647
+  if rsrp == INT_MAX:
+    lvl_rsrp = NetworkStrength.unknown
+  elif rsrp >= -95:
+    lvl_rsrp = NetworkStrength.great
+  elif rsrp >= -105:
+    lvl_rsrp = NetworkStrength.good
+  elif rsrp >= -115:
+    lvl_rsrp = NetworkStrength.moderate
+  else:
+    lvl_rsrp = NetworkStrength.poor
+  if rssnr == INT_MAX:
+    lvl_rssnr = NetworkStrength.unknown
+  elif rssnr >= 45:
+    lvl_rssnr = NetworkStrength.great
+  elif rssnr >= 10:
+    lvl_rssnr = NetworkStrength.good
+  elif rssnr >= -30:
+    lvl_rssnr = NetworkStrength.moderate
+  else:
+    lvl_rssnr = NetworkStrength.poor
+  return max(lvl_rsrp, lvl_rssnr)
+
+
+def get_tdscdma_level(tdscmadbm):
+  lvl = NetworkStrength.unknown
+  if tdscmadbm > -25:
+    lvl = NetworkStrength.unknown
+  elif tdscmadbm >= -49:
+    lvl = NetworkStrength.great
+  elif tdscmadbm >= -73:
+    lvl = NetworkStrength.good
+  elif tdscmadbm >= -97:
+    lvl = NetworkStrength.moderate
+  elif tdscmadbm >= -110:
+    lvl = NetworkStrength.poor
+  return lvl
+
+
+def get_gsm_level(asu):
+  if asu <= 2 or asu == 99:
+    lvl = NetworkStrength.unknown
+  elif asu >= 12:
+    lvl = NetworkStrength.great
+  elif asu >= 8:
+    lvl = NetworkStrength.good
+  elif asu >= 5:
+    lvl = NetworkStrength.moderate
+  else:
+    lvl = NetworkStrength.poor
+  return lvl
+
+
+def get_evdo_level(evdodbm, evdosnr):
+  lvl_evdodbm = NetworkStrength.unknown
+  lvl_evdosnr = NetworkStrength.unknown
+  if evdodbm >= -65:
+    lvl_evdodbm = NetworkStrength.great
+  elif evdodbm >= -75:
+    lvl_evdodbm = NetworkStrength.good
+  elif evdodbm >= -90:
+    lvl_evdodbm = NetworkStrength.moderate
+  elif evdodbm >= -105:
+    lvl_evdodbm = NetworkStrength.poor
+  if evdosnr >= 7:
+    lvl_evdosnr = NetworkStrength.great
+  elif evdosnr >= 5:
+    lvl_evdosnr = NetworkStrength.good
+  elif evdosnr >= 3:
+    lvl_evdosnr = NetworkStrength.moderate
+  elif evdosnr >= 1:
+    lvl_evdosnr = NetworkStrength.poor
+  return max(lvl_evdodbm, lvl_evdosnr)
+
+
+def get_cdma_level(cdmadbm, cdmaecio):
+  lvl_cdmadbm = NetworkStrength.unknown
+  lvl_cdmaecio = NetworkStrength.unknown
+  if cdmadbm >= -75:
+    lvl_cdmadbm = NetworkStrength.great
+  elif cdmadbm >= -85:
+    lvl_cdmadbm = NetworkStrength.good
+  elif cdmadbm >= -95:
+    lvl_cdmadbm = NetworkStrength.moderate
+  elif cdmadbm >= -100:
+    lvl_cdmadbm = NetworkStrength.poor
+  if cdmaecio >= -90:
+    lvl_cdmaecio = NetworkStrength.great
+  elif cdmaecio >= -110:
+    lvl_cdmaecio = NetworkStrength.good
+  elif cdmaecio >= -130:
+    lvl_cdmaecio = NetworkStrength.moderate
+  elif cdmaecio >= -150:
+    lvl_cdmaecio = NetworkStrength.poor
+  return max(lvl_cdmadbm, lvl_cdmaecio)
+
+
+def get_wifi_level(lvl):
+  if lvl >= -50:
+    return NetworkStrength.great
+  elif lvl >= -60:
+    return NetworkStrength.good
+  elif lvl >= -70:
+    return NetworkStrength.moderate
+  else:
+    return NetworkStrength.poor
+
+
+def parse_wireless_level(out, iface="wlan0"):
+  """Signal level in dBm of iface from /proc/net/wireless"""
+  for line in out.split('\n'):
+    name, _, stats = line.partition(':')
+    if name.strip() == iface:
+      # status, link quality, level, noise, ...
+      lvl = int(float(stats.split()[2]))
+      if lvl >= 0:
+        raise ValueError(f"{iface} level is not in dBm")
+      return lvl
+  raise ValueError(f"{iface} not in wireless stats")
+
+
+def parse_wifi_strength(out):
+  """Strength of the wifi network from the output of dumpsys connectivity"""
+  network_strength = NetworkStrength.unknown
+  for line in out.split('\n'):
+    signal_str = "SignalStrength: "
+    if signal_str in line:
+      lvl_idx_start = line.find(signal_str) + len(signal_str)
+      lvl_idx_end = line.find(']', lvl_idx_start)
+      network_strength = get_wifi_level(int(line[lvl_idx_start : lvl_idx_end]))
+  return network_strength
+
+
+def parse_cell_strength(out):
+  """Strength of the cell network from the output of dumpsys telephony.registry"""
+  network_strength = NetworkStrength.unknown
+  for line in out.split('\n'):
+    if "mSignalStrength" in line:
+      arr = line.split(' ')
+      ns = 0
+      if ("gsm" in arr[14]):
+        rsrp = int(arr[9])
+        rssnr = int(arr[11])
+        ns = get_lte_level(rsrp, rssnr)
+        if ns == NetworkStrength.unknown:
+          tdscmadbm = int(arr[13])
+          ns = get_tdscdma_level(tdscmadbm)
+          if ns == NetworkStrength.unknown:
+            asu = int(arr[1])
+            ns = get_gsm_level(asu)
+      else:
+        cdmadbm = int(arr[3])
+        cdmaecio = int(arr[4])
+        evdodbm = int(arr[5])
+        evdosnr = int(arr[7])
+        lvl_cdma = get_cdma_level(cdmadbm, cdmaecio)
+        lvl_edmo = get_evdo_level(evdodbm, evdosnr)
+        if lvl_edmo == NetworkStrength.unknown:
+          ns = lvl_cdma
+        elif lvl_cdma == NetworkStrength.unknown:
+          ns = lvl_edmo
+        else:
+          ns = min(lvl_cdma, lvl_edmo)
+      network_strength = max(network_strength, ns)
+  return network_strength
+
+
 class Android(HardwareBase):
   def get_os_version(self):
     with open("/VERSION") as f:
@@ -164,169 +343,35 @@ class Android(HardwareBase):
       return cell_networks.get(cell_check, NetworkType.none)
 
   def get_network_strength(self, network_type):
-    network_strength = NetworkStrength.unknown
-
-    # from SignalStrength.java
-    def get_lte_level(rsrp, rssnr):
-      INT_MAX = 2147483647
-      if rsrp == INT_MAX:
-        lvl_rsrp = NetworkStrength.unknown
-      elif rsrp >= -95:
-        lvl_rsrp = NetworkStrength.great
-      elif rsrp >= -105:
-        lvl_rsrp = NetworkStrength.good
-      elif rsrp >= -115:
-        lvl_rsrp = NetworkStrength.moderate
-      else:
-        lvl_rsrp = NetworkStrength.poor
-      if rssnr == INT_MAX:
-        lvl_rssnr = NetworkStrength.unknown
-      elif rssnr >= 45:
-        lvl_rssnr = NetworkStrength.great
-      elif rssnr >= 10:
-        lvl_rssnr = NetworkStrength.good
-      elif rssnr >= -30:
-        lvl_rssnr = NetworkStrength.moderate
-      else:
-        lvl_rssnr = NetworkStrength.poor
-      return max(lvl_rsrp, lvl_rssnr)
-
-    def get_tdscdma_level(tdscmadbm):
-      lvl = NetworkStrength.unknown
-      if tdscmadbm > -25:
-        lvl = NetworkStrength.unknown
-      elif tdscmadbm >= -49:
-        lvl = NetworkStrength.great
-      elif tdscmadbm >= -73:
-        lvl = NetworkStrength.good
-      elif tdscmadbm >= -97:
-        lvl = NetworkStrength.moderate
-      elif tdscmadbm >= -110:
-        lvl = NetworkStrength.poor
-      return lvl
-
-    def get_gsm_level(asu):
-      if asu <= 2 or asu == 99:
-        lvl = NetworkStrength.unknown
-      elif asu >= 12:
-        lvl = NetworkStrength.great
-      elif asu >= 8:
-        lvl = NetworkStrength.good
-      elif asu >= 5:
-        lvl = NetworkStrength.moderate
-      else:
-        lvl = NetworkStrength.poor
-      return lvl
-
-    def get_evdo_level(evdodbm, evdosnr):
-      lvl_evdodbm = NetworkStrength.unknown
-      lvl_evdosnr = NetworkStrength.unknown
-      if evdodbm >= -65:
-        lvl_evdodbm = NetworkStrength.great
-      elif evdodbm >= -75:
-        lvl_evdodbm = NetworkStrength.good
-      elif evdodbm >= -90:
-        lvl_evdodbm = NetworkStrength.moderate
-      elif evdodbm >= -105:
-        lvl_evdodbm = NetworkStrength.poor
-      if evdosnr >= 7:
-        lvl_evdosnr = NetworkStrength.great
-      elif evdosnr >= 5:
-        lvl_evdosnr = NetworkStrength.good
-      elif evdosnr >= 3:
-        lvl_evdosnr = NetworkStrength.moderate
-      elif evdosnr >= 1:
-        lvl_evdosnr = NetworkStrength.poor
-      return max(lvl_evdodbm, lvl_evdosnr)
-
-    def get_cdma_level(cdmadbm, cdmaecio):
-      lvl_cdmadbm = NetworkStrength.unknown
-      lvl_cdmaecio = NetworkStrength.unknown
-      if cdmadbm >= -75:
-        lvl_cdmadbm = NetworkStrength.great
-      elif cdmadbm >= -85:
-        lvl_cdmadbm = NetworkStrength.good
-      elif cdmadbm >= -95:
-        lvl_cdmadbm = NetworkStrength.moderate
-      elif cdmadbm >= -100:
-        lvl_cdmadbm = NetworkStrength.poor
-      if cdmaecio >= -90:
-        lvl_cdmaecio = NetworkStrength.great
-      elif cdmaecio >= -110:
-        lvl_cdmaecio = NetworkStrength.good
-      elif cdmaecio >= -130:
-        lvl_cdmaecio = NetworkStrength.moderate
-      elif cdmaecio >= -150:
-        lvl_cdmaecio = NetworkStrength.poor
-      return max(lvl_cdmadbm, lvl_cdmaecio)
-
     if network_type == NetworkType.none:
-      return network_strength
+      return NetworkStrength.unknown
     if network_type == NetworkType.wifi:
+      lvl = read_node(WIRELESS_PATH, parse_wireless_level, None)
+      if lvl is not None:
+        return get_wifi_level(lvl)
       out = subprocess.check_output('dumpsys connectivity', shell=True).decode('utf-8')
-      network_strength = NetworkStrength.unknown
-      for line in out.split('\n'):
-        signal_str = "SignalStrength: "
-        if signal_str in line:
-          lvl_idx_start = line.find(signal_str) + len(signal_str)
-          lvl_idx_end = line.find(']', lvl_idx_start)
-          lvl = int(line[lvl_idx_start : lvl_idx_end])
-          if lvl >= -50:
-            network_strength = NetworkStrength.great
-          elif lvl >= -60:
-            network_strength = NetworkStrength.good
-          elif lvl >= -70:
-            network_strength = NetworkStrength.moderate
-          else:
-            network_strength = NetworkStrength.poor
-      return network_strength
+      return parse_wifi_strength(out)
     else:
       # check cell strength
       out = subprocess.check_output('dumpsys telephony.registry', shell=True).decode('utf-8')
-      for line in out.split('\n'):
-        if "mSignalStrength" in line:
-          arr = line.split(' ')
-          ns = 0
-          if ("gsm" in arr[14]):
-            rsrp = int(arr[9])
-            rssnr = int(arr[11])
-            ns = get_lte_level(rsrp, rssnr)
-            if ns == NetworkStrength.unknown:
-              tdscmadbm = int(arr[13])
-              ns = get_tdscdma_level(tdscmadbm)
-              if ns == NetworkStrength.unknown:
-                asu = int(arr[1])
-                ns = get_gsm_level(asu)
-          else:
-            cdmadbm = int(arr[3])
-            cdmaecio = int(arr[4])
-            evdodbm = int(arr[5])
-            evdosnr = int(arr[7])
-            lvl_cdma = get_cdma_level(cdmadbm, cdmaecio)
-            lvl_edmo = get_evdo_level(evdodbm, evdosnr)
-            if lvl_edmo == NetworkStrength.unknown:
-              ns = lvl_cdma
-            elif lvl_cdma == NetworkStrength.unknown:
-              ns = lvl_edmo
-            else:
-              ns = min(lvl_cdma, lvl_edmo)
-          network_strength = max(network_strength, ns)
-
-      return network_strength
+      return parse_cell_strength(out)
+
+  def get_sysfs_nodes(self):
+    return SYSFS_NODES
 
   def get_battery_capacity(self):
-    return self.read_param_file("/sys/class/power_supply/battery/capacity", int, 100)
+    return self.read_param_file(*SYSFS_NODES["batteryPercent"])
 
   def get_battery_status(self):
     # This does not correspond with actual charging or not.
     # If a USB cable is plugged in, it responds with 'Charging', even when charging is disabled
-    return self.read_param_file("/sys/class/power_supply/battery/status", lambda x: x.strip(), '')
+    return self.read_param_file(*SYSFS_NODES["batteryStatus"])
 
   def get_battery_current(self):
-    return self.read_param_file("/sys/class/power_supply/battery/current_now", int)
+    return self.read_param_file(*SYSFS_NODES["batteryCurrent"])
 
   def get_battery_voltage(self):
-    return self.read_param_file("/sys/class/power_supply/battery/voltage_now", int)
+    return self.read_param_file(*SYSFS_NODES["batteryVoltage"])
 
   def get_battery_charging(self):
     # This does correspond with actually charging
@@ -337,7 +382,7 @@ class Android(HardwareBase):
       f.write(f"{1 if on else 0}\n")
 
   def get_usb_present(self):
-    return self.read_param_file("/sys/class/power_supply/usb/present", lambda x: bool(int(x)), False)
+    return self.read_param_file(*SYSFS_NODES["usbOnline"])
 
   def get_current_power_draw(self):
     # We don't have a good direct way to measure this on android
@@ -0,0 +1,99 @@
+import os
+import time
+
+REOPEN_INTERVAL = 10.  # seconds between retries of nodes that failed to open
+MAX_READ = 4096  # sysfs attributes are at most a page
+
+
+class SysfsNode():
+  """A sysfs file that is kept open. Every read is a single pread at offset 0,
+  which makes the kernel render the attribute again."""
+  def __init__(self, path):
+    self.path = path
+    self.fd = None
+    self.next_open = 0.
+
+  def open(self):
+    if time.monotonic() < self.next_open:
+      return False
+    try:
+      self.fd = os.open(self.path, os.O_RDONLY | os.O_CLOEXEC)
+      return True
+    except OSError:
+      self.next_open = time.monotonic() + REOPEN_INTERVAL
+      return False
+
+  def close(self):
+    if self.fd is not None:
+      os.close(self.fd)
+      self.fd = None
+
+  def read(self):
+    """The contents of the file, or None if it can't be read"""
+    if self.fd is None and not self.open():
+      return None
+    try:
+      return os.pread(self.fd, MAX_READ, 0).decode()
+    except OSError:
+      # e.g. the device went away, open it again on a later read
+      self.close()
+      self.next_open = time.monotonic() + REOPEN_INTERVAL
+      return None
+
+
+def parse(contents, parser, default):
+  if contents is None:
+    return default
+  try:
+    return parser(contents)
+  except Exception:
+    return default
+
+
+_nodes = {}
+
+
+def read_node(path, parser=int, default=0):
+  """Reads path through a SysfsNode that stays open for the life of the process"""
+  node = _nodes.get(path)
+  if node is None:
+    node = _nodes[path] = SysfsNode(path)
+  return parse(node.read(), parser, default)
+
+
+class SysfsSampler():
+  """Reads a set of sysfs nodes into one sample, each node on its own interval.
+
+  A node that isn't due keeps its last value in the sample. root is prefixed
+  to every path, so a fake sysfs tree can stand in for the real one.
+  """
+  def __init__(self, root=""):
+    self.root = root
+    self.nodes = {}
+    self.parsers = {}
+    self.intervals = {}
+    self.next_read = {}
+    self.sample = {}
+
+  def add(self, name, path, parser=int, default=0, interval=0.):
+    self.nodes[name] = SysfsNode(self.root + path)
+    self.parsers[name] = (parser, default)
+    self.intervals[name] = interval
+    self.next_read[name] = 0.
+
+  def set_interval(self, name, interval):
+    self.intervals[name] = interval
+    self.next_read[name] = 0.
+
+  def read(self, now=None):
+    """Reads the nodes that are due and returns the sample, a dict of node name to value"""
+    now = time.monotonic() if now is None else now
+    for name, node in self.nodes.items():
+      if now >= self.next_read[name]:
+        self.sample[name] = parse(node.read(), *self.parsers[name])
+        self.next_read[name] = now + self.intervals[name]
+    return self.sample
+
+  def close(self):
+    for node in self.nodes.values():
+      node.close()
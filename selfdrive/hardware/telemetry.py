@@ -0,0 +1,97 @@
+import fcntl
+import socket
+import struct
+import threading
+import time
+
+from cereal import log
+from selfdrive.swaglog import cloudlog
+
+NetworkType = log.DeviceState.NetworkType
+NetworkStrength = log.DeviceState.NetworkStrength
+
+SIOCGIFADDR = 0x8915
+
+# seconds between collections of each source
+SCHEDULE = {
+  "network": 10.,
+  "ip_addr": 10.,
+}
+
+DEFAULT_SNAPSHOT = {
+  "network_type": NetworkType.none,
+  "network_strength": NetworkStrength.unknown,
+  "ip_addr": '255.255.255.255',
+}
+
+
+def get_ip_address(iface="wlan0"):
+  """IPv4 address of iface, or 'N/A' if it doesn't have one"""
+  try:
+    with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as s:
+      ifreq = fcntl.ioctl(s.fileno(), SIOCGIFADDR, struct.pack('256s', iface.encode()[:15]))
+    return socket.inet_ntoa(ifreq[20:24])
+  except OSError:
+    return 'N/A'
+
+
+def collect_network(hardware):
+  network_type = hardware.get_network_type()
+  return {
+    "network_type": network_type,
+    "network_strength": hardware.get_network_strength(network_type),
+  }
+
+
+def collect_ip_addr(hardware):
+  return {"ip_addr": get_ip_address()}
+
+
+SOURCES = {
+  "network": collect_network,
+  "ip_addr": collect_ip_addr,
+}
+
+
+class TelemetryCollector():
+  """Collects network and modem state in a background thread, each source on
+  its own schedule.
+
+  The sources fork dumpsys and service or talk to ModemManager, which can take
+  seconds. snapshot always holds the latest results, so readers never wait.
+  """
+  def __init__(self, hardware, sources=None, schedule=None):
+    self.hardware = hardware
+    self.sources = SOURCES if sources is None else sources
+    self.schedule = SCHEDULE if schedule is None else schedule
+    self.snapshot = dict(DEFAULT_SNAPSHOT)
+    self.exit_event = threading.Event()
+    self.thread = None
+
+  def collect(self, name):
+    try:
+      result = self.sources[name](self.hardware)
+    except Exception:
+      cloudlog.exception(f"Error collecting {name}")
+      return
+    # replaced as a whole, a reader sees either the old or the new results
+    self.snapshot = {**self.snapshot, **result}
+
+  def run(self):
+    next_collect = {name: 0. for name in self.sources}
+    while not self.exit_event.is_set():
+      for name, t in next_collect.items():
+        if time.monotonic() >= t:
+          self.collect(name)
+          next_collect[name] = time.monotonic() + self.schedule[name]
+      self.exit_event.wait(max(min(next_collect.values()) - time.monotonic(), 0.))
+
+  def start(self):
+    self.thread = threading.Thread(target=self.run, name="telemetry", daemon=True)
+    self.thread.start()
+
+  def stop(self):
+    self.exit_event.set()
+    if self.thread is not None:
+      self.thread.join()
+      self.thread = None
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+import os
+import shutil
+import tempfile
+import unittest
+import unittest.mock
+
+from selfdrive.hardware.eon.hardware import SYSFS_NODES
+from selfdrive.hardware.sysfs import SysfsNode, SysfsSampler
+from selfdrive.test.synthetic import EON_ZONES, THERMAL_ZONE, write_eon_sysfs, write_node
+
+
+def read_syscalls():
+  with open("/proc/self/io") as f:
+    return int(next(line for line in f if line.startswith("syscr:")).split()[1])
+
+
+def read_param_file_old(path, parser, default=0):
+  try:
+    with open(path) as f:
+      return parser(f.read())
+  except Exception:
+    return default
+
+
+def read_tz_old(root, x):
+  try:
+    with open(root + THERMAL_ZONE % x) as f:
+      return int(f.read())
+  except FileNotFoundError:
+    return 0
+
+
+def thermald_iteration_old(root):
+  sample = {f"tz{z}": read_tz_old(root, z) for z in EON_ZONES}
+  for name, (path, parser, default) in SYSFS_NODES.items():
+    sample[name] = read_param_file_old(root + path, parser, default)
+  return sample
+
+
+def eon_sampler(root):
+  """Sampler for the nodes thermald reads on EON"""
+  sampler = SysfsSampler(root)
+  for z in EON_ZONES:
+    sampler.add(f"tz{z}", THERMAL_ZONE % z)
+  for name, (path, parser, default) in SYSFS_NODES.items():
+    sampler.add(name, path, parser, default)
+  return sampler
+
+
+class TestSysfs(unittest.TestCase):
+  def setUp(self):
+    self.root = tempfile.mkdtemp()
+    write_eon_sysfs(self.root)
+    self.sampler = eon_sampler(self.root)
+
+  def tearDown(self):
+    self.sampler.close()
+    shutil.rmtree(self.root)
+
+  def write(self, path, contents):
+    write_node(self.root, path, contents)
+
+  def test_sample(self):
+    sample = self.sampler.read()
+    self.assertEqual(sample, thermald_iteration_old(self.root))
+    self.assertEqual(sample["tz5"], 5000)
+    self.assertEqual(sample["batteryStatus"], "Charging")
+    self.assertIs(sample["usbOnline"], True)
+
+    # the same fd sees the new contents
+    self.write(THERMAL_ZONE % 5, "51000\n")
+    self.write(SYSFS_NODES["usbOnline"][0], "0\n")
+    sample = self.sampler.read()
+    self.assertEqual(sample["tz5"], 51000)
+    self.assertIs(sample["usbOnline"], False)
+
+  def test_schedule(self):
+    self.sampler.set_interval("batteryPercent", 5.)
+    self.assertEqual(self.sampler.read(now=100.)["batteryPercent"], 87)
+
+    self.write(SYSFS_NODES["batteryPercent"][0], "86\n")
+    self.write(THERMAL_ZONE % 7, "8000\n")
+    sample = self.sampler.read(now=102.)
+    self.assertEqual(sample["batteryPercent"], 87)
+    self.assertEqual(sample["tz7"], 8000)
+    self.assertEqual(self.sampler.read(now=105.)["batteryPercent"], 86)
+
+  def test_missing_node(self):
+    node = SysfsNode(self.root + "/sys/class/missing")
+    self.assertIsNone(node.read())
+
+    self.write("/sys/class/missing", "1\n")
+    self.assertIsNone(node.read())  # not retried right away
+    node.next_open = 0.
+    self.assertEqual(node.read(), "1\n")
+
+    self.sampler.add("missing", "/sys/class/power_supply/missing", int, -1)
+    self.assertEqual(self.sampler.read()["missing"], -1)
+
+  def test_syscalls_per_iteration(self):
+    self.sampler.read()
+    n = 100
+
+    reads = read_syscalls()
+    with unittest.mock.patch("os.open", wraps=os.open) as os_open, \
+         unittest.mock.patch("builtins.open", wraps=open) as builtin_open:
+      for _ in range(n):
+        self.sampler.read()
+    reads = read_syscalls() - reads - 1
+
+    # the fds stay open, one read per node
+    self.assertEqual(os_open.call_count + builtin_open.call_count, 0)
+    self.assertEqual(reads / n, len(self.sampler.nodes))
+
+
+if __name__ == "__main__":
+  unittest.main()
@@ -0,0 +1,129 @@
+#!/usr/bin/env python3
+import os
+import shutil
+import subprocess
+import tempfile
+import time
+import unittest
+import unittest.mock
+
+from cereal import log
+from selfdrive.hardware.eon import hardware as eon
+from selfdrive.hardware.telemetry import TelemetryCollector, get_ip_address
+
+NetworkType = log.DeviceState.NetworkType
+NetworkStrength = log.DeviceState.NetworkStrength
+
+WIRELESS = """Inter-| sta-|   Quality        |   Discarded packets               | Missed | WE
+ face | tus | link level noise |  nwid  crypt   frag  retry   misc | beacon | 22
+ wlan0: 0000   54.  -56.  -256        0      0      0      0      0        0
+"""
+
+CONNECTIVITY = """Active default network: 100
+  NetworkAgentInfo [WIFI () - 100] network{100}  lp{{InterfaceName: wlan0 LinkAddresses: [192.168.1.23/24,] }}  \
+nc{[ Transports: WIFI Capabilities: INTERNET&NOT_RESTRICTED&TRUSTED&NOT_VPN LinkUpBandwidth>=1048576Kbps \
+LinkDnBandwidth>=1048576Kbps SignalStrength: -56]}  Score{60}  everValidated{true}
+"""
+
+TELEPHONY_LTE = """last known state:
+  mServiceState=0 0 voice home data home
+mSignalStrength=SignalStrength: 99 0 -120 -160 -120 -1 -1 24 -100 -11 5 2147483647 2147483647 gsm|lte
+  mMessageWaiting=false
+"""
+
+TELEPHONY_CDMA = """mSignalStrength=SignalStrength: 99 0 -80 -100 -70 -1 4 99 2147483647 2147483647 2147483647 2147483647 2147483647 cdma
+"""
+
+
+def fake_check_output(outputs):
+  calls = []
+  def check_output(cmd, **kwargs):
+    calls.append(cmd)
+    return outputs[cmd].encode()
+  return calls, check_output
+
+
+class TestParse(unittest.TestCase):
+  def test_wifi(self):
+    self.assertEqual(eon.parse_wireless_level(WIRELESS), -56)
+    self.assertEqual(eon.get_wifi_level(-56), NetworkStrength.good)
+    self.assertEqual(eon.parse_wifi_strength(CONNECTIVITY), NetworkStrength.good)
+    with self.assertRaises(ValueError):
+      eon.parse_wireless_level(WIRELESS, "wlan1")
+    with self.assertRaises(ValueError):
+      eon.parse_wireless_level(WIRELESS.replace("-56.", " 70."))
+
+  def test_cell(self):
+    self.assertEqual(eon.parse_cell_strength(TELEPHONY_LTE), NetworkStrength.good)
+    self.assertEqual(eon.parse_cell_strength(TELEPHONY_CDMA), NetworkStrength.good)
+    self.assertEqual(eon.parse_cell_strength("mServiceState=1"), NetworkStrength.unknown)
+
+
+class TestNetworkStrength(unittest.TestCase):
+  def setUp(self):
+    self.tmp = tempfile.mkdtemp()
+    self.calls, check_output = fake_check_output({
+      'dumpsys connectivity': CONNECTIVITY,
+      'dumpsys telephony.registry': TELEPHONY_LTE,
+    })
+    patcher = unittest.mock.patch.object(eon.subprocess, "check_output", check_output)
+    patcher.start()
+    self.addCleanup(patcher.stop)
+
+  def tearDown(self):
+    shutil.rmtree(self.tmp)
+
+  def network_strength(self, network_type, wireless=None):
+    path = os.path.join(self.tmp, f"wireless{len(os.listdir(self.tmp))}")
+    if wireless is not None:
+      with open(path, "w") as f:
+        f.write(wireless)
+    with unittest.mock.patch.object(eon, "WIRELESS_PATH", path):
+      return eon.Android().get_network_strength(network_type)
+
+  def test_wifi_from_proc(self):
+    self.assertEqual(self.network_strength(NetworkType.wifi, WIRELESS.replace("-56.", "-45.")), NetworkStrength.great)
+    self.assertEqual(self.calls, [])
+
+  def test_wifi_fallback(self):
+    self.assertEqual(self.network_strength(NetworkType.wifi), NetworkStrength.good)
+    self.assertEqual(self.calls, ['dumpsys connectivity'])
+
+  def test_cell(self):
+    self.assertEqual(self.network_strength(NetworkType.cell4G, WIRELESS), NetworkStrength.good)
+    self.assertEqual(self.network_strength(NetworkType.none), NetworkStrength.unknown)
+    self.assertEqual(self.calls, ['dumpsys telephony.registry'])
+
+
+class TestTelemetryCollector(unittest.TestCase):
+  def test_schedule(self):
+    counts = {"fast": 0, "slow": 0}
+    def source(name):
+      def collect(hardware):
+        counts[name] += 1
+        return {name: counts[name]}
+      return collect
+
+    collector = TelemetryCollector(None, {name: source(name) for name in counts}, {"fast": 0.01, "slow": 10.})
+    collector.start()
+    time.sleep(0.2)
+    collector.stop()
+    self.assertGreater(counts["fast"], 5)
+    self.assertEqual(counts["slow"], 1)
+    self.assertEqual(collector.snapshot["fast"], counts["fast"])
+    self.assertEqual(collector.snapshot["ip_addr"], '255.255.255.255')
+
+  def test_failing_source(self):
+    def collect(hardware):
+      raise subprocess.CalledProcessError(1, "service")
+    collector = TelemetryCollector(None, {"network": collect})
+    collector.snapshot = {**collector.snapshot, "network_type": NetworkType.wifi}
+    collector.collect("network")
+    self.assertEqual(collector.snapshot["network_type"], NetworkType.wifi)
+
+  def test_ip_address(self):
+    self.assertEqual(get_ip_address("lo"), "127.0.0.1")
+    self.assertEqual(get_ip_address("missing0"), "N/A")
+
+if __name__ == "__main__":
+  unittest.main()
@@ -23,6 +23,10 @@ TIMEOUT = 0.1
 NetworkType = log.DeviceState.NetworkType
 NetworkStrength = log.DeviceState.NetworkStrength
 
+SYSFS_NODES = {
+  "usbOnline": ("/sys/class/power_supply/usb/present", lambda x: bool(int(x)), False),
+}
+
 # https://developer.gnome.org/ModemManager/unstable/ModemManager-Flags-and-Enumerations.html#MMModemAccessTechnology
 MM_MODEM_ACCESS_TECHNOLOGY_UMTS = 1 << 5
 MM_MODEM_ACCESS_TECHNOLOGY_LTE = 1 << 14
@@ -171,9 +175,12 @@ class Tici(HardwareBase):
   def set_battery_charging(self, on):
     pass
 
+  def get_sysfs_nodes(self):
+    return SYSFS_NODES
+
   def get_usb_present(self):
     # Not sure if relevant on tici, but the file exists
-    return self.read_param_file("/sys/class/power_supply/usb/present", lambda x: bool(int(x)), False)
+    return self.read_param_file(*SYSFS_NODES["usbOnline"])
 
   def get_current_power_draw(self):
     return (self.read_param_file("/sys/class/hwmon/hwmon1/power1_input", int) / 1e6)
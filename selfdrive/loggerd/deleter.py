@@ -2,34 +2,117 @@
 import os
 import shutil
 import threading
+import time
+from common.xattr import getxattr
 from selfdrive.swaglog import cloudlog
-from selfdrive.loggerd.config import ROOT, get_available_bytes, get_available_percent
-from selfdrive.loggerd.uploader import listdir_by_creation
+from selfdrive.loggerd.config import ROOT
+from selfdrive.loggerd.uploader import UPLOAD_ATTR_NAME, get_directory_sort, is_segment_dir
 
 MIN_BYTES = 5 * 1024 * 1024 * 1024
 MIN_PERCENT = 10
+UPLOAD_RECHECK_INTERVAL = 30.  # seconds
+
+
+def get_bytes_to_free(root=ROOT):
+  """How far the free space is below MIN_BYTES or MIN_PERCENT, in bytes"""
+  try:
+    statvfs = os.statvfs(root)
+  except OSError:
+    return 0
+  min_bytes = max(MIN_BYTES, MIN_PERCENT / 100. * statvfs.f_blocks * statvfs.f_frsize)
+  return min_bytes - statvfs.f_bavail * statvfs.f_frsize
+
+
+class DirInfo():
+  __slots__ = ['size', 'uploaded', 'locked', 'complete']
+
+  def __init__(self, size, uploaded, locked, complete=True):
+    self.size = size
+    self.uploaded = uploaded
+    self.locked = locked
+    self.complete = complete
+
+
+def scan_dir(path):
+  size, uploaded, locked = 0, True, False
+  try:
+    with os.scandir(path) as it:
+      for entry in it:
+        if entry.name.endswith(".lock"):
+          locked = True
+        size += entry.stat(follow_symlinks=False).st_blocks * 512
+        if uploaded and not getxattr(entry.path, UPLOAD_ATTR_NAME):
+          uploaded = False
+  except OSError:
+    # files that weren't looked at may not be uploaded or locked
+    cloudlog.exception("issue scanning %s" % path)
+    return DirInfo(size, False, locked, complete=False)
+  return DirInfo(size, uploaded, locked)
+
+
+class DiskMap():
+  """Sizes and upload state of the folders in root.
+
+  Segments that still have lock files, non-segment folders like crash/ and
+  folders that failed to scan are rescanned on every update. Other folders
+  are scanned once. Their upload state is rechecked at most every
+  UPLOAD_RECHECK_INTERVAL until all their files are uploaded.
+  """
+  def __init__(self, root):
+    self.root = root
+    self.dirs = {}
+    self.last_upload_check = 0.
+
+  def update(self):
+    try:
+      lognames = set(os.listdir(self.root))
+    except OSError:
+      lognames = set()
+
+    for logname in self.dirs.keys() - lognames:
+      del self.dirs[logname]
+
+    recheck_uploads = time.monotonic() - self.last_upload_check > UPLOAD_RECHECK_INTERVAL
+    if recheck_uploads:
+      self.last_upload_check = time.monotonic()
+
+    for logname in lognames:
+      info = self.dirs.get(logname)
+      if info is None or info.locked or not info.complete or not is_segment_dir(logname) or (recheck_uploads and not info.uploaded):
+        self.dirs[logname] = scan_dir(os.path.join(self.root, logname))
+
+  def eviction_candidates(self):
+    """Uploaded folders first, then everything else, each oldest first.
+    Locked segments and folders that failed to scan are never evicted"""
+    lognames = sorted((logname for logname, info in self.dirs.items() if info.complete and not info.locked), key=get_directory_sort)
+    return [d for d in lognames if self.dirs[d].uploaded] + [d for d in lognames if not self.dirs[d].uploaded]
+
+
+def delete_dirs(disk_map, bytes_to_free):
+  """Deletes candidates until at least bytes_to_free are freed, returns the bytes freed"""
+  freed = 0
+  for logname in disk_map.eviction_candidates():
+    if freed >= bytes_to_free:
+      break
+
+    delete_path = os.path.join(disk_map.root, logname)
+    try:
+      cloudlog.info("deleting %s" % delete_path)
+      shutil.rmtree(delete_path)
+      freed += disk_map.dirs.pop(logname).size
+    except OSError:
+      cloudlog.exception("issue deleting %s" % delete_path)
+  return freed
 
 
 def deleter_thread(exit_event):
+  disk_map = DiskMap(ROOT)
   while not exit_event.is_set():
-    out_of_bytes = get_available_bytes(default=MIN_BYTES + 1) < MIN_BYTES
-    out_of_percent = get_available_percent(default=MIN_PERCENT + 1) < MIN_PERCENT
-
-    if out_of_percent or out_of_bytes:
-      # remove the earliest directory we can
-      dirs = listdir_by_creation(ROOT)
-      for delete_dir in dirs:
-        delete_path = os.path.join(ROOT, delete_dir)
-
-        if any(name.endswith(".lock") for name in os.listdir(delete_path)):
-          continue
-
-        try:
-          cloudlog.info("deleting %s" % delete_path)
-          shutil.rmtree(delete_path)
-          break
-        except OSError:
-          cloudlog.exception("issue deleting %s" % delete_path)
+    bytes_to_free = get_bytes_to_free()
+
+    if bytes_to_free > 0:
+      disk_map.update()
+      delete_dirs(disk_map, bytes_to_free)
       exit_event.wait(.1)
     else:
       exit_event.wait(30)
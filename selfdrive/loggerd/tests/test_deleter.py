@@ -0,0 +1,146 @@
+#!/usr/bin/env python3
+import os
+import shutil
+import tempfile
+import unittest
+import unittest.mock
+
+from common.xattr import setxattr
+from selfdrive.loggerd import deleter
+from selfdrive.loggerd.deleter import DiskMap, delete_dirs
+from selfdrive.loggerd.uploader import UPLOAD_ATTR_NAME, UPLOAD_ATTR_VALUE, listdir_by_creation
+
+SEGMENT_FILES = ["qlog.bz2", "rlog.bz2", "fcamera.hevc"]
+FILE_SIZE = 16 * 1024
+
+
+def deleter_pass_old(root):
+  dirs = listdir_by_creation(root)
+  for delete_dir in dirs:
+    delete_path = os.path.join(root, delete_dir)
+
+    if any(name.endswith(".lock") for name in os.listdir(delete_path)):
+      continue
+
+    try:
+      shutil.rmtree(delete_path)
+      break
+    except OSError:
+      pass
+
+
+class TestDeleter(unittest.TestCase):
+  def setUp(self):
+    self.root = tempfile.mkdtemp()
+    self.sizes = {}
+
+  def tearDown(self):
+    shutil.rmtree(self.root)
+
+  def make_segment(self, logname, uploaded=False, locked=False):
+    path = os.path.join(self.root, logname)
+    os.mkdir(path)
+    for name in SEGMENT_FILES:
+      fn = os.path.join(path, name)
+      with open(fn, "wb") as f:
+        f.write(b"\xff" * FILE_SIZE)
+      if uploaded:
+        setxattr(fn, UPLOAD_ATTR_NAME, UPLOAD_ATTR_VALUE)
+    if locked:
+      open(os.path.join(path, "rlog.bz2.lock"), "w").close()
+    self.sizes[logname] = sum(os.stat(os.path.join(path, f)).st_blocks * 512 for f in os.listdir(path))
+
+  def make_tree(self, n_segments, uploaded_every=3):
+    lognames = [f"2021-03-{1 + i // 100:02d}--{i // 10 % 10:02d}-00-00--{i % 10}" for i in range(n_segments)]
+    for i, logname in enumerate(lognames):
+      # the newest segment is still being written
+      self.make_segment(logname, uploaded=i % uploaded_every == 0, locked=i == n_segments - 1)
+    return lognames
+
+  def used_bytes(self):
+    return sum(self.sizes[d] for d in os.listdir(self.root))
+
+  def test_eviction_order(self):
+    lognames = self.make_tree(30)
+    disk_map = DiskMap(self.root)
+    disk_map.update()
+
+    uploaded = [d for i, d in enumerate(lognames) if i % 3 == 0]
+    expected = uploaded + [d for d in lognames[:-1] if d not in uploaded]
+    self.assertEqual(disk_map.eviction_candidates(), expected)
+
+    # enough is freed in one pass, uploaded segments first
+    freed = delete_dirs(disk_map, 12 * self.sizes[lognames[0]] - 1)
+    self.assertEqual(freed, 12 * self.sizes[lognames[0]])
+    self.assertEqual(sorted(os.listdir(self.root)), sorted(expected[12:] + lognames[-1:]))
+
+    # the locked segment is never deleted
+    delete_dirs(disk_map, 1e12)
+    self.assertEqual(os.listdir(self.root), lognames[-1:])
+
+  def test_upload_state_changes(self):
+    lognames = self.make_tree(4, uploaded_every=100)
+    disk_map = DiskMap(self.root)
+    disk_map.update()
+    self.assertEqual(disk_map.eviction_candidates(), [lognames[0], lognames[1], lognames[2]])
+
+    for name in SEGMENT_FILES:
+      setxattr(os.path.join(self.root, lognames[2], name), UPLOAD_ATTR_NAME, UPLOAD_ATTR_VALUE)
+    os.unlink(os.path.join(self.root, lognames[3], "rlog.bz2.lock"))
+    disk_map.last_upload_check -= deleter.UPLOAD_RECHECK_INTERVAL
+    disk_map.update()
+    self.assertEqual(disk_map.eviction_candidates(), [lognames[0], lognames[2], lognames[1], lognames[3]])
+
+  def test_scan_error(self):
+    lognames = self.make_tree(3, uploaded_every=1)
+    disk_map = DiskMap(self.root)
+    with unittest.mock.patch.object(deleter, "getxattr", side_effect=OSError):
+      disk_map.update()
+    # files that weren't scanned may not be uploaded, or the lock file was missed
+    self.assertEqual(disk_map.eviction_candidates(), [])
+    self.assertFalse(any(info.uploaded for info in disk_map.dirs.values()))
+
+    # rescanned on the next update, without waiting for the upload recheck
+    disk_map.update()
+    self.assertEqual(disk_map.eviction_candidates(), lognames[:2])
+    self.assertEqual(disk_map.dirs[lognames[0]].size, self.sizes[lognames[0]])
+
+  def test_simulated_disk(self):
+    n_segments = 2000
+    to_free = 400
+    lognames = self.make_tree(n_segments)
+    segment_size = self.sizes[lognames[0]]
+    capacity = self.used_bytes() - to_free * segment_size
+    used = [self.used_bytes()]
+
+    real_rmtree = shutil.rmtree
+    def rmtree(path):
+      real_rmtree(path)
+      used[0] -= self.sizes[os.path.basename(path)]
+
+    with unittest.mock.patch("shutil.rmtree", rmtree):
+      passes_old = 0
+      while used[0] > capacity:
+        deleter_pass_old(self.root)
+        passes_old += 1
+
+    # same tree again for the new deleter
+    shutil.rmtree(self.root)
+    os.mkdir(self.root)
+    self.make_tree(n_segments)
+    used = [self.used_bytes()]
+    with unittest.mock.patch("shutil.rmtree", rmtree):
+      passes_new = 0
+      disk_map = DiskMap(self.root)
+      while used[0] > capacity:
+        disk_map.update()
+        delete_dirs(disk_map, used[0] - capacity)
+        passes_new += 1
+
+    self.assertEqual(passes_old, to_free)
+    self.assertEqual(passes_new, 1)
+    self.assertEqual(len(os.listdir(self.root)), n_segments - to_free)
+
+
+if __name__ == "__main__":
+  unittest.main()
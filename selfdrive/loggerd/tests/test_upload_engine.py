@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+import os
+import re
+import shutil
+import tempfile
+import threading
+import unittest
+import unittest.mock
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlparse, parse_qs
+
+from common.xattr import getxattr
+from selfdrive.loggerd import upload_engine
+from selfdrive.loggerd.upload_engine import upload_file, PROGRESS_ATTR_NAME
+
+
+class FakeClock():
+  """Stand-in for the time module in upload_engine, sleeping only moves the clock"""
+  def __init__(self):
+    self.t = 0.
+    self.sleeps = []
+
+  def monotonic(self):
+    return self.t
+
+  def sleep(self, dt):
+    self.sleeps.append(dt)
+    self.t += dt
+
+
+class BlobStore():
+  """Stand-in for the block blob server. fail_requests picks requests to answer with a 500"""
+  def __init__(self):
+    self.blobs = {}
+    self.blocks = {}
+    self.requests = []
+    self.fail_requests = lambda n, query: False
+    self.lock = threading.Lock()
+
+
+def make_handler(store):
+  class Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, *args):
+      pass
+
+    def reply(self, code):
+      self.send_response(code)
+      self.send_header("Content-Length", "0")
+      self.end_headers()
+
+    def do_PUT(self):
+      url = urlparse(self.path)
+      query = parse_qs(url.query)
+      dat = self.rfile.read(int(self.headers["Content-Length"]))
+      with store.lock:
+        store.requests.append((url.path, query.get('comp', [None])[0], len(dat)))
+        fail = store.fail_requests(len(store.requests), query)
+      if fail:
+        return self.reply(500)
+
+      comp = query.get('comp', [None])[0]
+      if comp == 'block':
+        store.blocks[(url.path, query['blockid'][0])] = dat
+        self.reply(201)
+      elif comp == 'blocklist':
+        ids = re.findall(r"<Latest>(.*?)</Latest>", dat.decode())
+        if not all((url.path, i) in store.blocks for i in ids):
+          return self.reply(400)
+        store.blobs[url.path] = b''.join(store.blocks[(url.path, i)] for i in ids)
+        self.reply(201)
+      else:
+        store.blobs[url.path] = dat
+        self.reply(201)
+  return Handler
+
+
+class TestUploadEngine(unittest.TestCase):
+  def setUp(self):
+    self.root = tempfile.mkdtemp()
+    self.store = BlobStore()
+    self.server = ThreadingHTTPServer(("127.0.0.1", 0), make_handler(self.store))
+    threading.Thread(target=self.server.serve_forever, daemon=True).start()
+    self.url = f"http://127.0.0.1:{self.server.server_port}"
+    self.headers = {'x-ms-blob-type': 'BlockBlob'}
+
+    self.block_size = upload_engine.BLOCK_SIZE
+    upload_engine.BLOCK_SIZE = 64 * 1024
+
+  def tearDown(self):
+    upload_engine.BLOCK_SIZE = self.block_size
+    self.server.shutdown()
+    self.server.server_close()
+    shutil.rmtree(self.root)
+
+  def make_file(self, size):
+    fn = os.path.join(self.root, "fcamera.hevc")
+    with open(fn, "wb") as f:
+      f.write(os.urandom(size))
+    with open(fn, "rb") as f:
+      return fn, f.read()
+
+  def test_small_file(self):
+    fn, dat = self.make_file(1000)
+    resp = upload_file(fn, f"{self.url}/small?sig=x", self.headers)
+    self.assertEqual(resp.status_code, 201)
+    self.assertEqual(self.store.blobs["/small"], dat)
+    self.assertEqual(self.store.requests, [("/small", None, 1000)])
+
+  def test_resume_after_failures(self):
+    fn, dat = self.make_file(20 * 64 * 1024 + 123)
+
+    # every fourth block fails on the first attempt
+    self.store.fail_requests = lambda n, query: query.get('comp') == ['block'] and n % 4 == 0
+    resp = upload_file(fn, f"{self.url}/big?sig=x", self.headers, workers=3)
+    self.assertEqual(resp.status_code, 500)
+    self.assertNotIn("/big", self.store.blobs)
+    self.assertIsNotNone(getxattr(fn, PROGRESS_ATTR_NAME))
+
+    stored = len(self.store.blocks)
+    self.store.requests.clear()
+    self.store.fail_requests = lambda n, query: False
+    resp = upload_file(fn, f"{self.url}/big?sig=y", self.headers, workers=3)
+    self.assertEqual(resp.status_code, 201)
+    self.assertEqual(self.store.blobs["/big"], dat)
+    self.assertIsNone(getxattr(fn, PROGRESS_ATTR_NAME))
+
+    # only the missing blocks were sent again, then the block list
+    blocks = [r for r in self.store.requests if r[1] == 'block']
+    self.assertEqual(len(blocks), 21 - stored)
+    self.assertEqual(self.store.requests[-1][1], 'blocklist')
+
+  def test_lost_blocks_restart(self):
+    fn, dat = self.make_file(4 * 64 * 1024)
+    self.store.fail_requests = lambda n, query: query.get('comp') == ['blocklist']
+    self.assertEqual(upload_file(fn, f"{self.url}/lost?sig=x", self.headers).status_code, 500)
+
+    # the server forgot the uncommitted blocks
+    self.store.blocks.clear()
+    self.store.fail_requests = lambda n, query: False
+    self.assertEqual(upload_file(fn, f"{self.url}/lost?sig=x", self.headers).status_code, 400)
+    self.assertEqual(upload_file(fn, f"{self.url}/lost?sig=x", self.headers).status_code, 201)
+    self.assertEqual(self.store.blobs["/lost"], dat)
+
+  def test_rate_limit(self):
+    fn, dat = self.make_file(4 * 64 * 1024)
+    rate = 1024 * 1024
+    clock = FakeClock()
+    with unittest.mock.patch.dict(upload_engine.RATE_LIMITS, {'cell2G': rate}), \
+         unittest.mock.patch.object(upload_engine, "time", clock):
+      self.assertEqual(upload_file(fn, f"{self.url}/cell?sig=x", self.headers, network_type='cell2G').status_code, 201)
+    self.assertEqual(self.store.blobs["/cell"], dat)
+    # the first block goes out right away, the other three are paced
+    self.assertEqual(len(clock.sleeps), 4)
+    self.assertAlmostEqual(clock.t, 3 * 64 * 1024 / rate)
+
+  def test_wifi_not_paced(self):
+    fn, dat = self.make_file(4 * 64 * 1024)
+    clock = FakeClock()
+    with unittest.mock.patch.object(upload_engine, "time", clock):
+      self.assertEqual(upload_file(fn, f"{self.url}/wifi?sig=x", self.headers, network_type='wifi').status_code, 201)
+    self.assertEqual(self.store.blobs["/wifi"], dat)
+    self.assertEqual(clock.sleeps, [])
+
+if __name__ == "__main__":
+  unittest.main()
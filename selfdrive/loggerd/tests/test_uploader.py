@@ -0,0 +1,155 @@
+#!/usr/bin/env python3
+import os
+import shutil
+import tempfile
+import unittest
+import unittest.mock
+
+from common.xattr import getxattr, setxattr
+from selfdrive.loggerd import uploader
+from selfdrive.loggerd.uploader import Uploader, UPLOAD_ATTR_NAME, UPLOAD_ATTR_VALUE, listdir_by_creation
+
+SEGMENT_FILES = ["qlog.bz2", "qcamera.ts", "rlog.bz2", "fcamera.hevc", "dcamera.hevc"]
+
+class MockApi():
+  def __init__(self, dongle_id):
+    pass
+
+  def get_token(self):
+    return "fake-token"
+
+uploader.Api = MockApi
+
+cached_attributes_old = {}
+def getxattr_old(path, attr_name):
+  if (path, attr_name) not in cached_attributes_old:
+    cached_attributes_old[(path, attr_name)] = getxattr(path, attr_name)
+  return cached_attributes_old[(path, attr_name)]
+
+def gen_upload_files_old(uploader):
+  if not os.path.isdir(uploader.root):
+    return
+  for logname in listdir_by_creation(uploader.root):
+    path = os.path.join(uploader.root, logname)
+    try:
+      names = os.listdir(path)
+    except OSError:
+      continue
+    if any(name.endswith(".lock") for name in names):
+      continue
+
+    for name in sorted(names, key=uploader.get_upload_sort):
+      key = os.path.join(logname, name)
+      fn = os.path.join(path, name)
+      try:
+        is_uploaded = getxattr_old(fn, UPLOAD_ATTR_NAME)
+      except OSError:
+        is_uploaded = True
+      if is_uploaded:
+        continue
+      yield (name, key, fn)
+
+def next_file_to_upload_old(uploader, with_raw):
+  upload_files = list(gen_upload_files_old(uploader))
+
+  for name, key, fn in upload_files:
+    if name in uploader.immediate_priority or any(f in fn for f in uploader.immediate_folders):
+      return (key, fn)
+
+  if with_raw:
+    for name, key, fn in upload_files:
+      if name in uploader.high_priority:
+        return (key, fn)
+
+    for name, key, fn in upload_files:
+      if not name.endswith('.lock') and not name.endswith(".tmp"):
+        return (key, fn)
+
+  return None
+
+
+class TestUploader(unittest.TestCase):
+  def setUp(self):
+    self.root = tempfile.mkdtemp()
+    cached_attributes_old.clear()
+
+  def tearDown(self):
+    shutil.rmtree(self.root)
+
+  def make_segment(self, route, seg, files=SEGMENT_FILES, uploaded=()):
+    path = os.path.join(self.root, f"{route}--{seg}")
+    os.makedirs(path, exist_ok=True)
+    for name in files:
+      fn = os.path.join(path, name)
+      open(fn, "w").close()
+      if name in uploaded:
+        setxattr(fn, UPLOAD_ATTR_NAME, UPLOAD_ATTR_VALUE)
+    return path
+
+  def make_tree(self, n_segments, segments_per_route=60):
+    for i in range(n_segments):
+      route = f"2021-03-{1 + i // segments_per_route // 24:02d}--{i // segments_per_route % 24:02d}-00-00"
+      # everything but the latest routes has its qlogs uploaded already
+      uploaded = SEGMENT_FILES[:2] if i < n_segments - 2 * segments_per_route else ()
+      self.make_segment(route, i % segments_per_route, uploaded=uploaded)
+
+  def check_same(self, uploader, with_raw):
+    d = uploader.next_file_to_upload(with_raw)
+    self.assertEqual(d, next_file_to_upload_old(uploader, with_raw))
+    return d
+
+  def test_upload_order(self):
+    up = Uploader("0000000000000000", self.root)
+    self.assertIsNone(up.next_file_to_upload(True))
+
+    self.make_tree(40, segments_per_route=10)
+    locked = self.make_segment("2021-03-01--23-00-00", 0, files=SEGMENT_FILES + ["rlog.bz2.lock"])
+    os.makedirs(os.path.join(self.root, "crash"))
+
+    for i in range(150):
+      with_raw = i % 3 != 0
+      d = self.check_same(up, with_raw)
+      if d is None:
+        continue
+      key, fn = d
+
+      # files of 0 size are tagged as uploaded without network access
+      self.assertTrue(up.upload(key, fn))
+      cached_attributes_old.clear()
+
+      if i == 10:
+        open(os.path.join(self.root, "crash", "error.log"), "w").close()
+      elif i == 20:
+        os.unlink(os.path.join(locked, "rlog.bz2.lock"))
+      elif i == 30:
+        shutil.rmtree(os.path.join(self.root, "2021-03-01--00-00-00--1"))
+      elif i == 40:
+        self.make_segment("2021-03-02--00-00-00", 0)
+
+    self.assertIsNone(self.check_same(up, False))
+
+  def test_synthetic_tree(self):
+    self.make_tree(5000)
+    up = Uploader("0000000000000000", self.root)
+    self.check_same(up, True)
+    self.check_same(up, False)
+
+  def test_getxattr_failure(self):
+    path = self.make_segment("2021-03-01--00-00-00", 0, uploaded=SEGMENT_FILES[1:])
+    up = Uploader("0000000000000000", self.root)
+
+    qlog = os.path.join(path, "qlog.bz2")
+    def failing_getxattr(path, attr_name):
+      if path == qlog:
+        raise OSError
+      return getxattr(path, attr_name)
+
+    with unittest.mock.patch.object(uploader, "getxattr", failing_getxattr):
+      self.assertIsNone(up.next_file_to_upload(True))
+
+    # the file is checked again on the next update
+    self.assertEqual(up.next_file_to_upload(True), ("2021-03-01--00-00-00--0/qlog.bz2", qlog))
+    self.assertEqual(up.retry_dirs, set())
+
+if __name__ == "__main__":
+  unittest.main()
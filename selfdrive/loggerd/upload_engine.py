@@ -0,0 +1,136 @@
+import base64
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import quote
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from common.xattr import getxattr, setxattr, removexattr
+
+NUM_WORKERS = int(os.getenv("UPLOADER_WORKERS", "4"))
+BLOCK_SIZE = 4 * 1024 * 1024  # larger files are uploaded in blocks of this size
+TIMEOUT = 10
+
+# blocks already stored by the server, so an interrupted upload can resume
+PROGRESS_ATTR_NAME = 'user.upload_progress'
+
+# bytes per second for each deviceState.networkType, None isn't paced
+RATE_LIMITS = {
+  'wifi': None,
+  'cell5G': 4 * 1024 * 1024,
+  'cell4G': 1024 * 1024,
+  'cell3G': 256 * 1024,
+  'cell2G': 32 * 1024,
+}
+DEFAULT_RATE_LIMIT = 256 * 1024
+
+# connections are kept alive between requests and shared by the workers
+session = requests.Session()
+session.mount('http://', HTTPAdapter(pool_maxsize=NUM_WORKERS))
+session.mount('https://', HTTPAdapter(pool_maxsize=NUM_WORKERS))
+
+
+class RateLimiter():
+  def __init__(self, rate):
+    self.rate = rate
+    self.lock = threading.Lock()
+    self.next_t = time.monotonic()
+
+  def wait(self, nbytes):
+    if self.rate is None:
+      return
+    with self.lock:
+      now = time.monotonic()
+      t = max(self.next_t, now)
+      self.next_t = t + nbytes / self.rate
+    time.sleep(t - now)
+
+
+def block_id(i):
+  # all block ids of a blob must have the same length
+  return base64.b64encode(b"%06d" % i).decode()
+
+
+class BlockUpload():
+  """Uploads a file as blocks of a block blob, then commits the block list.
+
+  Blocks are uploaded by up to workers threads. Every stored block is
+  recorded in an xattr on the file, so after a failure only the missing
+  blocks are sent again.
+  """
+  def __init__(self, fn, url, headers, size, limiter):
+    self.fn = fn
+    self.url = url
+    self.headers = {k: v for k, v in headers.items() if k.lower() != 'x-ms-blob-type'}
+    self.size = size
+    self.limiter = limiter
+    self.num_blocks = (size + BLOCK_SIZE - 1) // BLOCK_SIZE
+
+    self.lock = threading.Lock()
+    self.done = self.load_progress()
+
+  def load_progress(self):
+    try:
+      progress = getxattr(self.fn, PROGRESS_ATTR_NAME)
+    except OSError:
+      progress = None
+    if progress is None:
+      return 0
+
+    size, block_size, done = progress.decode().split()
+    if int(size) != self.size or int(block_size) != BLOCK_SIZE:
+      return 0
+    return int(done, 16)
+
+  def save_progress(self, i):
+    with self.lock:
+      self.done |= 1 << i
+      setxattr(self.fn, PROGRESS_ATTR_NAME, f"{self.size} {BLOCK_SIZE} {self.done:x}".encode())
+
+  def clear_progress(self):
+    try:
+      removexattr(self.fn, PROGRESS_ATTR_NAME)
+    except OSError:
+      pass
+
+  def put_block(self, i):
+    with open(self.fn, "rb") as f:
+      f.seek(i * BLOCK_SIZE)
+      dat = f.read(BLOCK_SIZE)
+
+    self.limiter.wait(len(dat))
+    resp = session.put(f"{self.url}&comp=block&blockid={quote(block_id(i))}", data=dat, headers=self.headers, timeout=TIMEOUT)
+    if resp.status_code == 201:
+      self.save_progress(i)
+    return resp
+
+  def run(self, workers):
+    todo = [i for i in range(self.num_blocks) if not (self.done >> i) & 1]
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+      for resp in pool.map(self.put_block, todo):
+        if resp.status_code != 201:
+          return resp
+
+    block_list = ''.join(f"<Latest>{block_id(i)}</Latest>" for i in range(self.num_blocks))
+    dat = f'<?xml version="1.0" encoding="utf-8"?><BlockList>{block_list}</BlockList>'
+    resp = session.put(f"{self.url}&comp=blocklist", data=dat.encode(), headers=self.headers, timeout=TIMEOUT)
+    # a rejected block list means the stored blocks are gone, start over next time
+    if resp.status_code in (200, 201, 400):
+      self.clear_progress()
+    return resp
+
+
+def upload_file(fn, url, headers, network_type='wifi', workers=NUM_WORKERS):
+  size = os.path.getsize(fn)
+  limiter = RateLimiter(RATE_LIMITS.get(str(network_type), DEFAULT_RATE_LIMIT))
+
+  is_block_blob = any(k.lower() == 'x-ms-blob-type' and v == 'BlockBlob' for k, v in headers.items())
+  if size > BLOCK_SIZE and is_block_blob and '?' in url:
+    return BlockUpload(fn, url, headers, size, limiter).run(workers)
+
+  limiter.wait(size)
+  with open(fn, "rb") as f:
+    return session.put(url, data=f, headers={**headers, 'Content-Length': str(size)}, timeout=TIMEOUT)
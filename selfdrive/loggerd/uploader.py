@@ -1,8 +1,8 @@
 #!/usr/bin/env python3
+import bisect
 import json
 import os
 import random
-import requests
 import threading
 import time
 import traceback
@@ -12,6 +12,7 @@ import cereal.messaging as messaging
 from common.api import Api
 from common.params import Params
 from selfdrive.loggerd.xattr_cache import getxattr, setxattr
+from selfdrive.loggerd.upload_engine import upload_file
 from selfdrive.loggerd.config import ROOT
 from selfdrive.swaglog import cloudlog
 
@@ -36,6 +37,11 @@ def listdir_by_creation(d):
     cloudlog.exception("listdir_by_creation failed")
     return list()
 
+def is_segment_dir(logname):
+  # segments are never written to again once their lock files are gone,
+  # other folders like crash/ and boot/ get new files at any time
+  return '--' in logname
+
 def clear_locks(root):
   for logname in os.listdir(root):
     path = os.path.join(root, logname)
@@ -57,11 +63,23 @@ class Uploader():
 
     self.last_resp = None
     self.last_exc = None
+    self.network_type = 'wifi'
 
     self.immediate_folders = ["crash/", "boot/"]
     self.immediate_priority = {"qlog.bz2": 0, "qcamera.ts": 1}
     self.high_priority = {"rlog.bz2": 0, "fcamera.hevc": 1, "dcamera.hevc": 2, "ecamera.hevc": 3}
 
+    # files not uploaded yet, kept up to date by update_index and upload instead of rescanning root every time.
+    # each bucket is sorted by folder creation, then by priority within the folder
+    self.immediate_files = []
+    self.high_files = []
+    self.other_files = []
+    self.indexed_files = {}  # key -> (bucket, item)
+    self.dir_files = {}  # logname -> keys of all files seen in it
+    self.locked_dirs = set()
+    self.unsealed_dirs = set()
+    self.retry_dirs = set()  # folders with files whose upload xattr couldn't be read
+
   def get_upload_sort(self, name):
     if name in self.immediate_priority:
       return self.immediate_priority[name]
@@ -69,49 +87,106 @@ class Uploader():
       return self.high_priority[name] + 100
     return 1000
 
-  def gen_upload_files(self):
-    if not os.path.isdir(self.root):
-      return
-    for logname in listdir_by_creation(self.root):
-      path = os.path.join(self.root, logname)
+  def get_bucket(self, name, fn):
+    if name in self.immediate_priority or any(f in fn for f in self.immediate_folders):
+      return self.immediate_files
+    if name in self.high_priority:
+      return self.high_files
+    if not name.endswith('.lock') and not name.endswith(".tmp"):
+      return self.other_files
+    return None
+
+  def remove_from_index(self, key):
+    entry = self.indexed_files.pop(key, None)
+    if entry is not None:
+      bucket, item = entry
+      del bucket[bisect.bisect_left(bucket, item)]
+
+  def index_dir(self, logname):
+    path = os.path.join(self.root, logname)
+    try:
+      names = os.listdir(path)
+    except OSError:
+      names = []
+
+    if any(name.endswith(".lock") for name in names):
+      self.locked_dirs.add(logname)
+      names = []
+    else:
+      self.locked_dirs.discard(logname)
+
+    old_keys = self.dir_files.get(logname, set())
+    keys = set()
+    failed = False
+    dir_sort = get_directory_sort(logname)
+    for name in names:
+      key = os.path.join(logname, name)
+      keys.add(key)
+      if key in old_keys:
+        continue
+
+      fn = os.path.join(path, name)
+      bucket = self.get_bucket(name, fn)
+      if bucket is None:
+        continue
+      # skip files already uploaded
       try:
-        names = os.listdir(path)
+        is_uploaded = getxattr(fn, UPLOAD_ATTR_NAME)
       except OSError:
+        # deleter could have deleted, otherwise checked again on the next update
+        cloudlog.event("uploader_getxattr_failed", exc=self.last_exc, key=key, fn=fn)
+        keys.discard(key)
+        failed = True
         continue
-      if any(name.endswith(".lock") for name in names):
+      if is_uploaded:
         continue
 
-      for name in sorted(names, key=self.get_upload_sort):
-        key = os.path.join(logname, name)
-        fn = os.path.join(path, name)
-        # skip files already uploaded
-        try:
-          is_uploaded = getxattr(fn, UPLOAD_ATTR_NAME)
-        except OSError:
-          cloudlog.event("uploader_getxattr_failed", exc=self.last_exc, key=key, fn=fn)
-          is_uploaded = True  # deleter could have deleted
-        if is_uploaded:
-          continue
-        yield (name, key, fn)
+      item = ((dir_sort, self.get_upload_sort(name), name), key, fn)
+      bisect.insort(bucket, item)
+      self.indexed_files[key] = (bucket, item)
+
+    for key in old_keys - keys:
+      self.remove_from_index(key)
+    self.dir_files[logname] = keys
+
+    if failed:
+      self.retry_dirs.add(logname)
+    else:
+      self.retry_dirs.discard(logname)
+
+  def update_index(self):
+    """Indexes new folders and rescans the ones that can still change"""
+    try:
+      lognames = set(os.listdir(self.root))
+    except OSError:
+      lognames = set()
+
+    for logname in self.dir_files.keys() - lognames:
+      for key in self.dir_files.pop(logname):
+        self.remove_from_index(key)
+      self.locked_dirs.discard(logname)
+      self.retry_dirs.discard(logname)
+
+    new_dirs = lognames - self.dir_files.keys()
+    self.unsealed_dirs = (self.unsealed_dirs & lognames) | {d for d in new_dirs if not is_segment_dir(d)}
+
+    # only files not seen before are checked for the upload xattr
+    for logname in new_dirs | self.locked_dirs | self.unsealed_dirs | self.retry_dirs:
+      self.index_dir(logname)
 
   def next_file_to_upload(self, with_raw):
-    upload_files = list(self.gen_upload_files())
+    self.update_index()
 
     # try to upload qlog files first
-    for name, key, fn in upload_files:
-      if name in self.immediate_priority or any(f in fn for f in self.immediate_folders):
-        return (key, fn)
-
+    buckets = [self.immediate_files]
     if with_raw:
-      # then upload the full log files, rear and front camera files
-      for name, key, fn in upload_files:
-        if name in self.high_priority:
-          return (key, fn)
+      # then upload the full log files, rear and front camera files, then other files
+      buckets += [self.high_files, self.other_files]
 
-      # then upload other files
-      for name, key, fn in upload_files:
-        if not name.endswith('.lock') and not name.endswith(".tmp"):
-          return (key, fn)
+    for bucket in buckets:
+      if len(bucket):
+        _, key, fn = bucket[0]
+        return (key, fn)
 
     return None
 
@@ -136,8 +211,7 @@ class Uploader():
 
         self.last_resp = FakeResponse()
       else:
-        with open(fn, "rb") as f:
-          self.last_resp = requests.put(url, data=f, headers=headers, timeout=10)
+        self.last_resp = upload_file(fn, url, headers, self.network_type)
     except Exception as e:
       self.last_exc = (e, traceback.format_exc())
       raise
@@ -158,6 +232,8 @@ class Uploader():
       sz = os.path.getsize(fn)
     except OSError:
       cloudlog.exception("upload: getsize failed")
+      # deleter could have deleted
+      self.remove_from_index(key)
       return False
 
     cloudlog.event("upload", key=key, fn=fn, sz=sz)
@@ -168,6 +244,7 @@ class Uploader():
       try:
         # tag files of 0 size as uploaded
         setxattr(fn, UPLOAD_ATTR_NAME, UPLOAD_ATTR_VALUE)
+        self.remove_from_index(key)
       except OSError:
         cloudlog.event("uploader_setxattr_failed", exc=self.last_exc, key=key, fn=fn, sz=sz)
       success = True
@@ -179,6 +256,7 @@ class Uploader():
         try:
           # tag file as uploaded
           setxattr(fn, UPLOAD_ATTR_NAME, UPLOAD_ATTR_VALUE)
+          self.remove_from_index(key)
         except OSError:
           cloudlog.event("uploader_setxattr_failed", exc=self.last_exc, key=key, fn=fn, sz=sz)
         success = True
@@ -217,6 +295,7 @@ def uploader_fn(exit_event):
     key, fn = d
 
     cloudlog.event("uploader_netcheck", is_on_wifi=on_wifi)
+    uploader.network_type = 'wifi' if force_wifi else str(sm['deviceState'].networkType)
     cloudlog.info("to upload %r", d)
     success = uploader.upload(key, fn)
     if success:
@@ -1,12 +1,23 @@
+from collections import OrderedDict
+
 from common.xattr import getxattr as getattr1
 from common.xattr import setxattr as setattr1
 
-cached_attributes = {}
+MAX_CACHED_ATTRIBUTES = 8192
+
+# least recently used entries are evicted first
+cached_attributes: OrderedDict = OrderedDict()
 def getxattr(path, attr_name):
-  if (path, attr_name) not in cached_attributes:
-    response = getattr1(path, attr_name)
-    cached_attributes[(path, attr_name)] = response
-  return cached_attributes[(path, attr_name)]
+  key = (path, attr_name)
+  if key in cached_attributes:
+    cached_attributes.move_to_end(key)
+    return cached_attributes[key]
+
+  response = getattr1(path, attr_name)
+  cached_attributes[key] = response
+  if len(cached_attributes) > MAX_CACHED_ATTRIBUTES:
+    cached_attributes.popitem(last=False)
+  return response
 
 def setxattr(path, attr_name, attr_value):
   cached_attributes.pop((path, attr_name), None)
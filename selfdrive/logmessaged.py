@@ -1,12 +1,39 @@
 #!/usr/bin/env python3
+import queue
+import threading
+import time
+
 import zmq
 import cereal.messaging as messaging
-from selfdrive.swaglog import get_le_handler
+from selfdrive.swaglog import cloudlog, get_le_handler
 
+MAX_BATCH = 256  # log lines handled per wakeup
+LE_QUEUE_SIZE = 1024
+STATS_INTERVAL = 60.  # seconds
 
-def main():
+
+def recv_log_batch(sock):
+  """Blocks for one log line, then takes whatever else is already queued"""
+  dats = [b''.join(sock.recv_multipart())]
+  try:
+    while len(dats) < MAX_BATCH:
+      dats.append(b''.join(sock.recv_multipart(zmq.NOBLOCK)))
+  except zmq.error.Again:
+    pass
+  return dats
+
+
+def logentries_thread(le_queue):
   le_handler = get_le_handler()
+  while True:
+    # TODO: push to athena instead
+    le_handler.emit_raw(le_queue.get())
+
+
+def main():
   le_level = 20  # logging.INFO
+  le_queue = queue.Queue(maxsize=LE_QUEUE_SIZE)
+  threading.Thread(target=logentries_thread, args=(le_queue,), daemon=True).start()
 
   ctx = zmq.Context().instance()
   sock = ctx.socket(zmq.PULL)
@@ -15,22 +42,37 @@ def main():
   # and we publish them
   pub_sock = messaging.pub_sock('logMessage')
 
+  lines, nbytes, le_dropped = 0, 0, 0
+  last_stats = time.monotonic()
   while True:
-    dat = b''.join(sock.recv_multipart())
-    dat = dat.decode('utf8')
+    dats = recv_log_batch(sock)
+    for dat in dats:
+      nbytes += len(dat)
+      dat = dat.decode('utf8')
+
+      levelnum = ord(dat[0])
+      dat = dat[1:]
 
-    levelnum = ord(dat[0])
-    dat = dat[1:]
+      if levelnum >= le_level:
+        # push to logentries
+        try:
+          le_queue.put_nowait(dat)
+        except queue.Full:
+          le_dropped += 1
 
-    if levelnum >= le_level:
-      # push to logentries
-      # TODO: push to athena instead
-      le_handler.emit_raw(dat)
+      # then we publish them, still one line per event since readers parse each logMessage as a record
+      msg = messaging.new_message()
+      msg.logMessage = dat
+      pub_sock.send(msg.to_bytes())
+    lines += len(dats)
 
-    # then we publish them
-    msg = messaging.new_message()
-    msg.logMessage = dat
-    pub_sock.send(msg.to_bytes())
+    t = time.monotonic()
+    if t - last_stats > STATS_INTERVAL:
+      dt = t - last_stats
+      cloudlog.event("logmessaged_stats", lines_per_sec=round(lines / dt, 1), bytes_per_sec=round(nbytes / dt, 1),
+                     le_dropped=le_dropped)
+      lines, nbytes, le_dropped = 0, 0, 0
+      last_stats = t
 
 
 if __name__ == "__main__":
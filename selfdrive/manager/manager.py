@@ -4,6 +4,7 @@ import os
 import signal
 import subprocess
 import sys
+import time
 import traceback
 
 import cereal.messaging as messaging
@@ -17,8 +18,9 @@ from selfdrive.hardware.eon.apk import (pm_apply_packages, start_offroad,
                                         update_apks)
 from selfdrive.manager.build import MAX_BUILD_PROGRESS, PREBUILT
 from selfdrive.manager.helpers import unblock_stdout
-from selfdrive.manager.process import ensure_running
+from selfdrive.manager.process import USE_ZYGOTE, start_zygote
 from selfdrive.manager.process_config import managed_processes
+from selfdrive.manager.supervisor import MANAGER_STATE_RATE, Supervisor
 from selfdrive.registration import register
 from selfdrive.swaglog import add_logentries_handler, cloudlog
 from selfdrive.version import dirty, version
@@ -205,6 +207,9 @@ def manager_prepare(spinner=None):
       perc = (100.0 - total) + total * (i + 1) / len(managed_processes)
       spinner.update_progress(perc, 100.)
 
+  if USE_ZYGOTE:
+    start_zygote()
+
 
 def manager_cleanup():
   if EON:
@@ -234,7 +239,8 @@ def manager_thread(spinner=None):
     pm_apply_packages('enable')
     start_offroad()
 
-  ensure_running(managed_processes.values(), started=False, not_run=ignore)
+  supervisor = Supervisor(managed_processes.values())
+  supervisor.update(started=False, not_run=ignore)
   if spinner:  # close spinner when ui has started
     spinner.close()
 
@@ -242,37 +248,39 @@ def manager_thread(spinner=None):
   params = Params()
   sm = messaging.SubMaster(['deviceState'])
   pm = messaging.PubMaster(['managerState'])
+  last_state_sent = 0.
 
   while True:
-    sm.update()
-    not_run = ignore[:]
+    # returns right away when a child exits
+    for p in supervisor.wait(0.1):
+      cloudlog.warning(f"{p.name} exited with {p.proc.exitcode}")
+    sm.update(0)
 
-    if sm['deviceState'].freeSpacePercent < 5:
-      not_run.append("loggerd")
+    if sm.updated['deviceState']:
+      not_run = ignore[:]
 
-    started = sm['deviceState'].started
-    driverview = params.get("IsDriverViewEnabled") == b"1"
-    ensure_running(managed_processes.values(), started, driverview, not_run)
+      if sm['deviceState'].freeSpacePercent < 5:
+        not_run.append("loggerd")
 
-    # trigger an update after going offroad
-    if started_prev and not started and 'updated' in managed_processes:
-      os.sync()
-      managed_processes['updated'].signal(signal.SIGHUP)
+      started = sm['deviceState'].started
+      driverview = params.get("IsDriverViewEnabled") == b"1"
+      supervisor.update(started, driverview, not_run)
 
-    started_prev = started
+      # trigger an update after going offroad
+      if started_prev and not started and 'updated' in managed_processes:
+        os.sync()
+        managed_processes['updated'].signal(signal.SIGHUP)
 
-    running_list = ["%s%s\u001b[0m" % ("\u001b[32m" if p.proc.is_alive() else "\u001b[31m", p.name)
-                    for p in managed_processes.values() if p.proc]
-    cloudlog.debug(' '.join(running_list))
+      started_prev = started
 
-    # send managerState
-    msg = messaging.new_message('managerState')
-    msg.managerState.processes = [p.get_process_state_msg() for p in managed_processes.values()]
-    pm.send('managerState', msg)
+      # Exit main loop when uninstall is needed
+      if params.get("DoUninstall", encoding='utf8') == "1":
+        break
 
-    # Exit main loop when uninstall is needed
-    if params.get("DoUninstall", encoding='utf8') == "1":
-      break
+    # send managerState
+    if supervisor.changed or time.monotonic() - last_state_sent > 1. / MANAGER_STATE_RATE:
+      pm.send('managerState', supervisor.get_manager_state_msg())
+      last_state_sent = time.monotonic()
 
 
 def main(spinner=None):
@@ -1,10 +1,13 @@
 import importlib
+import multiprocessing
+import multiprocessing.forkserver
 import os
 import signal
 import time
 import subprocess
 from abc import ABC, abstractmethod
 from multiprocessing import Process
+from multiprocessing.connection import wait
 
 from setproctitle import setproctitle  # pylint: disable=no-name-in-module
 
@@ -19,10 +22,89 @@ from cereal import log
 
 WATCHDOG_FN = "/dev/shm/wd_"
 ENABLE_WATCHDOG = os.getenv("NO_WATCHDOG") is None
+USE_ZYGOTE = os.getenv("ZYGOTE") is not None
 
+# with ZYGOTE set, python processes are forked from a server that has run
+# selfdrive.manager.zygote.preload(), instead of from the manager
+zygote = multiprocessing.get_context('forkserver')
+zygote.set_forkserver_preload(['selfdrive.manager.zygote_preload'])
 
-def launcher(proc):
+
+def start_zygote():
+  # preloading starts right away instead of on the first process start
+  multiprocessing.forkserver.ensure_running()
+
+
+# after watch_child_exits() a SIGCHLD makes this pipe readable
+sigchld_fd = None
+sigchld_count = 0
+
+
+def watch_child_exits():
+  """Lets the manager block until a child exits instead of polling. Main thread only."""
+  global sigchld_fd
+  if sigchld_fd is not None:
+    return
+
+  r, w = os.pipe()
+  os.set_blocking(r, False)
+  os.set_blocking(w, False)
+  # the handler only has to exist, the signal number is written to the wakeup fd
+  signal.signal(signal.SIGCHLD, lambda signum, frame: None)
+  signal.set_wakeup_fd(w)
+  sigchld_fd = r
+
+
+def reset_child_signals():
+  """Undoes watch_child_exits() in a forked child, the signals it gets aren't the manager's"""
+  global sigchld_fd
+  if sigchld_fd is None:
+    return
+
+  w = signal.set_wakeup_fd(-1)
+  if w != -1:
+    os.close(w)
+  signal.signal(signal.SIGCHLD, signal.SIG_DFL)
+  os.close(sigchld_fd)
+  sigchld_fd = None
+
+
+def drain_sigchld():
+  global sigchld_count
+  try:
+    while os.read(sigchld_fd, 512):
+      pass
+  except BlockingIOError:
+    pass
+  # lets others know they may have missed an exit
+  sigchld_count += 1
+
+
+def exit_fds(process):
+  """fds that become readable when the process may have exited"""
+  if isinstance(process, zygote.Process):
+    # children of the fork server, it reports their exit on the sentinel
+    return [process.sentinel]
+  if sigchld_fd is not None:
+    return [sigchld_fd]
+  return []
+
+
+def bind_context(global_ctx):
+  """Applies the manager's log and crash context. The fork server is a fresh
+  interpreter, so its children don't inherit what manager_init bound."""
+  cloudlog.bind_global(**global_ctx)
+  if "dongle_id" in global_ctx:
+    crash.bind_user(id=global_ctx["dongle_id"])
+  crash.bind_extra(**{k: v for k, v in global_ctx.items() if k != "dongle_id"})
+
+
+def launcher(proc, global_ctx=None):
+  reset_child_signals()
   try:
+    if global_ctx is not None:
+      bind_context(global_ctx)
+
     # import the process
     mod = importlib.import_module(proc)
 
@@ -44,6 +126,8 @@ def launcher(proc):
 
 
 def nativelauncher(pargs, cwd):
+  reset_child_signals()
+
   # exec the process
   os.chdir(cwd)
   os.execvp(pargs[0], pargs)
@@ -51,10 +135,19 @@ def nativelauncher(pargs, cwd):
 
 def join_process(process, timeout):
   # Process().join(timeout) will hang due to a python 3 bug: https://bugs.python.org/issue28382
-  # We have to poll the exitcode instead
+  # and returns early for native processes, the sentinel is closed when they exec.
+  # Wait for SIGCHLD or the fork server instead, or poll the exitcode without them.
   t = time.monotonic()
-  while time.monotonic() - t < timeout and process.exitcode is None:
-    time.sleep(0.001)
+  while process.exitcode is None:
+    remaining = timeout - (time.monotonic() - t)
+    if remaining <= 0:
+      break
+
+    fds = exit_fds(process)
+    if not fds:
+      time.sleep(0.001)
+    elif sigchld_fd in wait(fds, remaining):
+      drain_sigchld()
 
 
 class ManagerProcess(ABC):
@@ -69,6 +162,9 @@ class ManagerProcess(ABC):
   watchdog_max_dt = None
   watchdog_seen = False
 
+  # no exit notification, start() is called periodically to find out if it died
+  polled = False
+
   @abstractmethod
   def prepare(self):
     pass
@@ -197,7 +293,8 @@ class PythonProcess(ManagerProcess):
     self.watchdog_max_dt = watchdog_max_dt
 
   def prepare(self):
-    if self.enabled:
+    # the zygote preimports it otherwise
+    if self.enabled and not USE_ZYGOTE:
       cloudlog.info("preimporting %s" % self.module)
       importlib.import_module(self.module)
 
@@ -206,7 +303,10 @@ class PythonProcess(ManagerProcess):
       return
 
     cloudlog.info("starting python %s" % self.module)
-    self.proc = Process(name=self.name, target=launcher, args=(self.module,))
+    if USE_ZYGOTE:
+      self.proc = zygote.Process(name=self.name, target=launcher, args=(self.module, cloudlog.global_ctx))
+    else:
+      self.proc = Process(name=self.name, target=launcher, args=(self.module,))
     self.proc.start()
     self.watchdog_seen = False
 
@@ -220,6 +320,7 @@ class DaemonProcess(ManagerProcess):
     self.param_name = param_name
     self.enabled = enabled
     self.persistent = True
+    self.polled = True
 
   def prepare(self):
     pass
@@ -252,21 +353,16 @@ class DaemonProcess(ManagerProcess):
     pass
 
 
-def ensure_running(procs, started, driverview=False, not_run=None):
-  if not_run is None:
-    not_run = []
+def should_run(p, started, driverview=False, not_run=None):
+  if (not_run is not None and p.name in not_run) or not p.enabled:
+    return False
+  return p.persistent or (p.driverview and driverview) or started
 
+
+def ensure_running(procs, started, driverview=False, not_run=None):
   # TODO: can we do this in parallel?
   for p in procs:
-    if p.name in not_run:
-      p.stop()
-    elif not p.enabled:
-      p.stop()
-    elif p.persistent:
-      p.start()
-    elif p.driverview and driverview:
-      p.start()
-    elif started:
+    if should_run(p, started, driverview, not_run):
       p.start()
     else:
       p.stop()
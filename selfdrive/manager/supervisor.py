@@ -0,0 +1,87 @@
+import os
+import select
+
+import cereal.messaging as messaging
+from selfdrive.manager import process
+from selfdrive.manager.process import exit_fds, should_run
+
+# Hz, managerState is also sent right away when a process starts or exits
+MANAGER_STATE_RATE = float(os.getenv("MANAGER_STATE_RATE", "2"))
+
+
+class Supervisor():
+  """Starts and stops the managed processes when their desired state changes.
+
+  Exits are learned from SIGCHLD, or from the fork server for zygote children,
+  so only processes that started, stopped or exited are looked at again.
+  """
+  def __init__(self, procs):
+    self.procs = list(procs)
+    self.desired = {}
+    self.states = {}
+    self.changed = False
+    # fd to the running processes it reports exits of
+    self.fds = None
+
+    process.watch_child_exits()
+    self.sigchld_count = process.sigchld_count
+    for p in self.procs:
+      self.refresh(p)
+
+  def refresh(self, p):
+    state = p.get_process_state_msg()
+    old = self.states.get(p.name)
+    if old is None or (old.running, old.pid, old.exitCode) != (state.running, state.pid, state.exitCode):
+      self.states[p.name] = state
+      self.changed = True
+      self.fds = None
+
+  def running(self):
+    return [p for p in self.procs if self.states[p.name].running]
+
+  def update(self, started, driverview=False, not_run=None):
+    for p in self.procs:
+      run = should_run(p, started, driverview, not_run)
+      if p.polled or self.desired.get(p.name) != run:
+        self.desired[p.name] = run
+        if run:
+          p.start()
+        else:
+          p.stop()
+        self.refresh(p)
+
+      if p.watchdog_max_dt is not None:
+        # restarts it on a timeout
+        p.check_watchdog(started)
+        self.refresh(p)
+
+  def wait(self, timeout):
+    """Blocks until a child exits or for timeout seconds, returns the processes that exited"""
+    if self.fds is None:
+      self.fds = {process.sigchld_fd: []}
+      for p in self.running():
+        for fd in exit_fds(p.proc):
+          self.fds.setdefault(fd, []).append(p)
+    ready, _, _ = select.select(self.fds, [], [], timeout)
+
+    if process.sigchld_fd in ready:
+      process.drain_sigchld()
+    if self.sigchld_count != process.sigchld_count:
+      # any direct child could have exited, also when join_process got the SIGCHLD
+      self.sigchld_count = process.sigchld_count
+      check = self.running()
+    else:
+      check = [p for fd in ready for p in self.fds[fd]]
+
+    exited = []
+    for p in check:
+      self.refresh(p)
+      if not self.states[p.name].running:
+        exited.append(p)
+    return exited
+
+  def get_manager_state_msg(self):
+    self.changed = False
+    msg = messaging.new_message('managerState')
+    msg.managerState.processes = [self.states[p.name] for p in self.procs]
+    return msg
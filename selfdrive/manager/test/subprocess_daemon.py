@@ -0,0 +1,13 @@
+#!/usr/bin/env python3
+import subprocess
+import time
+
+# python daemon that runs its own subprocesses, like thermald and updated do
+def main():
+  for _ in range(10):
+    subprocess.check_call(["true"])
+  time.sleep(600)
+
+
+if __name__ == "__main__":
+  main()
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+import os
+import signal
+import time
+import unittest
+import unittest.mock
+
+from selfdrive.manager import process
+from selfdrive.manager.process import NativeProcess, PythonProcess, start_zygote
+from selfdrive.manager.supervisor import Supervisor
+
+NUM_PROCS = 20
+
+
+def dummy_processes():
+  return [NativeProcess(f"dummy{i}", "selfdrive", ["sleep", "600"]) for i in range(NUM_PROCS)]
+
+
+class TestSupervisor(unittest.TestCase):
+  def setUp(self):
+    self.procs = dummy_processes()
+
+  def tearDown(self):
+    for p in self.procs:
+      p.stop(retry=False)
+
+  def wait_for_exit(self, supervisor, p, timeout=5.):
+    t = time.monotonic()
+    while time.monotonic() - t < timeout:
+      if p in supervisor.wait(timeout):
+        return time.monotonic() - t
+    raise TimeoutError
+
+  def test_start_stop(self):
+    supervisor = Supervisor(self.procs)
+    supervisor.update(started=True)
+    self.assertTrue(all(p.proc.is_alive() for p in self.procs))
+    self.assertEqual(len(supervisor.running()), NUM_PROCS)
+
+    msg = supervisor.get_manager_state_msg()
+    self.assertFalse(supervisor.changed)
+    self.assertEqual([s.pid for s in msg.managerState.processes], [p.proc.pid for p in self.procs])
+
+    # nothing changed, nothing is touched
+    supervisor.update(started=True)
+    self.assertFalse(supervisor.changed)
+
+    supervisor.update(started=True, not_run=["dummy0"])
+    self.assertIsNone(self.procs[0].proc)
+    self.assertTrue(supervisor.changed)
+    self.assertEqual(len(supervisor.running()), NUM_PROCS - 1)
+
+    supervisor.update(started=False)
+    self.assertTrue(all(p.proc is None for p in self.procs))
+    self.assertEqual(supervisor.running(), [])
+
+  def test_exit(self):
+    supervisor = Supervisor(self.procs)
+    supervisor.update(started=True)
+    supervisor.get_manager_state_msg()
+
+    p = self.procs[3]
+    os.kill(p.proc.pid, signal.SIGKILL)
+    self.wait_for_exit(supervisor, p)
+
+    self.assertTrue(supervisor.changed)
+    state = supervisor.get_manager_state_msg().managerState.processes[3]
+    self.assertFalse(state.running)
+    self.assertEqual(state.exitCode, -signal.SIGKILL)
+    self.assertEqual(len(supervisor.running()), NUM_PROCS - 1)
+
+  def test_zygote_exit(self):
+    # not a child of the manager, the fork server reports the exit
+    start_zygote()
+    p = PythonProcess("logmessaged", "selfdrive.logmessaged")
+    self.procs.append(p)
+    supervisor = Supervisor([p])
+    with unittest.mock.patch.object(process, "USE_ZYGOTE", True):
+      supervisor.update(started=True)
+    self.assertEqual(type(p.proc).__name__, "ForkServerProcess")
+
+    os.kill(p.proc.pid, signal.SIGKILL)
+    self.wait_for_exit(supervisor, p)
+    self.assertEqual(supervisor.states["logmessaged"].exitCode, -signal.SIGKILL)
+
+  def test_restart(self):
+    supervisor = Supervisor(self.procs)
+    supervisor.update(started=True)
+    p = self.procs[5]
+    for _ in range(3):
+      pid = p.proc.pid
+      os.kill(pid, signal.SIGKILL)
+      self.wait_for_exit(supervisor, p)
+      p.restart()
+      supervisor.refresh(p)
+
+      state = supervisor.get_manager_state_msg().managerState.processes[5]
+      self.assertTrue(state.running)
+      self.assertNotEqual(state.pid, pid)
+      self.assertEqual(len(supervisor.running()), NUM_PROCS)
+
+  def test_idle(self):
+    supervisor = Supervisor(self.procs)
+    supervisor.update(started=True)
+    supervisor.get_manager_state_msg()
+
+    # no exits, no new managerState
+    for _ in range(10):
+      self.assertEqual(supervisor.wait(0), [])
+      supervisor.update(started=True)
+      self.assertFalse(supervisor.changed)
+
+  def test_child_signals(self):
+    # signals a daemon gets, like SIGCHLD from its own subprocesses, don't wake the manager
+    p = PythonProcess("subprocess_daemon", "selfdrive.manager.test.subprocess_daemon")
+    self.procs.append(p)
+    supervisor = Supervisor([p])
+    supervisor.update(started=True)
+    supervisor.get_manager_state_msg()
+    count = process.sigchld_count
+
+    t = time.monotonic()
+    while time.monotonic() - t < 2.:
+      self.assertEqual(supervisor.wait(0.1), [])
+    self.assertEqual(process.sigchld_count, count)
+    self.assertFalse(supervisor.changed)
+    self.assertTrue(supervisor.states["subprocess_daemon"].running)
+
+if __name__ == "__main__":
+  unittest.main()
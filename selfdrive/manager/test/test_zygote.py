@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+import gc
+import json
+import os
+import time
+import unittest
+import unittest.mock
+
+import zmq
+
+import cereal.messaging as messaging
+from selfdrive.manager import process
+from selfdrive.manager.process import PythonProcess, start_zygote
+from selfdrive.swaglog import cloudlog
+
+CONTEXT_FN = "/tmp/zygote_context.json"
+
+
+def main():
+  # started by test_global_context through the zygote
+  with open(CONTEXT_FN, "w") as f:
+    json.dump(cloudlog.global_ctx, f)
+
+
+class TestZygote(unittest.TestCase):
+  @classmethod
+  def setUpClass(cls):
+    start_zygote()
+
+  def setUp(self):
+    self.push = zmq.Context.instance().socket(zmq.PUSH)
+    # retry the connect faster than the default 100 ms, which would hide the start latency
+    self.push.setsockopt(zmq.RECONNECT_IVL, 1)
+    self.push.connect("ipc:///tmp/logmessage")
+
+  def tearDown(self):
+    self.push.close(linger=0)
+
+  def time_to_first_message(self, p):
+    sock = messaging.sub_sock('logMessage', timeout=10)
+    t = time.monotonic()
+    p.start()
+    while time.monotonic() - t < 10:
+      # logmessaged publishes every line it receives
+      try:
+        self.push.send(b"\x14" + b'{"msg": "zygote"}', zmq.NOBLOCK)
+      except zmq.error.Again:
+        pass
+      if messaging.recv_one(sock) is not None:
+        return time.monotonic() - t
+    raise TimeoutError
+
+  def test_process_lifecycle(self):
+    for use_zygote in [False, True]:
+      with self.subTest(use_zygote=use_zygote), unittest.mock.patch.object(process, "USE_ZYGOTE", use_zygote):
+        p = PythonProcess("logmessaged", "selfdrive.logmessaged")
+        self.time_to_first_message(p)
+        self.assertEqual(type(p.proc).__name__, "ForkServerProcess" if use_zygote else "Process")
+
+        state = p.get_process_state_msg()
+        self.assertTrue(state.running)
+        self.assertEqual(state.pid, p.proc.pid)
+        self.assertEqual(p.stop(), 0)
+        self.assertIsNone(p.proc)
+
+  def test_import_has_no_side_effects(self):
+    import selfdrive.manager.zygote  # pylint: disable=unused-import,import-outside-toplevel
+    self.assertEqual(gc.get_freeze_count(), 0)
+
+  def test_global_context(self):
+    # the fork server doesn't inherit what the manager bound after it started
+    ctx = {"dongle_id": "0123456789abcdef", "version": "0.8.2", "dirty": False, "device": "pc"}
+    if os.path.exists(CONTEXT_FN):
+      os.unlink(CONTEXT_FN)
+    with unittest.mock.patch.dict(cloudlog.global_ctx, ctx), unittest.mock.patch.object(process, "USE_ZYGOTE", True):
+      p = PythonProcess("context", __name__)
+      p.start()
+      p.proc.join(10)
+    with open(CONTEXT_FN) as f:
+      self.assertEqual(json.load(f), ctx)
+    p.stop()
+
+if __name__ == "__main__":
+  unittest.main()
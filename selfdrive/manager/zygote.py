@@ -0,0 +1,39 @@
+"""Preloading for the fork server that python processes are started from.
+
+The fork server runs preload() once, from selfdrive.manager.zygote_preload.
+After that every PythonProcess is a fork of it that finds the common stack
+and its own module already imported, and shares the server's heap instead
+of a copy of the manager's.
+"""
+import gc
+import importlib
+
+from selfdrive.manager.process import PythonProcess
+from selfdrive.manager.process_config import managed_processes
+from selfdrive.swaglog import cloudlog
+
+PRELOAD_MODULES = [
+  "numpy",
+  "capnp",
+  "cereal",
+  "cereal.messaging",
+  "opendbc.can.parser",
+  "opendbc.can.packer",
+  "selfdrive.car.car_helpers",
+]
+
+
+def preload():
+  modules = PRELOAD_MODULES + [p.module for p in managed_processes.values() if isinstance(p, PythonProcess) and p.enabled]
+  for module in modules:
+    # the fork server dies on anything but an ImportError
+    try:
+      importlib.import_module(module)
+    except Exception:
+      cloudlog.exception(f"zygote failed to preload {module}")
+
+  # the preloaded objects live as long as the children, moving them out of the collected
+  # generations keeps the GC from writing to (and copying) their pages in every child
+  gc.collect()
+  gc.freeze()
+
@@ -0,0 +1,4 @@
+# the fork server only imports its preload modules, importing this one preloads it
+from selfdrive.manager.zygote import preload
+
+preload()
@@ -1,5 +1,8 @@
 import os
+import time
 import logging
+import threading
+from collections import deque
 
 from logentries import LogentriesHandler
 import zmq
@@ -14,30 +17,110 @@ def get_le_handler():
 
 
 class LogMessageHandler(logging.Handler):
-  def __init__(self, formatter):
+  """Forwards records to logmessaged without blocking the logging thread.
+
+  emit only captures the swaglog context and appends the record to a bounded
+  deque. A writer thread formats and sends everything queued since its last
+  wakeup. Records that don't fit in the queue or the zmq send buffer are
+  counted and reported in a swaglog_dropped event once there is room again.
+  """
+  def __init__(self, formatter, max_queued=1024, endpoint="ipc:///tmp/logmessage"):
     logging.Handler.__init__(self)
     self.setFormatter(formatter)
+    self.max_queued = max_queued
+    self.endpoint = endpoint
     self.pid = None
 
   def connect(self):
     self.zctx = zmq.Context()
     self.sock = self.zctx.socket(zmq.PUSH)
     self.sock.setsockopt(zmq.LINGER, 10)
-    self.sock.connect("ipc:///tmp/logmessage")
-    self.pid = os.getpid()
+    self.sock.connect(self.endpoint)
+
+  def start(self):
+    # after a fork the writer thread is gone, so every process starts its own.
+    # self.lock is reinitialized by logging in the child, so it's free here
+    with self.lock:
+      if self.pid == os.getpid():
+        return
+      self.queue = deque()
+      self.wake = threading.Event()
+      self.passes_started = 0
+      self.passes = 0
+      self.dropped = 0
+      self.dropped_reported = 0
+      self.writer = threading.Thread(target=self.writer_thread, name="swaglog", daemon=True)
+      self.writer.start()
+      # set last, other threads only skip start() once the queue is in place
+      self.pid = os.getpid()
 
   def emit(self, record):
     if os.getpid() != self.pid:
-      self.connect()
+      self.start()
+
+    if len(self.queue) >= self.max_queued:
+      self.dropped += 1
+      return
+
+    # the context is thread local and the args may change after we return
+    record.swag_ctx = self.formatter.swaglogger.get_ctx()
+    if record.args:
+      try:
+        record.msg, record.args = record.getMessage(), None
+      except (ValueError, TypeError):
+        pass
+
+    was_empty = not self.queue
+    self.queue.append(record)
+    if was_empty:
+      self.wake.set()
 
-    msg = self.format(record).rstrip('\n')
-    # print("SEND".format(repr(msg)))
+  def send(self, levelno, msg):
     try:
-      s = chr(record.levelno)+msg
-      self.sock.send(s.encode('utf8'), zmq.NOBLOCK)
+      self.sock.send((chr(levelno) + msg).encode('utf8'), zmq.NOBLOCK)
+      return True
     except zmq.error.Again:
-      # drop :/
-      pass
+      return False
+
+  def send_dropped(self):
+    dropped = self.dropped
+    record = logging.LogRecord(self.formatter.swaglogger.name, logging.WARNING, __file__, 0,
+                               {'event': 'swaglog_dropped', 'dropped': dropped - self.dropped_reported, 'total': dropped},
+                               None, None)
+    if self.send(record.levelno, self.format(record)):
+      self.dropped_reported = dropped
+
+  def writer_thread(self):
+    self.connect()
+    while True:
+      # a record queued while the last batch drained may not set wake, the timeout picks it up
+      self.wake.wait(1.)
+      self.wake.clear()
+      self.passes_started += 1
+      while self.queue:
+        record = self.queue.popleft()
+        try:
+          msg = self.format(record).rstrip('\n')
+        except Exception:
+          self.handleError(record)
+          continue
+        if not self.send(record.levelno, msg):
+          # drop :/
+          self.dropped += 1
+
+      if self.dropped != self.dropped_reported:
+        self.send_dropped()
+      self.passes += 1
+
+  def flush(self, timeout=1.):
+    if self.pid != os.getpid():
+      return
+    # wait for a full writer pass that started after this call
+    passes = self.passes_started + 1
+    self.wake.set()
+    t = time.monotonic() + timeout
+    while (self.queue or self.passes < passes) and time.monotonic() < t:
+      time.sleep(0.001)
 
 
 def add_logentries_handler(log):
@@ -0,0 +1,161 @@
+import os
+import random
+from collections import namedtuple
+
+import numpy as np
+
+import cereal.messaging as messaging
+from cereal import car
+from selfdrive.hardware.eon.hardware import SYSFS_NODES
+
+# synthetic inputs shared by the tests and the selfdrive/debug benchmarks
+
+# services controlsd subscribes to
+CONTROLSD_SERVICES = ['deviceState', 'pandaState', 'modelV2', 'liveCalibration', 'ubloxRaw',
+                      'driverMonitoringState', 'longitudinalPlan', 'lateralPlan', 'liveLocationKalman',
+                      'roadCameraState', 'driverCameraState', 'managerState', 'liveParameters', 'radarState']
+
+
+def random_event(service):
+  """Serialized empty message of a service with a random logMonoTime and valid flag"""
+  try:
+    msg = messaging.new_message(service)
+  except Exception:
+    msg = messaging.new_message(service, 0)
+  msg.logMonoTime = random.getrandbits(63)
+  msg.valid = random.random() > 0.5
+  return msg.to_bytes()
+
+
+def service_frames(n, services=CONTROLSD_SERVICES):
+  """n frames in which every service updates"""
+  return [[random_event(s) for s in services] for _ in range(n)]
+
+
+def can_packet(msgs):
+  """Serialized can message of (address, busTime, dat, src) tuples, like can_list_to_can_capnp"""
+  dat = messaging.new_message('can', len(msgs))
+  for i, (address, bus_time, can_dat, src) in enumerate(msgs):
+    dat.can[i].address = address
+    dat.can[i].busTime = bus_time
+    dat.can[i].dat = can_dat
+    dat.can[i].src = src
+  return dat.to_bytes()
+
+
+def can_bus(addresses, n_frames, strings_per_frame=1):
+  """Every address with a random payload in each string, strings_per_frame strings per frame"""
+  return [[can_packet([(addr, 0, bytes(random.getrandbits(8) for _ in range(8)), 0) for addr in addresses])
+           for _ in range(strings_per_frame)] for _ in range(n_frames)]
+
+
+def random_can_packet(n, addrs, srcs=(0,)):
+  """Serialized can message of n frames with random addresses, buses and payloads"""
+  return can_packet([(random.choice(addrs), random.getrandbits(16), bytes(random.getrandbits(8) for _ in range(8)), random.choice(srcs))
+                     for _ in range(n)])
+
+
+class ReplaySocket():
+  """Receive side of a socket that returns the packets once, then nothing"""
+  def __init__(self, packets):
+    self.packets = list(packets)
+
+  def receive(self, non_blocking=False):
+    return self.packets.pop(0) if self.packets else None
+
+
+CanData = namedtuple('CanData', ['address', 'dat'])
+
+
+def fingerprint_frames(fingerprint, n):
+  """Stand-in for a recorded route: messages from one fingerprint plus an extended address"""
+  msgs = [CanData(adr, b'\x00' * l) for adr, l in fingerprint.items() if adr < 0x800]
+  msgs += [CanData(0x18daf1e0, b'\x00' * 8)]
+  return [random.choice(msgs) for _ in range(n)]
+
+
+RADAR_TS = 0.05
+
+
+class FakeSubMaster():
+  """carState and modelV2 with two leads, everything always updated and valid"""
+  def __init__(self):
+    self.msgs = {s: getattr(messaging.new_message(s), s) for s in ['carState', 'modelV2']}
+    self.msgs['modelV2'].init('leads', 2)
+    self.updated = {s: True for s in self.msgs}
+    self.logMonoTime = {s: 0 for s in self.msgs}
+
+  def __getitem__(self, s):
+    return self.msgs[s]
+
+  def all_alive_and_valid(self):
+    return True
+
+
+class SyntheticRadar():
+  """Point cloud of n tracks that move, and appear and disappear over time"""
+  def __init__(self, n, seed=0):
+    self.rnd = random.Random(seed)
+    self.n = n
+    self.next_id = 0
+    self.tracks = {}
+
+  def new_track(self):
+    self.tracks[self.next_id] = [self.rnd.uniform(2, 150), self.rnd.uniform(-10, 10), self.rnd.uniform(-20, 5), self.rnd.random() > 0.2]
+    self.next_id += 1
+
+  def step(self, v_ego):
+    for track_id in list(self.tracks):
+      if self.rnd.random() < 0.05:
+        del self.tracks[track_id]
+    while len(self.tracks) < self.n:
+      self.new_track()
+
+    rr = car.RadarData.new_message()
+    rr.init('points', len(self.tracks))
+    for i, (track_id, t) in enumerate(self.tracks.items()):
+      t[2] += self.rnd.gauss(0, 0.5)
+      t[0] = max(t[0] + t[2] * RADAR_TS, 0.5)
+      t[1] += self.rnd.gauss(0, 0.05)
+      rr.points[i].trackId = track_id
+      rr.points[i].dRel, rr.points[i].yRel, rr.points[i].vRel, rr.points[i].measured = t
+    return rr
+
+
+def radar_points(n, rnd):
+  """Cluster keys as built by radard: dRel, 2 * yRel, vRel, with groups of points on the same object"""
+  objects = np.column_stack((rnd.uniform(0, 150, n), rnd.uniform(-20, 20, n), rnd.uniform(-30, 10, n)))
+  parents = rnd.randint(0, n, n)
+  return objects[parents] + rnd.normal(0, 1.5, (n, 3))
+
+
+def drive(sm, radar, v_ego, lead_d, step):
+  """Sets v_ego and the vision leads in sm, returns the next radar message"""
+  sm['carState'].vEgo = v_ego
+  for i, lead in enumerate(sm['modelV2'].leads):
+    lead.prob = 0.9
+    lead.xyva = [lead_d[i] + 0.3 * step % 7, 0.1 * i, -1., 0.]
+    lead.xyvaStd = [1., 0.5, 1., 1.]
+  return radar.step(v_ego)
+
+
+THERMAL_ZONE = "/sys/devices/virtual/thermal/thermal_zone%d/temp"
+EON_ZONES = [5, 7, 10, 12, 16, 2, 25, 29]
+
+
+def write_node(root, path, contents):
+  path = root + path
+  os.makedirs(os.path.dirname(path), exist_ok=True)
+  with open(path, "w") as f:
+    f.write(contents)
+
+
+def write_eon_sysfs(root):
+  """The sysfs nodes thermald reads on EON, under root"""
+  for z in EON_ZONES:
+    write_node(root, THERMAL_ZONE % z, f"{z * 1000}\n")
+  write_node(root, SYSFS_NODES["batteryPercent"][0], "87\n")
+  write_node(root, SYSFS_NODES["batteryStatus"][0], "Charging\n")
+  write_node(root, SYSFS_NODES["batteryCurrent"][0], "-120000\n")
+  write_node(root, SYSFS_NODES["batteryVoltage"][0], "4100000\n")
+  write_node(root, SYSFS_NODES["usbOnline"][0], "1\n")
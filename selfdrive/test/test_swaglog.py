@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+import json
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+import unittest.mock
+import logging
+from collections import deque
+
+import zmq
+
+from common.logging_extra import SwagLogger, SwagFormatter
+from selfdrive import swaglog
+from selfdrive.swaglog import LogMessageHandler
+
+
+def make_logger(**kwargs):
+  log = SwagLogger()
+  log.setLevel(logging.DEBUG)
+  handler = LogMessageHandler(SwagFormatter(log), **kwargs)
+  log.addHandler(handler)
+  return log, handler
+
+
+class TestSwaglog(unittest.TestCase):
+  def setUp(self):
+    # not the logmessaged endpoint, other loggers in the process send there
+    self.tmpdir = tempfile.mkdtemp()
+    self.endpoint = f"ipc://{self.tmpdir}/logmessage"
+    self.sock = zmq.Context.instance().socket(zmq.PULL)
+    self.sock.bind(self.endpoint)
+
+  def tearDown(self):
+    self.sock.close(linger=0)
+    shutil.rmtree(self.tmpdir)
+
+  def recv_all(self):
+    msgs = []
+    while self.sock.poll(100):
+      dat = self.sock.recv().decode('utf8')
+      msgs.append((ord(dat[0]), json.loads(dat[1:])))
+    return msgs
+
+  def test_forwarded(self):
+    log, handler = make_logger(endpoint=self.endpoint)
+    log.bind_global(dongle_id="abc")
+
+    def worker():
+      with log.ctx(daemon="worker"):
+        log.warning("x=%d", 3)
+        log.event("alert_add", alert_type="a")
+
+    t = threading.Thread(target=worker)
+    t.start()
+    t.join()
+    handler.flush()
+
+    msgs = self.recv_all()
+    self.assertEqual([m[0] for m in msgs], [logging.WARNING, logging.INFO])
+    self.assertEqual(msgs[0][1]['msg'], "x=3")
+    self.assertEqual(msgs[1][1]['msg'], {'event': 'alert_add', 'alert_type': 'a'})
+    for _, m in msgs:
+      # context is taken from the logging thread, not the writer
+      self.assertEqual(m['ctx'], {'daemon': 'worker', 'dongle_id': 'abc'})
+
+  def test_concurrent_start(self):
+    # the first emits in a process race to start the writer, emit is also called without handle()
+    log, handler = make_logger(endpoint=self.endpoint)
+    n_threads, n = 8, 50
+    barrier = threading.Barrier(n_threads)
+
+    def worker(i):
+      barrier.wait()
+      for j in range(n):
+        handler.emit(log.makeRecord(log.name, logging.INFO, __file__, 0, f"{i} {j}", None, None))
+
+    writers = sum(t.name == "swaglog" for t in threading.enumerate())
+    def slow_deque():
+      # lets the other threads catch up inside start()
+      time.sleep(0.01)
+      return deque()
+
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(n_threads)]
+    with unittest.mock.patch.object(swaglog, "deque", slow_deque):
+      for t in threads:
+        t.start()
+      for t in threads:
+        t.join()
+    handler.flush()
+
+    self.assertEqual(sum(t.name == "swaglog" for t in threading.enumerate()), writers + 1)
+    self.assertEqual(sorted(m[1]['msg'] for m in self.recv_all()), sorted(f"{i} {j}" for i in range(n_threads) for j in range(n)))
+
+  def test_dropped(self):
+    log, handler = make_logger(max_queued=0, endpoint=self.endpoint)
+    for _ in range(10):
+      log.info("dropped")
+    handler.flush()
+
+    msgs = self.recv_all()
+    self.assertEqual(len(msgs), 1)
+    self.assertEqual(msgs[0][1]['msg'], {'event': 'swaglog_dropped', 'dropped': 10, 'total': 10})
+
+  def test_burst(self):
+    burst = 200
+    log, handler = make_logger(endpoint=self.endpoint)
+    for i in range(burst):
+      log.event('alert_add', alert_type="steerTempUnavailable", i=i)
+    handler.flush()
+
+    msgs = self.recv_all()
+    self.assertEqual([m[1]['msg']['i'] for m in msgs], list(range(burst)))
+
+if __name__ == "__main__":
+  unittest.main()
@@ -7,6 +7,7 @@ from cereal import log
 from common.params import Params, put_nonblocking
 from common.realtime import sec_since_boot
 from selfdrive.hardware import HARDWARE
+from selfdrive.hardware.sysfs import read_node
 from selfdrive.swaglog import cloudlog
 
 PANDA_OUTPUT_VOLTAGE = 5.28
@@ -26,11 +27,7 @@ def get_battery_capacity():
 
 # Helpers
 def _read_param(path, parser, default=0):
-  try:
-    with open(path) as f:
-      return parser(f.read())
-  except Exception:
-    return default
+  return read_node(path, parser, default)
 
 def panda_current_to_actual_current(panda_current):
   # From white/grey panda schematic
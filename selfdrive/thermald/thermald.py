@@ -15,13 +15,14 @@ from common.params import Params
 from common.realtime import DT_TRML, sec_since_boot
 from selfdrive.controls.lib.alertmanager import set_offroad_alert
 from selfdrive.hardware import EON, TICI, HARDWARE
+from selfdrive.hardware.sysfs import SysfsSampler
+from selfdrive.hardware.telemetry import TelemetryCollector
 from selfdrive.loggerd.config import get_available_percent
 from selfdrive.pandad import get_expected_signature
 from selfdrive.swaglog import cloudlog
 from selfdrive.thermald.power_monitoring import PowerMonitoring
 from selfdrive.version import get_git_branch, terms_version, training_version
 
-import re
 import subprocess
 
 FW_SIGNATURE = get_expected_signature()
@@ -29,8 +30,6 @@ FW_SIGNATURE = get_expected_signature()
 DISABLE_LTE_ONROAD = os.path.exists("/persist/disable_lte_onroad") or TICI
 
 ThermalStatus = log.DeviceState.ThermalStatus
-NetworkType = log.DeviceState.NetworkType
-NetworkStrength = log.DeviceState.NetworkStrength
 CURRENT_TAU = 15.   # 15s time constant
 CPU_TEMP_TAU = 5.   # 5s time constant
 DAYS_NO_CONNECTIVITY_MAX = 7  # do not allow to engage after a week without internet
@@ -46,24 +45,51 @@ mediaplayer = '/data/openpilot/selfdrive/assets/addon/mediaplayer/'
 prebuiltfile = '/data/openpilot/prebuilt'
 pandaflash_ongoing = '/data/openpilot/pandaflash_ongoing'
 
-def read_tz(x):
-  if x is None:
-    return 0
+THERMAL_ZONE = "/sys/devices/virtual/thermal/thermal_zone%d/temp"
 
-  try:
-    with open(f"/sys/devices/virtual/thermal/thermal_zone{x}/temp") as f:
-      return int(f.read())
-  except FileNotFoundError:
+# seconds between reads of a sysfs node, the others are read every iteration
+SAMPLE_INTERVALS = {
+  "batteryPercent": 5.,
+}
+
+# deviceState fields that come from HARDWARE, read from sysfs where the hardware has a node for them
+BATTERY_FIELDS = {
+  "batteryPercent": HARDWARE.get_battery_capacity,
+  "batteryStatus": HARDWARE.get_battery_status,
+  "batteryCurrent": HARDWARE.get_battery_current,
+  "batteryVoltage": HARDWARE.get_battery_voltage,
+  "usbOnline": HARDWARE.get_usb_present,
+}
+
+
+def setup_sampler(thermal_config, sysfs_nodes, root=""):
+  """One sampler for the thermal zones and the hardware's battery and power nodes"""
+  sampler = SysfsSampler(root)
+  zones = list(thermal_config.cpu[0]) + list(thermal_config.gpu[0]) + [thermal_config.mem[0], thermal_config.ambient[0], thermal_config.bat[0]]
+  for z in zones:
+    if z is not None:
+      sampler.add(f"tz{z}", THERMAL_ZONE % z, int, 0, SAMPLE_INTERVALS.get(f"tz{z}", 0.))
+  for name, (path, parser, default) in sysfs_nodes.items():
+    sampler.add(name, path, parser, default, SAMPLE_INTERVALS.get(name, 0.))
+  return sampler
+
+
+def read_tz(x, sample):
+  if x is None:
     return 0
+  return sample[f"tz{x}"]
 
 
-def read_thermal(thermal_config):
+def read_thermal(thermal_config, sample):
   dat = messaging.new_message('deviceState')
-  dat.deviceState.cpuTempC = [read_tz(z) / thermal_config.cpu[1] for z in thermal_config.cpu[0]]
-  dat.deviceState.gpuTempC = [read_tz(z) / thermal_config.gpu[1] for z in thermal_config.gpu[0]]
-  dat.deviceState.memoryTempC = read_tz(thermal_config.mem[0]) / thermal_config.mem[1]
-  dat.deviceState.ambientTempC = read_tz(thermal_config.ambient[0]) / thermal_config.ambient[1]
-  dat.deviceState.batteryTempC = read_tz(thermal_config.bat[0]) / thermal_config.bat[1]
+  dat.deviceState.cpuTempC = [read_tz(z, sample) / thermal_config.cpu[1] for z in thermal_config.cpu[0]]
+  dat.deviceState.gpuTempC = [read_tz(z, sample) / thermal_config.gpu[1] for z in thermal_config.gpu[0]]
+  dat.deviceState.memoryTempC = read_tz(thermal_config.mem[0], sample) / thermal_config.mem[1]
+  dat.deviceState.ambientTempC = read_tz(thermal_config.ambient[0], sample) / thermal_config.ambient[1]
+  dat.deviceState.batteryTempC = read_tz(thermal_config.bat[0], sample) / thermal_config.bat[1]
+
+  for name, get_value in BATTERY_FIELDS.items():
+    setattr(dat.deviceState, name, sample[name] if name in sample else get_value())
   return dat
 
 
@@ -205,9 +231,6 @@ def thermald_thread():
   usb_power = True
   current_branch = get_git_branch()
 
-  network_type = NetworkType.none
-  network_strength = NetworkStrength.unknown
-
   current_filter = FirstOrderFilter(0., CURRENT_TAU, DT_TRML)
   cpu_temp_filter = FirstOrderFilter(0., CPU_TEMP_TAU, DT_TRML)
   pandaState_prev = None
@@ -222,9 +245,11 @@ def thermald_thread():
   no_panda_cnt = 0
 
   thermal_config = HARDWARE.get_thermal_config()
+  sampler = setup_sampler(thermal_config, HARDWARE.get_sysfs_nodes())
 
-  ts_last_ip = 0
-  ip_addr = '255.255.255.255'
+  # network state is collected off the loop, get_network_type can take seconds
+  telemetry = TelemetryCollector(HARDWARE)
+  telemetry.start()
 
   # sound trigger
   sound_trigger = 1
@@ -267,7 +292,7 @@ def thermald_thread():
   while 1:
     ts = sec_since_boot()
     pandaState = messaging.recv_sock(pandaState_sock, wait=True)
-    msg = read_thermal(thermal_config)
+    msg = read_thermal(thermal_config, sampler.read())
 
     if pandaState is not None:
       usb_power = pandaState.pandaState.usbPowerMode != log.PandaState.UsbPowerMode.client
@@ -312,24 +337,13 @@ def thermald_thread():
       is_openpilot_view_enabled = 0
       startup_conditions["ignition"] = False
 
-    # get_network_type is an expensive call. update every 10s
-    if (count % int(10. / DT_TRML)) == 0:
-      try:
-        network_type = HARDWARE.get_network_type()
-        network_strength = HARDWARE.get_network_strength(network_type)
-      except Exception:
-        cloudlog.exception("Error getting network status")
-
     msg.deviceState.freeSpacePercent = get_available_percent(default=100.0)
     msg.deviceState.memoryUsagePercent = int(round(psutil.virtual_memory().percent))
     msg.deviceState.cpuUsagePercent = int(round(psutil.cpu_percent()))
-    msg.deviceState.networkType = network_type
-    msg.deviceState.networkStrength = network_strength
-    msg.deviceState.batteryPercent = HARDWARE.get_battery_capacity()
-    msg.deviceState.batteryStatus = HARDWARE.get_battery_status()
-    msg.deviceState.batteryCurrent = HARDWARE.get_battery_current()
-    msg.deviceState.batteryVoltage = HARDWARE.get_battery_voltage()
-    msg.deviceState.usbOnline = HARDWARE.get_usb_present()
+    network = telemetry.snapshot
+    msg.deviceState.networkType = network["network_type"]
+    msg.deviceState.networkStrength = network["network_strength"]
+    msg.deviceState.ipAddr = network["ip_addr"]
 
     # Fake battery levels on uno for frame
     if (not EON) or is_uno:
@@ -337,17 +351,6 @@ def thermald_thread():
       msg.deviceState.batteryStatus = "Charging"
       msg.deviceState.batteryTempC = 0
 
-    # update ip every 10 seconds
-    ts = sec_since_boot()
-    if ts - ts_last_ip >= 10.:
-      try:
-        result = subprocess.check_output(["ifconfig", "wlan0"], encoding='utf8')  # pylint: disable=unexpected-keyword-arg
-        ip_addr = re.findall(r"inet addr:((\d+\.){3}\d+)", result)[0][0]
-      except:
-        ip_addr = 'N/A'
-      ts_last_ip = ts
-    msg.deviceState.ipAddr = ip_addr
-
     current_filter.update(msg.deviceState.batteryCurrent / 1e6)
 
     # TODO: add car battery voltage check